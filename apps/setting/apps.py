@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class SettingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.setting'
-    verbose_name = '系统配置'
\ No newline at end of file
+    verbose_name = '系统配置'
+
+    def ready(self):
+        from . import signals  # noqa: F401
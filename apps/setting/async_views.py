@@ -0,0 +1,239 @@
+"""
+系统配置异步视图
+以 ASGI 方式部署时替换 versions/check、versions/batch_check、versions/latest、configs/get_by_type、bootstrap 热点公共接口，
+请求参数、响应结构和状态码与 views.py 中的同名 action 保持一致
+"""
+from rest_framework import status
+
+from utils.async_views import async_api_view, parse_request_data
+from utils.compression import cache_compressed
+from utils.conditional import conditional_response, set_conditional_headers
+from utils.response import envelope_response
+from .serializers import (
+    VersionCheckRequestSerializer,
+    VersionBatchCheckRequestSerializer,
+    DynamicConfigRequestSerializer,
+    BootstrapRequestSerializer
+)
+from .snapshots import (
+    app_version_snapshot,
+    dynamic_config_feeds,
+    build_check_result,
+    build_batch_check_result,
+    build_bootstrap_result
+)
+
+
+@async_api_view(['POST'])
+async def version_check(request):
+    """检查版本更新
+
+    POST /setting/versions/check/
+    """
+    serializer = VersionCheckRequestSerializer(data=parse_request_data(request))
+    if not serializer.is_valid():
+        return envelope_response(
+            code=status.HTTP_400_BAD_REQUEST,
+            message='参数错误：' + str(serializer.errors),
+            data={
+                'has_update': False,
+                'is_force_update': False
+            },
+            http_status=status.HTTP_400_BAD_REQUEST
+        )
+
+    platform = serializer.validated_data['platform']
+    current_version_code = serializer.validated_data['version_code']
+
+    try:
+        entry = await app_version_snapshot.aget(platform)
+        message, response_data = build_check_result(entry, current_version_code)
+        return cache_compressed(envelope_response(
+            message=message,
+            data=response_data,
+            http_status=status.HTTP_200_OK
+        ))
+
+    except Exception as e:
+        return envelope_response(
+            code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            message=f'服务器错误：{str(e)}',
+            data={
+                'has_update': False,
+                'is_force_update': False
+            },
+            http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(['POST'])
+async def version_batch_check(request):
+    """批量检查版本更新
+
+    POST /setting/versions/batch_check/
+    """
+    serializer = VersionBatchCheckRequestSerializer(data=parse_request_data(request))
+    if not serializer.is_valid():
+        return envelope_response(
+            code=status.HTTP_400_BAD_REQUEST,
+            message='参数错误：' + str(serializer.errors),
+            data=None,
+            http_status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        entries = await app_version_snapshot.aget_all()
+        return envelope_response(
+            message='检查完成',
+            data=build_batch_check_result(entries, serializer.validated_data['items']),
+            http_status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return envelope_response(
+            code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            message=f'服务器错误：{str(e)}',
+            data=None,
+            http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(['GET'])
+async def version_latest(request):
+    """获取最新版本信息
+
+    GET /setting/versions/latest/?platform=android
+    """
+    platform = request.GET.get('platform')
+
+    if not platform:
+        return envelope_response(
+            code=status.HTTP_400_BAD_REQUEST,
+            message='缺少 platform 参数',
+            data=None,
+            http_status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if platform not in ['ios', 'android', 'all']:
+        return envelope_response(
+            code=status.HTTP_400_BAD_REQUEST,
+            message='platform 参数必须是 ios、android 或 all',
+            data=None,
+            http_status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        entry = await app_version_snapshot.aget(platform)
+
+        if not entry:
+            return envelope_response(
+                code=status.HTTP_404_NOT_FOUND,
+                message='未找到版本信息',
+                data=None,
+                http_status=status.HTTP_404_NOT_FOUND
+            )
+
+        not_modified = conditional_response(request, entry.etag, entry.last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = envelope_response(
+            message='获取成功',
+            data=entry.data,
+            http_status=status.HTTP_200_OK
+        )
+        return cache_compressed(set_conditional_headers(response, entry.etag, entry.last_modified))
+
+    except Exception as e:
+        return envelope_response(
+            code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            message=f'服务器错误：{str(e)}',
+            data=None,
+            http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(['GET'])
+async def config_get_by_type(request):
+    """根据类型获取配置
+
+    GET /setting/configs/get_by_type/?type=banner
+    """
+    config_type = request.GET.get('type')
+
+    if not config_type:
+        return envelope_response(
+            code=status.HTTP_400_BAD_REQUEST,
+            message='缺少 type 参数',
+            data=None,
+            http_status=status.HTTP_400_BAD_REQUEST
+        )
+
+    serializer = DynamicConfigRequestSerializer(data={'type': config_type})
+    if not serializer.is_valid():
+        return envelope_response(
+            code=status.HTTP_400_BAD_REQUEST,
+            message='参数错误：' + str(serializer.errors),
+            data=None,
+            http_status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        feed = await dynamic_config_feeds.aget(config_type)
+
+        not_modified = conditional_response(request, feed.etag, feed.last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = envelope_response(
+            message='获取成功',
+            data=feed.data,
+            http_status=status.HTTP_200_OK
+        )
+        return cache_compressed(set_conditional_headers(response, feed.etag, feed.last_modified))
+
+    except Exception as e:
+        return envelope_response(
+            code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            message=f'服务器错误：{str(e)}',
+            data=None,
+            http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(['POST'])
+async def bootstrap(request):
+    """客户端启动接口
+
+    POST /setting/bootstrap/
+    """
+    serializer = BootstrapRequestSerializer(data=parse_request_data(request))
+    if not serializer.is_valid():
+        return envelope_response(
+            code=status.HTTP_400_BAD_REQUEST,
+            message='参数错误：' + str(serializer.errors),
+            data=None,
+            http_status=status.HTTP_400_BAD_REQUEST
+        )
+
+    params = serializer.validated_data
+    try:
+        entry = await app_version_snapshot.aget(params['platform'])
+        feeds = {
+            config_type: await dynamic_config_feeds.aget(config_type)
+            for config_type in params.get('types') or dynamic_config_feeds.config_types
+        }
+        data = build_bootstrap_result(entry, params['version_code'], feeds, params.get('etags', {}))
+        return cache_compressed(envelope_response(
+            message='获取成功',
+            data=data,
+            http_status=status.HTTP_200_OK
+        ))
+
+    except Exception as e:
+        return envelope_response(
+            code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            message=f'服务器错误：{str(e)}',
+            data=None,
+            http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
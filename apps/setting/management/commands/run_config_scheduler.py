@@ -0,0 +1,30 @@
+"""
+运行动态配置定时上下线调度器
+
+使用示例:
+    python manage.py run_config_scheduler
+    python manage.py run_config_scheduler --poll-interval 10
+"""
+from django.core.management.base import BaseCommand
+
+from apps.setting.scheduler import ConfigScheduler
+
+
+class Command(BaseCommand):
+    help = '在配置到达 start_time / end_time 边界时刷新动态配置快照，按 Ctrl+C 退出'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='检查配置变更的最长间隔（秒），默认 CONFIG_SCHEDULER_POLL_INTERVAL'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ConfigScheduler(poll_interval=options['poll_interval'])
+        scheduler.load()
+        self.stdout.write(f'已加载 {len(scheduler)} 个边界，下一个边界: {scheduler.next_boundary() or "无"}')
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
+        self.stdout.write(self.style.SUCCESS('调度器已退出'))
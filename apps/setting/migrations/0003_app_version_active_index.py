@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('setting', '0002_dynamicconfig'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appversion',
+            index=models.Index(fields=['is_delete', 'is_active', 'platform', 'version_code'], name='setting_app_is_dele_2ccbd0_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:08
+
+import datetime
+from django.db import migrations, models
+
+
+def fill_validity_bounds(apps, schema_editor):
+    """根据已有的 start_time / end_time 填充有效期边界，未设置的保持默认哨兵值"""
+    DynamicConfig = apps.get_model('setting', 'DynamicConfig')
+    DynamicConfig.objects.filter(start_time__isnull=False).update(valid_from=models.F('start_time'))
+    DynamicConfig.objects.filter(end_time__isnull=False).update(valid_until=models.F('end_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('setting', '0003_app_version_active_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dynamicconfig',
+            name='setting_dyn_start_t_00b573_idx',
+        ),
+        migrations.AddField(
+            model_name='dynamicconfig',
+            name='valid_from',
+            field=models.DateTimeField(default=datetime.datetime(1000, 1, 1, 0, 0, tzinfo=datetime.timezone.utc), editable=False, help_text='生效开始时间，未设置时为最小值', verbose_name='有效期开始'),
+        ),
+        migrations.AddField(
+            model_name='dynamicconfig',
+            name='valid_until',
+            field=models.DateTimeField(default=datetime.datetime(9999, 12, 31, 0, 0, tzinfo=datetime.timezone.utc), editable=False, help_text='生效结束时间，未设置时为最大值', verbose_name='有效期结束'),
+        ),
+        migrations.RunPython(fill_validity_bounds, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dynamicconfig',
+            index=models.Index(fields=['type', 'is_active', 'is_delete', 'valid_from', 'valid_until', 'sort_order'], name='setting_dyn_type_868f40_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:24
+
+import datetime
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """有效期边界改为数据库生成列
+
+    普通列不能直接修改为生成列，先删除索引和原字段，再添加生成列并重建索引；
+    生成列由数据库根据 start_time / end_time 计算，不需要回填数据
+    """
+
+    dependencies = [
+        ('setting', '0004_dynamic_config_validity'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dynamicconfig',
+            name='setting_dyn_type_868f40_idx',
+        ),
+        migrations.RemoveField(
+            model_name='dynamicconfig',
+            name='valid_from',
+        ),
+        migrations.RemoveField(
+            model_name='dynamicconfig',
+            name='valid_until',
+        ),
+        migrations.AddField(
+            model_name='dynamicconfig',
+            name='valid_from',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce('start_time', models.Value(datetime.datetime(1000, 1, 1, 0, 0, tzinfo=datetime.timezone.utc))), help_text='生效开始时间，未设置时为最小值', output_field=models.DateTimeField(), verbose_name='有效期开始'),
+        ),
+        migrations.AddField(
+            model_name='dynamicconfig',
+            name='valid_until',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce('end_time', models.Value(datetime.datetime(9999, 12, 31, 0, 0, tzinfo=datetime.timezone.utc))), help_text='生效结束时间，未设置时为最大值', output_field=models.DateTimeField(), verbose_name='有效期结束'),
+        ),
+        migrations.AddIndex(
+            model_name='dynamicconfig',
+            index=models.Index(fields=['type', 'is_active', 'is_delete', 'valid_from', 'valid_until', 'sort_order'], name='setting_dyn_type_868f40_idx'),
+        ),
+    ]
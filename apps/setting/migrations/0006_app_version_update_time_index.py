@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('setting', '0005_dynamic_config_generated_validity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appversion',
+            index=models.Index(fields=['platform', 'update_time'], name='setting_app_platfor_203bee_idx'),
+        ),
+    ]
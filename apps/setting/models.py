@@ -1,8 +1,17 @@
+from datetime import datetime, timezone as dt_timezone
+
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 
 from models.base_model import BaseModel
 
+# 未设置开始 / 结束时间时有效期边界使用的哨兵值，在 MySQL DATETIME 范围内，
+# 且转换为本地时区后不会超出 datetime 的范围
+VALID_FROM_MIN = datetime(1000, 1, 1, tzinfo=dt_timezone.utc)
+VALID_UNTIL_MAX = datetime(9999, 12, 31, tzinfo=dt_timezone.utc)
+
 
 class AppVersion(BaseModel):
     """
@@ -95,6 +104,10 @@ class AppVersion(BaseModel):
         indexes = [
             models.Index(fields=['platform', 'is_active']),
             models.Index(fields=['-version_code']),
+            # 版本快照按平台查询最新启用版本，等值条件在前，version_code 用于倒序取第一条
+            models.Index(fields=['is_delete', 'is_active', 'platform', 'version_code']),
+            # 版本快照按平台统计所有版本的最大更新时间（Last-Modified）
+            models.Index(fields=['platform', 'update_time']),
         ]
 
     def __str__(self):
@@ -196,6 +209,25 @@ class DynamicConfig(BaseModel):
         default=dict
     )
 
+    # start_time / end_time 的规范化结果，未设置时为哨兵值。由数据库生成（STORED 生成列），
+    # save()、QuerySet.update()、bulk_create() / bulk_update() 以及直接执行的 SQL 都不会使其与原字段不一致。
+    # 有效期判断只需一个范围条件 valid_from <= now <= valid_until，可以使用索引
+    valid_from = models.GeneratedField(
+        expression=Coalesce('start_time', Value(VALID_FROM_MIN)),
+        output_field=models.DateTimeField(),
+        db_persist=True,
+        verbose_name='有效期开始',
+        help_text='生效开始时间，未设置时为最小值'
+    )
+
+    valid_until = models.GeneratedField(
+        expression=Coalesce('end_time', Value(VALID_UNTIL_MAX)),
+        output_field=models.DateTimeField(),
+        db_persist=True,
+        verbose_name='有效期结束',
+        help_text='生效结束时间，未设置时为最大值'
+    )
+
     class Meta:
         db_table = 'setting_dynamic_config'
         verbose_name = '动态配置'
@@ -204,36 +236,39 @@ class DynamicConfig(BaseModel):
         indexes = [
             models.Index(fields=['type', 'is_active']),
             models.Index(fields=['type', 'sort_order']),
-            models.Index(fields=['start_time', 'end_time']),
+            # 客户端按类型查询有效配置：等值条件在前，之后是有效期范围条件
+            models.Index(fields=['type', 'is_active', 'is_delete', 'valid_from', 'valid_until', 'sort_order']),
         ]
 
     def __str__(self):
         return f"[{self.get_type_display()}] {self.title}"
 
-    def is_valid_time(self):
+    @staticmethod
+    def validity_bounds(start_time, end_time):
+        """将可为空的开始 / 结束时间转换为有效期边界 (valid_from, valid_until)，与数据库生成列的表达式一致"""
+        return start_time or VALID_FROM_MIN, end_time or VALID_UNTIL_MAX
+
+    @staticmethod
+    def valid_at(now):
+        """有效期包含 now 的查询条件（边界均包含在内）"""
+        return Q(valid_from__lte=now, valid_until__gte=now)
+
+    def is_valid_time(self, now=None):
         """
-        检查当前时间是否在配置的有效期内
+        检查时间是否在配置的有效期内，与 valid_at 的判断一致
         
+        Args:
+            now: 检查的时间，默认当前时间
+
         Returns:
             bool: 如果在有效期内返回 True，否则返回 False
         """
-        from django.utils import timezone
-        now = timezone.now()
-
-        # 如果没有设置时间限制，则始终有效
-        if not self.start_time and not self.end_time:
-            return True
-
-        # 只设置了开始时间
-        if self.start_time and not self.end_time:
-            return now >= self.start_time
-
-        # 只设置了结束时间
-        if not self.start_time and self.end_time:
-            return now <= self.end_time
+        if now is None:
+            from django.utils import timezone
+            now = timezone.now()
 
-        # 同时设置了开始和结束时间
-        return self.start_time <= now <= self.end_time
+        valid_from, valid_until = self.validity_bounds(self.start_time, self.end_time)
+        return valid_from <= now <= valid_until
 
     def save(self, *args, **kwargs):
         """
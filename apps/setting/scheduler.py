@@ -0,0 +1,145 @@
+"""
+动态配置定时上下线调度器
+按 start_time / end_time 维护即将到达的边界小根堆，边界到达时递增动态配置快照代数并预热新代数的快照，
+配置在边界时刻上下线，不需要等到请求时才发现快照越过了边界。
+
+可以通过 python manage.py run_config_scheduler 单独运行，或设置 CONFIG_SCHEDULER_AUTOSTART
+在 web 进程处理第一个请求时启动后台线程。多个进程同时运行时，同一个边界只有一个进程递增代数
+"""
+import heapq
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from utils.metrics import metrics
+from .models import DynamicConfig, VALID_UNTIL_MAX
+from .snapshots import dynamic_config_feeds, setting_cache
+
+log = logging.getLogger(__name__)
+
+
+class ConfigScheduler:
+    """动态配置边界调度器
+
+    - 堆中保存 (边界时间, 配置类型)，边界为未开始配置的 start_time 和未过期配置的 end_time 之后 1 微秒
+      （有效期包含 end_time），与 DynamicConfigFeeds 计算的 expires_at 一致
+    - 后台修改配置后快照代数变化，下一次检查时重新加载边界
+    - 两次检查的间隔不超过 poll_interval 秒，保证能及时发现配置变更
+    """
+
+    def __init__(self, feeds=None, poll_interval=None):
+        options = getattr(settings, 'CONFIG_SCHEDULER', {})
+        self.feeds = feeds or dynamic_config_feeds
+        self.poll_interval = poll_interval if poll_interval is not None else options.get('POLL_INTERVAL', 30)
+        self._heap = []
+        self._generation = None
+        self._checked_at = None  # 上一次处理边界的时间
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self, since=None):
+        """从数据库加载 since（默认当前时间）之后的所有边界"""
+        since = since or timezone.now()
+        generation = self.feeds.current_generation()
+        rows = DynamicConfig.objects.filter(
+            is_active=True,
+            is_delete=False,
+            valid_until__gte=since
+        ).values_list('type', 'valid_from', 'valid_until')
+
+        heap = set()
+        for config_type, valid_from, valid_until in rows:
+            if valid_from > since:
+                heap.add((valid_from, config_type))
+            if valid_until < VALID_UNTIL_MAX:
+                heap.add((valid_until + timedelta(microseconds=1), config_type))
+        self._heap = list(heap)
+        heapq.heapify(self._heap)
+        self._generation = generation
+        log.debug('加载动态配置边界 %d 个，下一个边界 %s', len(self._heap), self.next_boundary())
+
+    def __len__(self):
+        """待处理的边界数"""
+        return len(self._heap)
+
+    def next_boundary(self):
+        """下一个边界时间，没有时返回 None"""
+        return self._heap[0][0] if self._heap else None
+
+    def run_pending(self, now=None):
+        """处理所有已到达的边界
+
+        配置变更后先重新加载上一次处理之后的边界，两次处理之间到达的边界不会遗漏；
+        有边界到达时递增快照代数，并预热相应类型的快照
+
+        Returns:
+            set: 本进程触发上下线的配置类型
+        """
+        now = now or timezone.now()
+        if self.feeds.current_generation() != self._generation:
+            self.load(min(self._checked_at or now, now))
+        self._checked_at = now
+
+        due = set()
+        while self._heap and self._heap[0][0] <= now:
+            due.add(heapq.heappop(self._heap))
+        if not due:
+            return set()
+
+        # 多个进程运行调度器时，同一个边界只由第一个写入标记的进程处理
+        claimed = {
+            config_type for boundary, config_type in due
+            if setting_cache.add(f'config_scheduler:fired:{config_type}:{boundary.isoformat()}', 1, timeout=3600)
+        }
+        if claimed:
+            self.feeds.invalidate()
+            metrics.incr('config_scheduler.fired', len(claimed))
+            for config_type in claimed:
+                self.feeds.get(config_type)
+            log.info('动态配置到达上下线边界，已刷新快照: %s', ', '.join(sorted(claimed)))
+        return claimed
+
+    def run_forever(self):
+        """循环处理边界，直到 stop() 被调用"""
+        while not self._stop.is_set():
+            try:
+                close_old_connections()
+                self.run_pending()
+            except Exception:
+                log.exception('动态配置调度失败')
+                # 数据库或缓存不可用时下一次检查重新加载
+                self._generation = None
+            self._stop.wait(self._seconds_until_next())
+        close_old_connections()
+
+    def _seconds_until_next(self):
+        timeout = self.poll_interval
+        boundary = self.next_boundary()
+        if boundary is not None:
+            timeout = min(timeout, (boundary - timezone.now()).total_seconds())
+        return max(timeout, 0)
+
+    def start(self):
+        """在后台守护线程中运行，重复调用不会启动多个线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='config-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止后台线程"""
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+
+config_scheduler = ConfigScheduler()
@@ -92,6 +92,44 @@ class VersionCheckRequestSerializer(serializers.Serializer):
         return attrs
 
 
+# 批量检查逐项转换 version_code，规则与 VersionCheckRequestSerializer.version_code 相同（接受 "100"、100.0 等）
+_VERSION_CODE_FIELD = serializers.IntegerField(min_value=1)
+
+
+class VersionBatchCheckRequestSerializer(serializers.Serializer):
+    """
+    批量版本检查请求序列化器
+    items 中每一项为 {"platform": "android", "version_code": 100}，校验后转换为 (platform, version_code) 列表
+    """
+    PLATFORMS = frozenset({'ios', 'android', 'all'})
+
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=500,
+        help_text='待检查的版本列表，最多 500 项',
+        error_messages={
+            'required': 'items不能为空',
+            'empty': 'items不能为空',
+            'max_length': 'items最多500项',
+        }
+    )
+
+    def validate_items(self, items):
+        # 逐项使用 VersionCheckRequestSerializer 校验的开销与项数成正比且远高于检查本身，这里直接校验
+        result = []
+        for index, item in enumerate(items):
+            platform = item.get('platform')
+            if not isinstance(platform, str) or platform not in self.PLATFORMS:
+                raise serializers.ValidationError(f'第 {index + 1} 项 platform 必须是 ios、android 或 all')
+            try:
+                version_code = _VERSION_CODE_FIELD.run_validation(item.get('version_code', serializers.empty))
+            except serializers.ValidationError:
+                raise serializers.ValidationError(f'第 {index + 1} 项 version_code 必须是正整数')
+            result.append((platform, version_code))
+        return result
+
+
 class VersionCheckResponseSerializer(serializers.Serializer):
     """
     版本检查响应序列化器
@@ -213,6 +251,47 @@ class DynamicConfigRequestSerializer(serializers.Serializer):
         return attrs
 
 
+class BootstrapRequestSerializer(serializers.Serializer):
+    """
+    启动接口请求序列化器
+    etags 为客户端缓存的各部分 ETag，键为 version 或配置类型，ETag 未变化的部分不返回数据
+    """
+    platform = serializers.ChoiceField(
+        choices=['ios', 'android', 'all'],
+        required=True,
+        help_text='客户端平台类型：ios、android、all'
+    )
+
+    version_code = serializers.IntegerField(
+        required=True,
+        min_value=1,
+        help_text='当前应用版本号（整数）'
+    )
+
+    types = serializers.ListField(
+        child=serializers.ChoiceField(choices=['banner', 'activity', 'setting']),
+        required=False,
+        allow_empty=False,
+        help_text='需要返回的配置类型，默认全部'
+    )
+
+    etags = serializers.DictField(
+        child=serializers.CharField(max_length=100),
+        required=False,
+        help_text='客户端缓存的各部分 ETag，例如 {"version": "...", "banner": "..."}'
+    )
+
+    _allowed_fields = {'platform', 'version_code', 'types', 'etags'}
+
+    def validate(self, attrs):
+        extra_keys = set(self.initial_data.keys()) - self._allowed_fields
+        if extra_keys:
+            raise serializers.ValidationError(
+                f'不支持的参数: {", ".join(sorted(extra_keys))}'
+            )
+        return attrs
+
+
 class DynamicConfigClientSerializer(serializers.ModelSerializer):
     """
     动态配置客户端序列化器
@@ -0,0 +1,33 @@
+"""
+系统配置信号处理
+数据变更后在事务提交时使进程内快照失效；开启 CONFIG_SCHEDULER_AUTOSTART 时在第一个请求启动调度器线程
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import AppVersion, DynamicConfig
+from .snapshots import app_version_snapshot, dynamic_config_feeds
+
+
+@receiver([post_save, post_delete], sender=AppVersion, dispatch_uid='setting_app_version_changed')
+def app_version_changed(sender, **kwargs):
+    """应用版本变更后递增快照代数"""
+    transaction.on_commit(app_version_snapshot.invalidate)
+
+
+@receiver([post_save, post_delete], sender=DynamicConfig, dispatch_uid='setting_dynamic_config_changed')
+def dynamic_config_changed(sender, **kwargs):
+    """动态配置变更后递增快照代数"""
+    transaction.on_commit(dynamic_config_feeds.invalidate)
+
+
+@receiver(request_started, dispatch_uid='setting_start_config_scheduler')
+def start_config_scheduler(sender, **kwargs):
+    """web 进程处理第一个请求时启动动态配置调度器，迁移等管理命令不会启动"""
+    request_started.disconnect(dispatch_uid='setting_start_config_scheduler')
+    if getattr(settings, 'CONFIG_SCHEDULER', {}).get('AUTOSTART', False):
+        from .scheduler import config_scheduler
+        config_scheduler.start()
@@ -0,0 +1,509 @@
+"""
+系统配置快照
+将应用版本、动态配置等低频变更数据的序列化结果缓存在进程内存中，
+通过共享缓存中的代数（generation）计数器在多个 worker 之间同步失效
+"""
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import Q, Count, Max, Min
+from django.utils import timezone
+
+from utils.cache import TieredCache
+from utils.conditional import make_etag
+from utils.fast_serializer import compile_read_serializer
+from utils.renderers import RawJSON
+from .models import AppVersion, DynamicConfig
+from .serializers import AppVersionSerializer, DynamicConfigClientSerializer
+
+
+class CheckResult(NamedTuple):
+    """版本检查结果"""
+    message: str
+    has_update: bool
+    is_force_update: bool
+    data: RawJSON  # 已编码的检查接口响应数据
+    etag: str  # 启动接口中版本部分的 ETag，只取决于检查结果
+
+
+class VersionEntry(NamedTuple):
+    """单个平台的最新版本快照"""
+    version_code: int
+    is_force_update: bool
+    min_support_version: Optional[int]
+    data: RawJSON  # 已编码的 AppVersionSerializer 数据
+    etag: str
+    last_modified: Optional[datetime]
+    # 检查结果只取决于客户端版本号落在哪个区间：thresholds 为升序的区间分界点，
+    # results[bisect_right(thresholds, version_code)] 为对应的检查结果
+    thresholds: tuple
+    results: tuple
+
+    def check(self, version_code):
+        """客户端版本号对应的检查结果"""
+        return self.results[bisect_right(self.thresholds, version_code)]
+
+
+class ConfigFeed(NamedTuple):
+    """单个配置类型的客户端数据快照"""
+    data: RawJSON  # 已编码的 DynamicConfigClientSerializer 列表
+    expires_at: Optional[datetime]
+    etag: str
+    last_modified: Optional[datetime]
+
+
+setting_cache = TieredCache('setting')
+
+
+class GenerationSnapshot:
+    """基于代数的进程内快照基类
+
+    - 稳态下只读取共享缓存中的代数并做整数比较，不访问数据库
+    - 数据变更后递增代数，各 worker 在下一次请求时重建快照
+    - 重建结果按代数写入共享缓存，同一代数只有一个 worker 回源数据库
+    - 未配置共享缓存时，快照最多保留 max_age 秒，保证多进程最终一致
+    """
+    generation_key = None
+    # 代数在进程内缓存中的保留时间（秒），即其他 worker 感知变更的最大延迟
+    generation_l1_timeout = 1
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age if max_age is not None else getattr(settings, 'SETTING_SNAPSHOT_MAX_AGE', 60)
+        self._lock = threading.Lock()
+        self._generation = None
+
+    @staticmethod
+    def _seed_generation():
+        """代数不存在时的初始值
+
+        代数可能因缓存淘汰或清空而丢失，重新初始化为固定值会与丢失前的某个代数相同，
+        持有该代数的 worker 和共享缓存中该代数的快照会被当作最新数据继续使用；
+        使用纳秒时间戳保证初始值与之前出现过的代数都不相同
+        """
+        return time.time_ns()
+
+    def current_generation(self):
+        """读取共享缓存中的代数，不存在时重新初始化"""
+        generation = setting_cache.get(self.generation_key, l1_timeout=self.generation_l1_timeout)
+        if generation is None:
+            seed = self._seed_generation()
+            setting_cache.add(self.generation_key, seed, timeout=None)
+            generation = setting_cache.get(self.generation_key, seed, l1_timeout=self.generation_l1_timeout)
+        return generation
+
+    async def acurrent_generation(self):
+        """current_generation 的异步版本"""
+        generation = await setting_cache.aget(self.generation_key, l1_timeout=self.generation_l1_timeout)
+        if generation is None:
+            seed = self._seed_generation()
+            await setting_cache.aadd(self.generation_key, seed, timeout=None)
+            generation = await setting_cache.aget(self.generation_key, seed, l1_timeout=self.generation_l1_timeout)
+        return generation
+
+    def invalidate(self):
+        """递增代数，使所有 worker 的快照失效"""
+        try:
+            setting_cache.incr(self.generation_key)
+        except ValueError:
+            # 代数不存在（缓存被清空或尚未初始化），本进程 L1 中可能还有丢失前的代数
+            setting_cache.l1.delete(setting_cache.make_key(self.generation_key))
+            setting_cache.add(self.generation_key, self._seed_generation(), timeout=None)
+        self._generation = None
+
+    def _is_stale(self, built_at):
+        return time.monotonic() - built_at > self.max_age
+
+
+class AppVersionSnapshot(GenerationSnapshot):
+    """应用版本进程内快照
+
+    每个平台（ios、android、all）保存一份最新启用版本及其序列化数据，
+    以及按版本区间预先计算的检查结果，检查接口只需二分查找客户端版本号所在的区间
+    """
+    generation_key = 'app_version:generation'
+    # 快照写入共享缓存，VersionEntry 结构变化时需要修改键名，避免读取到旧版本进程写入的数据
+    snapshot_key = 'app_version:snapshot:v3'
+    platforms = ('ios', 'android', 'all')
+
+    def __init__(self, max_age=None):
+        super().__init__(max_age)
+        self._built_at = 0.0
+        self._entries = {}
+
+    def get(self, platform):
+        """获取指定平台的最新版本快照，没有可用版本时返回 None"""
+        return self.get_all().get(platform)
+
+    def get_all(self):
+        """获取所有平台的最新版本快照 {平台: VersionEntry}"""
+        generation = self.current_generation()
+        if generation != self._generation or self._is_stale(self._built_at):
+            self._rebuild(generation)
+        return self._entries
+
+    async def aget(self, platform):
+        """get 的异步版本，重建快照时使用异步 ORM"""
+        return (await self.aget_all()).get(platform)
+
+    async def aget_all(self):
+        """get_all 的异步版本"""
+        generation = await self.acurrent_generation()
+        if generation != self._generation or self._is_stale(self._built_at):
+            self._entries = await setting_cache.aget_or_set(
+                f'{self.snapshot_key}:{generation}',
+                self._aload,
+                timeout=self.max_age,
+                l1_timeout=0
+            )
+            self._generation = generation
+            self._built_at = time.monotonic()
+        return self._entries
+
+    def _rebuild(self, generation):
+        with self._lock:
+            if self._generation == generation and not self._is_stale(self._built_at):
+                return
+
+            self._entries = setting_cache.get_or_set(
+                f'{self.snapshot_key}:{generation}',
+                self._load,
+                timeout=self.max_age,
+                l1_timeout=0
+            )
+            self._generation = generation
+            self._built_at = time.monotonic()
+
+    def _querysets(self):
+        """快照使用的查询（apps/setting/tests.py 校验其执行计划）
+
+        Returns:
+            tuple: (各平台版本号最大的启用版本查询列表, 按平台统计的行数和最大更新时间)
+        """
+        active_versions = AppVersion.objects.filter(is_delete=False, is_active=True)
+        # 每个平台单独查询，使用 (is_delete, is_active, platform, version_code) 索引倒序取第一条
+        latest_versions = [
+            active_versions.filter(platform=platform).order_by('-version_code')[:1]
+            for platform in self.platforms
+        ]
+        # 按平台统计所有版本（包括已停用和已删除的）的行数和最大更新时间，用于生成 ETag / Last-Modified。
+        # 停用或删除最新版本会更新该行的 update_time，Last-Modified 随之前进；只统计启用版本时
+        # Last-Modified 会回退到上一个版本的更新时间，只带 If-Modified-Since 的客户端会收到 304 并继续使用已撤回的版本。
+        # 使用 (platform, update_time) 覆盖索引
+        stats = AppVersion.objects.filter(platform__in=self.platforms).order_by().values('platform').annotate(
+            count=Count('id'), last_modified=Max('update_time')
+        )
+        return latest_versions, stats
+
+    def _load(self):
+        latest_versions, stats = self._querysets()
+        return self._build_entries([v for queryset in latest_versions for v in queryset], list(stats))
+
+    async def _aload(self):
+        latest_versions, stats = self._querysets()
+        versions = [v for queryset in latest_versions async for v in queryset]
+        return self._build_entries(versions, [row async for row in stats])
+
+    def _build_entries(self, versions, stats_rows):
+        stats = {row['platform']: (row['count'], row['last_modified']) for row in stats_rows}
+        entries = {}
+        for platform in self.platforms:
+            # 平台自身和 all 中版本号较大的一个，版本号相同时优先平台自身
+            latest = max(
+                (v for v in versions if v.platform in (platform, 'all')),
+                key=lambda v: (v.version_code, v.platform == platform),
+                default=None
+            )
+            if latest is None:
+                continue
+            platform_stats = [stats[p] for p in {platform, 'all'} if p in stats]
+            count = sum(item[0] for item in platform_stats)
+            last_modified = max(item[1] for item in platform_stats)
+            data = RawJSON.encode(AppVersionSerializer(latest).data)
+            thresholds, results = self._build_check_results(latest, data)
+            entries[platform] = VersionEntry(
+                version_code=latest.version_code,
+                is_force_update=latest.is_force_update,
+                min_support_version=latest.min_support_version,
+                data=data,
+                etag=make_etag('app_version', platform, count, last_modified.isoformat()),
+                last_modified=last_modified,
+                thresholds=thresholds,
+                results=results,
+            )
+        return entries
+
+    @staticmethod
+    def _build_check_results(latest, data):
+        """预先计算各版本区间的检查结果
+
+        - version_code < min_support_version：有更新，强制更新
+        - version_code < 最新版本号：有更新，是否强制取决于最新版本的 is_force_update
+        - 其余：已是最新版本
+        min_support_version 为空或大于最新版本号时，低于最新版本号的客户端都按前两条规则判断
+        """
+        update = _make_check_result(
+            '发现新版本，请立即更新' if latest.is_force_update else '发现新版本',
+            True, latest.is_force_update, data
+        )
+        thresholds, results = (latest.version_code,), (update, UP_TO_DATE)
+        if latest.min_support_version:
+            force_below = min(latest.min_support_version, latest.version_code)
+            force = _make_check_result('发现新版本，请立即更新', True, True, data)
+            thresholds, results = (force_below,) + thresholds, (force,) + results
+        return thresholds, results
+
+
+class DynamicConfigFeeds(GenerationSnapshot):
+    """动态配置客户端数据快照
+
+    每个配置类型保存一份已序列化的有效配置列表，并记录下一个
+    start_time / end_time 边界；边界到达或后台修改配置前直接返回快照
+    """
+    generation_key = 'dynamic_config:generation'
+    config_types = tuple(choice for choice, _ in DynamicConfig.TYPE_CHOICES)
+
+    def __init__(self, max_age=None):
+        super().__init__(max_age)
+        # {config_type: (ConfigFeed, 本进程获取时间)}
+        self._feeds = {}
+
+    def get(self, config_type):
+        """获取指定类型当前有效的配置快照"""
+        generation = self.current_generation()
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    self._feeds = {}
+                    self._generation = generation
+
+        now = timezone.now()
+        cached = self._feeds.get(config_type)
+        if cached is None or self._is_expired(cached, now):
+            with self._lock:
+                cached = self._feeds.get(config_type)
+                if cached is None or self._is_expired(cached, now):
+                    cached = (self._build(config_type, generation, now), time.monotonic())
+                    self._feeds[config_type] = cached
+        return cached[0]
+
+    async def aget(self, config_type):
+        """get 的异步版本，重建快照时使用异步 ORM"""
+        generation = await self.acurrent_generation()
+        if generation != self._generation:
+            self._feeds = {}
+            self._generation = generation
+
+        now = timezone.now()
+        cached = self._feeds.get(config_type)
+        if cached is None or self._is_expired(cached, now):
+            cached = (await self._abuild(config_type, generation, now), time.monotonic())
+            self._feeds[config_type] = cached
+        return cached[0]
+
+    def _is_expired(self, cached, now):
+        feed, built_at = cached
+        if feed.expires_at is not None and now >= feed.expires_at:
+            return True
+        return self._is_stale(built_at)
+
+    def _build(self, config_type, generation, now):
+        key = f'dynamic_config:feed:{generation}:{config_type}'
+        feed = setting_cache.get_or_set(
+            key, lambda: self._load(config_type, now), timeout=self.max_age, l1_timeout=0
+        )
+        if feed.expires_at is not None and now >= feed.expires_at:
+            # 共享缓存中的快照已越过边界，重新构建
+            setting_cache.delete(key)
+            feed = setting_cache.get_or_set(
+                key, lambda: self._load(config_type, now), timeout=self.max_age, l1_timeout=0
+            )
+        return feed
+
+    async def _abuild(self, config_type, generation, now):
+        key = f'dynamic_config:feed:{generation}:{config_type}'
+        feed = await setting_cache.aget_or_set(
+            key, lambda: self._aload(config_type, now), timeout=self.max_age, l1_timeout=0
+        )
+        if feed.expires_at is not None and now >= feed.expires_at:
+            # 共享缓存中的快照已越过边界，重新构建
+            await setting_cache.adelete(key)
+            feed = await setting_cache.aget_or_set(
+                key, lambda: self._aload(config_type, now), timeout=self.max_age, l1_timeout=0
+            )
+        return feed
+
+    def _querysets(self, config_type, now):
+        """快照使用的查询（apps/setting/tests.py 校验其执行计划）
+
+        Returns:
+            tuple: (当前有效的配置, 下一个开始时间和最近一次过期时间的聚合查询，最多一行)
+        """
+        active_configs = DynamicConfig.objects.filter(
+            type=config_type,
+            is_active=True,
+            is_delete=False
+        )
+
+        # 有效期为单个范围条件，使用 (type, is_active, is_delete, valid_from, valid_until, sort_order) 索引
+        configs = active_configs.filter(DynamicConfig.valid_at(now)).order_by('sort_order', '-create_time')
+        # 尚未开始的配置中最早的开始时间为下一个边界；最近一次过期时间和该类型所有配置（包括已停用和已删除的）
+        # 的最大更新时间用于 Last-Modified，停用或删除配置后 Last-Modified 不会回退
+        active = Q(is_active=True, is_delete=False)
+        boundaries = DynamicConfig.objects.filter(type=config_type).order_by().values('type').annotate(
+            next_start=Min('valid_from', filter=active & Q(valid_from__gt=now)),
+            last_expired=Max('valid_until', filter=active & Q(valid_until__lt=now)),
+            last_updated=Max('update_time'),
+        ).values('next_start', 'last_expired', 'last_updated')
+        return configs, boundaries
+
+    def _rows(self, configs):
+        """只查询客户端字段和计算边界需要的列"""
+        compiled = compile_read_serializer(DynamicConfigClientSerializer)
+        columns = compiled.columns if compiled else tuple(DynamicConfigClientSerializer.Meta.fields)
+        return configs.values(*dict.fromkeys(columns + ('start_time', 'end_time', 'update_time')))
+
+    def _load(self, config_type, now):
+        configs, boundaries = self._querysets(config_type, now)
+        boundaries = next(iter(boundaries), {})
+        return self._build_feed(config_type, now, list(self._rows(configs)), **boundaries)
+
+    async def _aload(self, config_type, now):
+        configs, boundaries = self._querysets(config_type, now)
+        rows = [c async for c in self._rows(configs)]
+        boundaries = next(iter([row async for row in boundaries]), {})
+        return self._build_feed(config_type, now, rows, **boundaries)
+
+    def _build_feed(self, config_type, now, valid_configs, next_start=None, last_expired=None, last_updated=None):
+        # 有效期包含 end_time，超过之后失效；未开始的配置在 start_time 生效
+        boundaries = [c['end_time'] + timedelta(microseconds=1) for c in valid_configs if c['end_time']]
+        if next_start is not None:
+            boundaries.append(next_start)
+
+        compiled = compile_read_serializer(DynamicConfigClientSerializer)
+        if compiled is not None:
+            data = compiled.serialize(valid_configs)
+        else:
+            data = [dict(item) for item in DynamicConfigClientSerializer(valid_configs, many=True).data]
+        expires_at = min(boundaries) if boundaries else None
+
+        # 最后修改时间取该类型所有配置的最大更新时间、有效配置的生效时间以及最近一次过期时间中的最大值，
+        # 保证配置被修改、停用、删除或因时间到达而上下线时 Last-Modified 随之前进
+        candidates = [c['update_time'] for c in valid_configs]
+        candidates += [c['start_time'] for c in valid_configs if c['start_time']]
+        candidates += [value for value in (last_expired, last_updated) if value]
+        last_modified = max(candidates) if candidates else None
+
+        return ConfigFeed(
+            data=RawJSON.encode(data),
+            expires_at=expires_at,
+            etag=make_etag(
+                'dynamic_config',
+                config_type,
+                len(valid_configs),
+                last_modified.isoformat() if last_modified else None,
+                expires_at.isoformat() if expires_at else None,
+            ),
+            last_modified=last_modified,
+        )
+
+
+def _make_check_result(message, has_update, is_force_update, latest_version):
+    data = RawJSON.encode({
+        'has_update': has_update,
+        'is_force_update': is_force_update,
+        'latest_version': latest_version,
+    })
+    return CheckResult(
+        message=message,
+        has_update=has_update,
+        is_force_update=is_force_update,
+        data=data,
+        etag=make_etag('version_check', message, data.content.decode()),
+    )
+
+
+# 已是最新版本或没有版本配置
+UP_TO_DATE = _make_check_result('当前已是最新版本', False, False, None)
+
+
+def build_check_result(entry, current_version_code):
+    """根据快照计算版本检查结果
+
+    Args:
+        entry: 最新版本快照，没有版本配置时为 None
+        current_version_code: 客户端当前版本号
+
+    Returns:
+        tuple: (提示信息, 响应数据)
+    """
+    result = entry.check(current_version_code) if entry is not None else UP_TO_DATE
+    return result.message, result.data
+
+
+def build_batch_check_result(entries, items):
+    """批量版本检查
+
+    Args:
+        entries: 各平台最新版本快照（AppVersionSnapshot.get_all）
+        items: [(平台, 客户端版本号), ...]
+
+    Returns:
+        dict: results 与 items 顺序一致；latest_versions 为涉及到的平台的最新版本信息，每个平台只返回一次
+    """
+    results = []
+    for platform, version_code in items:
+        entry = entries.get(platform)
+        result = entry.check(version_code) if entry is not None else UP_TO_DATE
+        results.append({
+            'platform': platform,
+            'version_code': version_code,
+            'has_update': result.has_update,
+            'is_force_update': result.is_force_update,
+            'message': result.message,
+        })
+
+    latest_versions = {}
+    for platform, _ in items:
+        if platform not in latest_versions:
+            entry = entries.get(platform)
+            latest_versions[platform] = entry.data if entry is not None else None
+    return {'results': results, 'latest_versions': latest_versions}
+
+
+def _bootstrap_section(etag, data, client_etag):
+    # 压缩后响应头中的 ETag 为弱 ETag，客户端可能原样带回
+    not_modified = client_etag is not None and client_etag.removeprefix('W/') == etag
+    return {'etag': etag, 'not_modified': not_modified, 'data': None if not_modified else data}
+
+
+def build_bootstrap_result(entry, version_code, feeds, etags):
+    """启动接口数据，由版本快照和配置快照组合而成
+
+    Args:
+        entry: 客户端平台的最新版本快照，没有版本配置时为 None
+        version_code: 客户端当前版本号
+        feeds: {配置类型: ConfigFeed}
+        etags: 客户端缓存的各部分 ETag {'version' 或配置类型: ETag}
+
+    Returns:
+        dict: version 和 configs 中的每一部分为 {etag, not_modified, data}，
+        ETag 与客户端一致时 not_modified 为 true 且 data 为 null；version 另有 message
+    """
+    result = entry.check(version_code) if entry is not None else UP_TO_DATE
+    version = _bootstrap_section(result.etag, result.data, etags.get('version'))
+    version['message'] = result.message
+    return {
+        'version': version,
+        'configs': {
+            config_type: _bootstrap_section(feed.etag, feed.data, etags.get(config_type))
+            for config_type, feed in feeds.items()
+        },
+    }
+
+
+app_version_snapshot = AppVersionSnapshot()
+dynamic_config_feeds = DynamicConfigFeeds()
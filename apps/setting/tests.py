@@ -1,3 +1,886 @@
-from django.test import TestCase
+import json
+import re
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.user.models import User
+from apps.user.tokens import RefreshToken
+from utils.authentication import OptionalJWTAuthentication
+
+from . import async_views
+from .scheduler import ConfigScheduler, log as scheduler_log
+from .models import AppVersion, DynamicConfig
+from .serializers import VersionBatchCheckRequestSerializer, VersionCheckRequestSerializer
+from .snapshots import AppVersionSnapshot, DynamicConfigFeeds, app_version_snapshot, dynamic_config_feeds, setting_cache
+from .views import AppVersionViewSet
+
+
+class SnapshotCacheMixin:
+    """每个用例从空的共享缓存和进程内快照开始，避免用例之间互相影响"""
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        setting_cache.l1.clear()
+        for snapshot in (app_version_snapshot, dynamic_config_feeds):
+            snapshot._generation = None
+
+    def create_version(self, **kwargs):
+        kwargs.setdefault('platform', 'ios')
+        kwargs.setdefault('version_name', f'1.0.{kwargs["version_code"]}')
+        kwargs.setdefault('title', f'版本 {kwargs["version_code"]}')
+        kwargs.setdefault('description', '更新说明')
+        kwargs.setdefault('download_url', 'https://example.com/app')
+        return AppVersion.objects.create(**kwargs)
+
+    def check(self, platform, version_code):
+        response = self.client.post(
+            '/setting/versions/check/',
+            {'platform': platform, 'version_code': version_code},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+
+class QueryPlanAssertionsMixin:
+    """基于 EXPLAIN 的执行计划断言，支持 MySQL（JSON 格式）和 SQLite（EXPLAIN QUERY PLAN）
+
+    - assertUsesIndex: 查询涉及的每张表都通过索引访问，不能全表扫描
+    - assertNoFilesort: 排序和分组不能额外排序（MySQL Using filesort / SQLite USE TEMP B-TREE）
+    """
+
+    def explain(self, queryset):
+        if connection.vendor == 'mysql':
+            return json.loads(queryset.explain(format='json'))
+        return queryset.explain()
+
+    def _mysql_nodes(self, plan):
+        """遍历 JSON 执行计划中的所有节点"""
+        if isinstance(plan, dict):
+            yield plan
+            for value in plan.values():
+                yield from self._mysql_nodes(value)
+        elif isinstance(plan, list):
+            for value in plan:
+                yield from self._mysql_nodes(value)
+
+    def assertUsesIndex(self, queryset):
+        plan = self.explain(queryset)
+        if connection.vendor == 'mysql':
+            tables = [node for node in self._mysql_nodes(plan) if 'table_name' in node]
+            self.assertTrue(tables, f'执行计划中没有访问任何表：\n{json.dumps(plan, indent=2)}')
+            for table in tables:
+                self.assertNotEqual(table.get('access_type'), 'ALL', f'全表扫描 {table["table_name"]}：\n{queryset.query}')
+                self.assertTrue(table.get('key'), f'{table["table_name"]} 没有使用索引：\n{queryset.query}')
+        else:
+            for line in plan.splitlines():
+                match = re.search(r'\bSCAN (\S+)(.*)', line)
+                if match and 'INDEX' not in match.group(2):
+                    self.fail(f'全表扫描 {match.group(1)}：\n{plan}\n{queryset.query}')
+
+    def assertNoFilesort(self, queryset):
+        plan = self.explain(queryset)
+        if connection.vendor == 'mysql':
+            for node in self._mysql_nodes(plan):
+                self.assertFalse(node.get('using_filesort'), f'使用了 filesort：\n{queryset.query}')
+        else:
+            self.assertNotIn('USE TEMP B-TREE', plan, f'使用了临时排序：\n{plan}\n{queryset.query}')
+
+
+@skipUnless(connection.vendor in ('mysql', 'sqlite'), '执行计划断言只支持 MySQL 和 SQLite')
+class AppVersionQueryPlanTest(QueryPlanAssertionsMixin, TestCase):
+    """版本快照（versions/check、versions/batch_check、versions/latest）查询的执行计划"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 大部分版本已停用或已删除，与线上数据分布一致，优化器才会选择索引
+        AppVersion.objects.bulk_create([
+            AppVersion(
+                platform=('ios', 'android', 'all')[index % 3],
+                version_code=index + 1,
+                version_name=f'1.{index}.0',
+                title=f'版本 {index}',
+                description='更新说明',
+                is_active=index % 10 == 0,
+                is_delete=index % 7 == 0,
+            )
+            for index in range(300)
+        ])
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(f'ANALYZE TABLE {AppVersion._meta.db_table}')
+            else:
+                cursor.execute('ANALYZE')
+
+    def test_latest_version_queries(self):
+        latest_versions, _ = AppVersionSnapshot()._querysets()
+        for queryset in latest_versions:
+            self.assertUsesIndex(queryset)
+            self.assertNoFilesort(queryset)
+
+    def test_stats_query(self):
+        _, stats = AppVersionSnapshot()._querysets()
+        self.assertUsesIndex(stats)
+        self.assertNoFilesort(stats)
+
+    def test_queries_exclude_deleted_versions(self):
+        AppVersion.objects.filter(platform='ios').update(is_active=True, is_delete=True)
+        latest_versions, stats = AppVersionSnapshot()._querysets()
+        self.assertEqual(list(latest_versions[0]), [])
+        # Last-Modified 统计包括已删除的版本，删除后不会回退
+        self.assertIn('ios', [row['platform'] for row in stats])
+
+
+@skipUnless(connection.vendor in ('mysql', 'sqlite'), '执行计划断言只支持 MySQL 和 SQLite')
+class DynamicConfigQueryPlanTest(QueryPlanAssertionsMixin, TestCase):
+    """动态配置快照（configs/get_by_type）查询的执行计划"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        configs = []
+        for index in range(300):
+            # 依次为：未设置时间、已过期、未开始、正在生效
+            start_time, end_time = (
+                (None, None),
+                (now - timedelta(days=30), now - timedelta(days=index + 1)),
+                (now + timedelta(days=index + 1), None),
+                (now - timedelta(days=1), now + timedelta(days=1)),
+            )[index % 4]
+            configs.append(DynamicConfig(
+                type=('banner', 'activity', 'setting')[index % 3],
+                title=f'配置 {index}',
+                sort_order=index,
+                is_active=index % 5 != 0,
+                start_time=start_time,
+                end_time=end_time,
+            ))
+        DynamicConfig.objects.bulk_create(configs)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(f'ANALYZE TABLE {DynamicConfig._meta.db_table}')
+            else:
+                cursor.execute('ANALYZE')
+
+    def test_valid_configs_query(self):
+        configs, _ = DynamicConfigFeeds()._querysets('banner', timezone.now())
+        self.assertUsesIndex(configs)
+
+    def test_boundaries_query(self):
+        _, boundaries = DynamicConfigFeeds()._querysets('banner', timezone.now())
+        self.assertUsesIndex(boundaries)
+        self.assertNoFilesort(boundaries)
+
+    def test_valid_configs_match_is_valid_time(self):
+        now = timezone.now()
+        for config_type, _ in DynamicConfig.TYPE_CHOICES:
+            configs, _ = DynamicConfigFeeds()._querysets(config_type, now)
+            expected = [
+                config.pk
+                for config in DynamicConfig.objects.filter(type=config_type, is_active=True, is_delete=False)
+                if config.is_valid_time(now)
+            ]
+            self.assertCountEqual([config.pk for config in configs], expected)
+
+
+class DynamicConfigValidityTest(TestCase):
+    """有效期边界由数据库生成，任何写入方式都与 start_time / end_time 一致"""
+
+    def assertBoundsMatch(self, config):
+        config.refresh_from_db()
+        self.assertEqual(
+            (config.valid_from, config.valid_until),
+            DynamicConfig.validity_bounds(config.start_time, config.end_time)
+        )
+
+    def test_bulk_writes_keep_bounds(self):
+        now = timezone.now()
+        config, = DynamicConfig.objects.bulk_create([DynamicConfig(type='banner', title='配置', start_time=now)])
+        config = DynamicConfig.objects.get(title='配置')
+        self.assertBoundsMatch(config)
+
+        DynamicConfig.objects.filter(pk=config.pk).update(start_time=None, end_time=now)
+        self.assertBoundsMatch(config)
+
+        config.start_time, config.end_time = now - timedelta(days=1), None
+        DynamicConfig.objects.bulk_update([config], ['start_time', 'end_time'])
+        self.assertBoundsMatch(config)
+
+    def test_save_fills_validity_bounds(self):
+        now = timezone.now()
+        config = DynamicConfig.objects.create(type='banner', title='配置')
+        self.assertTrue(config.is_valid_time(now))
+        self.assertTrue(DynamicConfig.objects.filter(DynamicConfig.valid_at(now), pk=config.pk).exists())
+
+        config.end_time = now - timedelta(seconds=1)
+        config.save(update_fields=['end_time'])
+        self.assertFalse(config.is_valid_time(now))
+        self.assertFalse(DynamicConfig.objects.filter(DynamicConfig.valid_at(now), pk=config.pk).exists())
+
+        config.start_time, config.end_time = now + timedelta(days=1), None
+        config.save()
+        config.refresh_from_db()
+        self.assertEqual((config.valid_from, config.valid_until), DynamicConfig.validity_bounds(now + timedelta(days=1), None))
+
+    def test_validity_bounds_are_inclusive(self):
+        start_time = timezone.now()
+        end_time = start_time + timedelta(seconds=1)
+        config = DynamicConfig.objects.create(type='banner', title='配置', start_time=start_time, end_time=end_time)
+        for now in (start_time, end_time):
+            self.assertTrue(config.is_valid_time(now))
+            self.assertTrue(DynamicConfig.objects.filter(DynamicConfig.valid_at(now), pk=config.pk).exists())
+
+
+class VersionBatchCheckRequestTest(TestCase):
+    """批量版本检查的参数校验"""
+
+    def test_version_code_matches_check(self):
+        for version_code in (100, '100', 100.0, ' 100 '):
+            single = VersionCheckRequestSerializer(data={'platform': 'ios', 'version_code': version_code})
+            batch = VersionBatchCheckRequestSerializer(data={
+                'items': [{'platform': 'ios', 'version_code': version_code}]
+            })
+            self.assertTrue(single.is_valid(), version_code)
+            self.assertTrue(batch.is_valid(), version_code)
+            self.assertEqual(batch.validated_data['items'], [('ios', single.validated_data['version_code'])])
+
+    def test_malformed_items(self):
+        client = APIClient()
+        for item in (
+            {'platform': ['ios'], 'version_code': 1},
+            {'platform': {'ios': 1}, 'version_code': 1},
+            {'platform': 'web', 'version_code': 1},
+            {'platform': 'ios'},
+            {'platform': 'ios', 'version_code': None},
+            {'platform': 'ios', 'version_code': 0},
+            {'platform': 'ios', 'version_code': 1.5},
+            {'platform': 'ios', 'version_code': 'abc'},
+            {'platform': 'ios', 'version_code': [1]},
+        ):
+            response = client.post('/setting/versions/batch_check/', {'items': [item]}, format='json')
+            self.assertEqual(response.status_code, 400, item)
+
+
+class VersionCheckBandTest(SnapshotCacheMixin, TestCase):
+    """版本检查的区间边界：min_support_version 低于、等于、高于最新版本号和为空，check 与 batch_check 结果一致"""
+
+    UPDATE = ('发现新版本', True, False)
+    FORCE = ('发现新版本，请立即更新', True, True)
+    LATEST = ('当前已是最新版本', False, False)
+    version_codes = (1, 49, 50, 51, 99, 100, 101, 150, 151)
+
+    def set_latest(self, min_support_version, is_force_update=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            AppVersion.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_version(version_code=100, min_support_version=min_support_version, is_force_update=is_force_update)
+
+    def check_result(self, version_code):
+        response = self.client.post(
+            '/setting/versions/check/', {'platform': 'ios', 'version_code': version_code}, content_type='application/json'
+        )
+        data = response.json()
+        return data['message'], data['data']['has_update'], data['data']['is_force_update']
+
+    def batch_results(self):
+        response = self.client.post(
+            '/setting/versions/batch_check/',
+            {'items': [{'platform': 'ios', 'version_code': code} for code in self.version_codes]},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [
+            (item['message'], item['has_update'], item['is_force_update'])
+            for item in response.json()['data']['results']
+        ]
+
+    def test_bands(self):
+        update, force, latest = self.UPDATE, self.FORCE, self.LATEST
+        for min_support_version, is_force_update, expected in (
+            (None, False, {1: update, 99: update, 100: latest, 101: latest}),
+            (0, False, {1: update, 99: update, 100: latest}),
+            (None, True, {1: force, 99: force, 100: latest}),
+            (50, False, {1: force, 49: force, 50: update, 51: update, 99: update, 100: latest, 101: latest}),
+            (50, True, {49: force, 50: force, 99: force, 100: latest}),
+            (100, False, {1: force, 99: force, 100: latest, 101: latest}),
+            (150, False, {1: force, 99: force, 100: latest, 149: latest, 150: latest, 151: latest}),
+        ):
+            with self.subTest(min_support_version=min_support_version, is_force_update=is_force_update):
+                self.set_latest(min_support_version, is_force_update)
+                for version_code, result in expected.items():
+                    self.assertEqual(self.check_result(version_code), result, version_code)
+
+    def test_batch_check_matches_check(self):
+        for min_support_version in (None, 50, 100, 150):
+            with self.subTest(min_support_version=min_support_version):
+                self.set_latest(min_support_version)
+                self.assertEqual(self.batch_results(), [self.check_result(code) for code in self.version_codes])
+
+        # 没有版本配置时都是最新版本
+        with self.captureOnCommitCallbacks(execute=True):
+            AppVersion.objects.all().delete()
+        self.assertEqual(self.batch_results(), [self.LATEST] * len(self.version_codes))
+        self.assertEqual(self.check_result(1), self.LATEST)
+
+
+class AppVersionSnapshotTest(SnapshotCacheMixin, TestCase):
+    """版本变更在事务提交后递增代数，versions/check 随即返回新版本"""
+
+    def test_changes_invalidate_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_version(version_code=100)
+        self.assertEqual(self.check('ios', 100)['has_update'], False)
+
+        generation = app_version_snapshot.current_generation()
+        with self.captureOnCommitCallbacks() as callbacks:
+            version = self.create_version(version_code=101)
+        # 提交前不失效，快照仍为旧版本
+        self.assertEqual(app_version_snapshot.current_generation(), generation)
+        self.assertEqual(self.check('ios', 100)['has_update'], False)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(app_version_snapshot.current_generation(), generation + 1)
+        data = self.check('ios', 100)
+        self.assertTrue(data['has_update'])
+        self.assertEqual(data['latest_version']['version_code'], 101)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            version.is_active = False
+            version.save()
+        self.assertEqual(self.check('ios', 100)['has_update'], False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            version.delete()
+        self.assertEqual(app_version_snapshot.current_generation(), generation + 3)
+        self.assertEqual(app_version_snapshot.get('ios').version_code, 100)
+
+
+class DynamicConfigFeedsTest(SnapshotCacheMixin, TestCase):
+    """配置快照在有效期边界重建，配置保存后在事务提交时失效"""
+
+    def titles(self, feed):
+        return [item['title'] for item in json.loads(feed.data.content)]
+
+    def test_rebuild_at_expires_at(self):
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            ending = DynamicConfig.objects.create(type='banner', title='即将结束', end_time=now + timedelta(hours=1))
+            starting = DynamicConfig.objects.create(type='banner', title='即将开始', start_time=now + timedelta(hours=2))
+
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            feed = dynamic_config_feeds.get('banner')
+        self.assertEqual(self.titles(feed), ['即将结束'])
+        self.assertEqual(feed.expires_at, ending.end_time + timedelta(microseconds=1))
+
+        # 边界之前复用快照，不访问数据库
+        with mock.patch('django.utils.timezone.now', return_value=ending.end_time), self.assertNumQueries(0):
+            self.assertIs(dynamic_config_feeds.get('banner'), feed)
+
+        with mock.patch('django.utils.timezone.now', return_value=feed.expires_at):
+            feed = dynamic_config_feeds.get('banner')
+        self.assertEqual(self.titles(feed), [])
+        self.assertEqual(feed.expires_at, starting.start_time)
+
+        with mock.patch('django.utils.timezone.now', return_value=starting.start_time):
+            feed = dynamic_config_feeds.get('banner')
+        self.assertEqual(self.titles(feed), ['即将开始'])
+        self.assertIsNone(feed.expires_at)
+
+    def test_save_invalidates_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            config = DynamicConfig.objects.create(type='banner', title='旧标题')
+        feed = dynamic_config_feeds.get('banner')
+        self.assertEqual(self.titles(feed), ['旧标题'])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            config.title = '新标题'
+            config.save()
+        self.assertIs(dynamic_config_feeds.get('banner'), feed)
+
+        for callback in callbacks:
+            callback()
+        feed = dynamic_config_feeds.get('banner')
+        self.assertEqual(self.titles(feed), ['新标题'])
+        # 其他类型不受影响
+        self.assertEqual(self.titles(dynamic_config_feeds.get('activity')), [])
+
+
+class ConfigSchedulerTest(SnapshotCacheMixin, TestCase):
+    """动态配置调度器：边界堆、越过上下线边界刷新快照、配置变更后不遗漏边界、多进程只触发一次"""
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.scheduler = ConfigScheduler(poll_interval=0.01)
+        # 上下线 INFO 日志输出到控制台，测试中关闭
+        patcher = mock.patch.object(scheduler_log, 'disabled', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def at(self, minutes):
+        return self.now + timedelta(minutes=minutes)
+
+    def create_config(self, **kwargs):
+        kwargs.setdefault('type', 'banner')
+        with self.captureOnCommitCallbacks(execute=True):
+            return DynamicConfig.objects.create(**kwargs)
+
+    def run_pending(self, minutes, scheduler=None):
+        """在指定时间处理边界，快照按同一时间重建"""
+        now = self.at(minutes)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            return (scheduler or self.scheduler).run_pending(now=now)
+
+    def titles(self, config_type='banner'):
+        with mock.patch('django.utils.timezone.now', return_value=self.scheduler._checked_at):
+            return [item['title'] for item in json.loads(dynamic_config_feeds.get(config_type).data.content)]
+
+    def test_load_boundaries(self):
+        self.create_config(title='未开始', start_time=self.at(10))
+        self.create_config(title='进行中', start_time=self.at(-10), end_time=self.at(20))
+        self.create_config(type='activity', title='未开始且会结束', start_time=self.at(30), end_time=self.at(40))
+        self.create_config(title='已结束', end_time=self.at(-1))
+        self.create_config(title='长期有效')
+        self.create_config(title='未启用', start_time=self.at(5), is_active=False)
+        self.create_config(title='已删除', start_time=self.at(5), is_delete=True)
+        # 重复的边界只保留一个
+        self.create_config(title='同时开始', start_time=self.at(10))
+
+        self.scheduler.load(self.now)
+        self.assertEqual(sorted(self.scheduler._heap), [
+            (self.at(10), 'banner'),
+            (self.at(20) + timedelta(microseconds=1), 'banner'),
+            (self.at(30), 'activity'),
+            (self.at(40) + timedelta(microseconds=1), 'activity'),
+        ])
+        self.assertEqual(self.scheduler.next_boundary(), self.at(10))
+
+    def test_start_and_end_boundaries(self):
+        self.create_config(title='限时', start_time=self.at(10), end_time=self.at(20))
+        self.assertEqual(self.run_pending(0), set())
+        self.assertEqual(self.titles(), [])
+
+        self.assertEqual(self.run_pending(9), set())
+        self.assertEqual(self.run_pending(10), {'banner'})
+        self.assertEqual(self.titles(), ['限时'])
+        self.assertEqual(self.run_pending(15), set())
+
+        # 有效期包含 end_time，之后 1 微秒下线
+        self.assertEqual(self.run_pending(20), set())
+        self.assertEqual(self.run_pending(21), {'banner'})
+        self.assertEqual(self.titles(), [])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_reload_from_checked_at(self):
+        self.create_config(title='限时', start_time=self.at(10), end_time=self.at(20))
+        self.run_pending(0)
+
+        # 两次检查之间新增的配置已经开始，重新加载时从上一次检查的时间开始，不会遗漏
+        self.create_config(type='activity', title='活动', start_time=self.at(3))
+        with mock.patch.object(self.scheduler, 'load', wraps=self.scheduler.load) as load:
+            self.assertEqual(self.run_pending(5), {'activity'})
+        load.assert_called_once_with(self.at(0))
+        self.assertEqual(self.titles('activity'), ['活动'])
+
+        # 调度器自己递增代数后同样重新加载，已处理的边界不再触发，未到达的边界保留
+        with mock.patch.object(self.scheduler, 'load', wraps=self.scheduler.load) as load:
+            self.assertEqual(self.run_pending(10), {'banner'})
+            self.assertEqual(self.run_pending(15), set())
+        self.assertEqual(load.call_args_list, [mock.call(self.at(5)), mock.call(self.at(10))])
+        self.assertEqual(self.scheduler.next_boundary(), self.at(20) + timedelta(microseconds=1))
+        self.assertEqual(self.run_pending(21), {'banner'})
+
+    def test_edit_between_checks_keeps_boundary(self):
+        config = self.create_config(title='限时', start_time=self.at(10), end_time=self.at(20))
+        self.run_pending(0)
+        self.assertEqual(self.run_pending(10), {'banner'})
+
+        # 结束时间提前到两次检查之间
+        with self.captureOnCommitCallbacks(execute=True):
+            config.end_time = self.at(12)
+            config.save()
+        self.assertEqual(self.run_pending(14), {'banner'})
+        self.assertEqual(self.titles(), [])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_boundary_claimed_by_one_process(self):
+        self.create_config(title='限时', start_time=self.at(10))
+        other = ConfigScheduler()
+        self.run_pending(0)
+        self.run_pending(0, other)
+
+        generation = dynamic_config_feeds.current_generation()
+        with mock.patch.object(dynamic_config_feeds, 'invalidate', wraps=dynamic_config_feeds.invalidate) as invalidate:
+            self.assertEqual(self.run_pending(10), {'banner'})
+            self.assertEqual(self.run_pending(11, other), set())
+        invalidate.assert_called_once_with()
+        self.assertEqual(dynamic_config_feeds.current_generation(), generation + 1)
+        self.assertEqual(len(other), 0)
+
+    def test_start_and_stop(self):
+        called = threading.Event()
+        with mock.patch.object(self.scheduler, 'run_pending', side_effect=lambda: called.set()):
+            self.scheduler.start()
+            thread = self.scheduler._thread
+            self.scheduler.start()
+            self.assertIs(self.scheduler._thread, thread)
+            self.assertTrue(called.wait(1))
+            self.scheduler.stop(timeout=1)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.scheduler._thread)
+
+        # 停止后可以重新启动
+        with mock.patch.object(self.scheduler, 'run_pending'):
+            self.scheduler.start()
+            self.assertIsNot(self.scheduler._thread, thread)
+            self.scheduler.stop(timeout=1)
+
+    def test_failure_forces_reload(self):
+        self.scheduler._generation = dynamic_config_feeds.current_generation()
+
+        def fail():
+            self.scheduler._stop.set()
+            raise ConnectionError
+
+        with mock.patch.object(self.scheduler, 'run_pending', side_effect=fail), \
+                mock.patch.object(scheduler_log, 'disabled', False), \
+                self.assertLogs('apps.setting.scheduler', 'ERROR'):
+            self.scheduler.run_forever()
+        self.assertIsNone(self.scheduler._generation)
+
+
+class GenerationSeedTest(SnapshotCacheMixin, TestCase):
+    """代数丢失后重新初始化的值不能与之前的代数相同，否则会继续使用变更前的快照"""
+
+    def test_evicted_generation_is_not_reused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_version(version_code=100)
+        # 另一个 worker 的快照
+        worker = AppVersionSnapshot()
+        self.assertEqual(worker.get('ios').version_code, 100)
+        generation = worker._generation
+
+        # 代数被淘汰后版本变更，invalidate 重新初始化代数
+        setting_cache.delete(AppVersionSnapshot.generation_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_version(version_code=101)
+        self.assertNotEqual(app_version_snapshot.current_generation(), generation)
+        self.assertEqual(worker.get('ios').version_code, 101)
+        self.assertTrue(self.check('ios', 100)['has_update'])
+
+    def test_flushed_generation_is_not_reused(self):
+        generations = {app_version_snapshot.current_generation()}
+        for _ in range(3):
+            caches['default'].clear()
+            setting_cache.l1.clear()
+            generation = app_version_snapshot.current_generation()
+            self.assertNotIn(generation, generations)
+            generations.add(generation)
+
+
+class LastModifiedTest(SnapshotCacheMixin, TestCase):
+    """停用最新的版本或配置后 Last-Modified 不能回退，只带 If-Modified-Since 的客户端不能收到 304"""
+
+    def create_at(self, when, factory, **kwargs):
+        with mock.patch('django.utils.timezone.now', return_value=when), self.captureOnCommitCallbacks(execute=True):
+            return factory(**kwargs)
+
+    def assertModifiedAfterDeactivating(self, url, instance):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        last_modified = response['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.is_active = False
+            instance.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+        return response
+
+    def test_deactivating_latest_version(self):
+        now = timezone.now()
+        self.create_at(now - timedelta(days=2), self.create_version, version_code=100)
+        latest = self.create_at(now - timedelta(days=1), self.create_version, version_code=101)
+        response = self.assertModifiedAfterDeactivating('/setting/versions/latest/?platform=ios', latest)
+        self.assertEqual(response.json()['data']['version_code'], 100)
+
+    def test_deactivating_config(self):
+        now = timezone.now()
+        self.create_at(now - timedelta(days=2), DynamicConfig.objects.create, type='banner', title='旧配置')
+        config = self.create_at(now - timedelta(days=1), DynamicConfig.objects.create, type='banner', title='新配置')
+        response = self.assertModifiedAfterDeactivating('/setting/configs/get_by_type/?type=banner', config)
+        self.assertEqual([item['title'] for item in response.json()['data']], ['旧配置'])
+
+
+class LazyAuthenticationTest(SnapshotCacheMixin, TestCase):
+    """公共接口不在请求开始时校验 token：无效或过期的 token 不影响访问，访问 request.user 时才认证"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alice', password='secret123')
+        DynamicConfig.objects.create(type='banner', title='配置')
+
+    def tokens(self):
+        expired = RefreshToken.for_user(self.user).access_token
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        return 'invalid', str(expired)
+
+    def test_public_routes_ignore_bad_tokens(self):
+        with mock.patch.object(
+            OptionalJWTAuthentication, 'authenticate', autospec=True, side_effect=OptionalJWTAuthentication.authenticate
+        ) as authenticate:
+            for token in self.tokens():
+                headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+                self.assertEqual(self.client.get('/setting/configs/get_by_type/?type=banner', **headers).status_code, 200)
+                self.assertEqual(self.client.get('/setting/versions/latest/?platform=ios', **headers).status_code, 404)
+                response = self.client.post(
+                    '/setting/versions/check/', {'platform': 'ios', 'version_code': 1},
+                    content_type='application/json', **headers
+                )
+                self.assertEqual(response.status_code, 200)
+        authenticate.assert_not_called()
+
+    def test_user_is_authenticated_on_access(self):
+        view = AppVersionViewSet(action='latest')
+        for token, expected in ((RefreshToken.for_user(self.user).access_token, self.user), *((t, None) for t in self.tokens())):
+            request = Request(
+                APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}'),
+                authenticators=[OptionalJWTAuthentication()]
+            )
+            with mock.patch.object(OptionalJWTAuthentication, 'get_validated_token', autospec=True,
+                                   side_effect=OptionalJWTAuthentication.get_validated_token) as validate:
+                view.perform_authentication(request)
+                validate.assert_not_called()
+                if expected is None:
+                    self.assertFalse(request.user.is_authenticated)
+                else:
+                    self.assertEqual(request.user, expected)
+                validate.assert_called_once()
+
+        # 非延迟认证的 action 在请求开始时认证
+        view = AppVersionViewSet(action='list')
+        request = Request(APIRequestFactory().get('/'), authenticators=[OptionalJWTAuthentication()])
+        view.perform_authentication(request)
+        self.assertIn('_user', vars(request))
+
+# 异步视图的测试路由：与 ASYNC_PUBLIC_ENDPOINTS 开启时的路由相同，挂在 async/ 下与同步接口对比
+urlpatterns = [
+    path('async/setting/versions/check/', async_views.version_check),
+    path('async/setting/versions/batch_check/', async_views.version_batch_check),
+    path('async/setting/versions/latest/', async_views.version_latest),
+    path('async/setting/configs/get_by_type/', async_views.config_get_by_type),
+    path('async/setting/bootstrap/', async_views.bootstrap),
+    path('', include('django_server.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewParityTest(SnapshotCacheMixin, TestCase):
+    """异步视图与同步视图的状态码、响应结构和响应头一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        AppVersion.objects.create(
+            platform='android', version_code=101, version_name='1.0.1', title='版本', description='更新说明',
+            min_support_version=90, download_url='https://example.com/app'
+        )
+        DynamicConfig.objects.create(type='banner', title='配置', extra_data={'key': 'value'})
+
+    async def assertSameResponse(self, method, path, data=None, **extra):
+        responses = [
+            await getattr(self.async_client, method)(prefix + path, data, **extra)
+            for prefix in ('', '/async')
+        ]
+        sync, native = responses
+        self.assertEqual(native.status_code, sync.status_code, path)
+        for header in ('ETag', 'Last-Modified', 'Content-Type'):
+            self.assertEqual(native.get(header), sync.get(header), f'{path} {header}')
+        if sync.status_code == 304 or method == 'head':
+            self.assertEqual(native.content, sync.content)
+            return sync
+        self.assertEqual(native.json(), sync.json(), path)
+        return sync
+
+    async def test_version_check(self):
+        for data in (
+            {'platform': 'android', 'version_code': 80},
+            {'platform': 'android', 'version_code': 95},
+            {'platform': 'android', 'version_code': 101},
+            {'platform': 'ios', 'version_code': 1},
+            {'platform': 'web', 'version_code': 1},
+            {'platform': 'android'},
+            {'platform': 'android', 'version_code': 1, 'extra': 1},
+        ):
+            await self.assertSameResponse('post', '/setting/versions/check/', data, content_type='application/json')
+        # 表单请求
+        await self.assertSameResponse('post', '/setting/versions/check/', {'platform': 'android', 'version_code': '95'})
+
+    async def test_version_batch_check(self):
+        for data in (
+            {'items': [{'platform': 'android', 'version_code': 95}, {'platform': 'ios', 'version_code': 1}]},
+            {'items': []},
+            {'items': [{'platform': 'web', 'version_code': 1}]},
+        ):
+            await self.assertSameResponse('post', '/setting/versions/batch_check/', data, content_type='application/json')
+
+    async def test_version_latest(self):
+        for query in ({}, {'platform': 'web'}, {'platform': 'ios'}):
+            await self.assertSameResponse('get', '/setting/versions/latest/', query)
+        response = await self.assertSameResponse('get', '/setting/versions/latest/', {'platform': 'android'})
+        self.assertEqual(response.status_code, 200)
+        response = await self.assertSameResponse(
+            'get', '/setting/versions/latest/', {'platform': 'android'}, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+        await self.assertSameResponse('head', '/setting/versions/latest/', {'platform': 'android'})
+
+    async def test_config_get_by_type(self):
+        for query in ({}, {'type': 'unknown'}, {'type': 'activity'}):
+            await self.assertSameResponse('get', '/setting/configs/get_by_type/', query)
+        response = await self.assertSameResponse('get', '/setting/configs/get_by_type/', {'type': 'banner'})
+        self.assertEqual(response.status_code, 200)
+        response = await self.assertSameResponse(
+            'get', '/setting/configs/get_by_type/', {'type': 'banner'},
+            headers={'If-Modified-Since': response['Last-Modified']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_bootstrap(self):
+        for data in (
+            {'platform': 'android', 'version_code': 95},
+            {'platform': 'android', 'version_code': 95, 'types': ['banner']},
+            {'platform': 'android', 'version_code': 95, 'types': ['unknown']},
+            {'platform': 'android'},
+        ):
+            await self.assertSameResponse('post', '/setting/bootstrap/', data, content_type='application/json')
+
+    async def test_method_not_allowed(self):
+        for method, url in (
+            ('get', '/setting/versions/check/'),
+            ('put', '/setting/versions/batch_check/'),
+            ('post', '/setting/versions/latest/'),
+            ('delete', '/setting/configs/get_by_type/'),
+            ('get', '/setting/bootstrap/'),
+        ):
+            response = await self.assertSameResponse(method, url)
+            self.assertEqual(response.status_code, 405)
+            # DRF 视图另外支持 OPTIONS
+            native = await getattr(self.async_client, method)('/async' + url)
+            self.assertEqual(native['Allow'], response['Allow'].removesuffix(', OPTIONS'))
+
+    async def test_parse_error(self):
+        for url in ('/setting/versions/check/', '/setting/versions/batch_check/', '/setting/bootstrap/'):
+            response = await self.assertSameResponse('post', url, '{"platform": ', content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class BootstrapTest(SnapshotCacheMixin, TestCase):
+    """启动接口：各部分与单独接口一致、ETag 一致时不返回数据、types 子集，同步和异步视图结果相同"""
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_version(platform='android', version_code=101, min_support_version=90)
+            DynamicConfig.objects.create(type='banner', title='横幅')
+            DynamicConfig.objects.create(type='activity', title='活动')
+
+    def bootstrap(self, **data):
+        """同时请求同步和异步视图，结果一致时返回响应数据"""
+        data.setdefault('platform', 'android')
+        data.setdefault('version_code', 95)
+        sync, native = (
+            self.client.post(prefix + '/setting/bootstrap/', data, content_type='application/json')
+            for prefix in ('', '/async')
+        )
+        self.assertEqual(native.status_code, sync.status_code)
+        self.assertEqual(native.json(), sync.json())
+        self.assertEqual(sync.status_code, 200, sync.json())
+        return sync.json()['data']
+
+    @staticmethod
+    def etags(data):
+        return {'version': data['version']['etag'], **{key: value['etag'] for key, value in data['configs'].items()}}
+
+    def test_sections_match_endpoints(self):
+        data = self.bootstrap()
+        check = self.client.post(
+            '/setting/versions/check/', {'platform': 'android', 'version_code': 95}, content_type='application/json'
+        ).json()
+        self.assertEqual(data['version'], {
+            'etag': data['version']['etag'], 'not_modified': False, 'data': check['data'], 'message': check['message']
+        })
+
+        self.assertEqual(list(data['configs']), list(dynamic_config_feeds.config_types))
+        for config_type, section in data['configs'].items():
+            response = self.client.get('/setting/configs/get_by_type/', {'type': config_type})
+            self.assertEqual(section['etag'], response['ETag'])
+            self.assertEqual(section['data'], response.json()['data'])
+            self.assertFalse(section['not_modified'])
+
+        # 稳态下不访问数据库
+        with self.assertNumQueries(0):
+            self.client.post('/setting/bootstrap/', {'platform': 'android', 'version_code': 95}, content_type='application/json')
+
+    def test_not_modified(self):
+        etags = self.etags(self.bootstrap())
+        for client_etags in (etags, {key: f'W/{etag}' for key, etag in etags.items()}):
+            data = self.bootstrap(etags=client_etags)
+            self.assertEqual(self.etags(data), etags)
+            for section in (data['version'], *data['configs'].values()):
+                self.assertEqual((section['not_modified'], section['data']), (True, None))
+            self.assertEqual(data['version']['message'], '发现新版本')
+
+        data = self.bootstrap(etags={'version': '"other"', 'banner': etags['banner']})
+        self.assertFalse(data['version']['not_modified'])
+        self.assertIsNotNone(data['version']['data'])
+        self.assertTrue(data['configs']['banner']['not_modified'])
+        self.assertFalse(data['configs']['activity']['not_modified'])
+
+    def test_types_subset(self):
+        data = self.bootstrap(types=['banner'])
+        self.assertEqual(list(data['configs']), ['banner'])
+        self.assertEqual([item['title'] for item in data['configs']['banner']['data']], ['横幅'])
+        self.assertEqual(list(self.bootstrap(types=['activity', 'banner', 'activity'])['configs']), ['activity', 'banner'])
+
+        for types in (['unknown'], [], 'banner'):
+            with self.subTest(types=types):
+                for prefix in ('', '/async'):
+                    response = self.client.post(
+                        prefix + '/setting/bootstrap/', {'platform': 'android', 'version_code': 95, 'types': types},
+                        content_type='application/json'
+                    )
+                    self.assertEqual(response.status_code, 400)
+
+    def test_version_etag_follows_check_result(self):
+        update = self.bootstrap(version_code=95)['version']
+        self.assertEqual(self.bootstrap(version_code=100)['version']['etag'], update['etag'])
+        self.assertNotEqual(self.bootstrap(version_code=89)['version']['etag'], update['etag'])
+        latest = self.bootstrap(version_code=101)['version']
+        self.assertNotEqual(latest['etag'], update['etag'])
+        self.assertEqual(self.bootstrap(version_code=200)['version']['etag'], latest['etag'])
+
+        # 新版本发布后旧 ETag 失效，配置部分不受影响
+        etags = self.etags(self.bootstrap())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_version(platform='android', version_code=102)
+        data = self.bootstrap(etags=etags)
+        self.assertFalse(data['version']['not_modified'])
+        self.assertEqual(data['version']['data']['latest_version']['version_code'], 102)
+        self.assertTrue(all(section['not_modified'] for section in data['configs'].values()))
+
+        # 已是最新版本的客户端在发布前后检查结果相同，ETag 不变
+        self.assertEqual(self.bootstrap(version_code=200)['version']['etag'], latest['etag'])
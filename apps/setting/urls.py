@@ -1,12 +1,25 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'versions', views.AppVersionViewSet, basename='version')
 router.register(r'configs', views.DynamicConfigViewSet, basename='config')
 
 urlpatterns = [
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('bootstrap/', views.BootstrapView.as_view(), name='bootstrap'),
     path('', include(router.urls)),
 ]
+
+# ASGI 部署时热点公共接口使用异步视图，需放在 router 之前优先匹配
+if settings.ASYNC_PUBLIC_ENDPOINTS:
+    urlpatterns = [
+        path('versions/check/', async_views.version_check, name='version-check'),
+        path('versions/batch_check/', async_views.version_batch_check, name='version-batch-check'),
+        path('versions/latest/', async_views.version_latest, name='version-latest'),
+        path('configs/get_by_type/', async_views.config_get_by_type, name='config-get-by-type'),
+        path('bootstrap/', async_views.bootstrap, name='bootstrap'),
+    ] + urlpatterns
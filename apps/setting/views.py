@@ -1,20 +1,32 @@
-from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, filters
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser, AllowAny
+from rest_framework.views import APIView
 
 from utils.base_views import BaseModelViewSet
+from utils.compression import cache_compressed
+from utils.conditional import conditional_response, set_conditional_headers
+from utils.metrics import metrics
 from utils.response import ResponseUtil
 from .models import AppVersion, DynamicConfig
 from .serializers import (
     AppVersionSerializer,
     AppVersionListSerializer,
     VersionCheckRequestSerializer,
+    VersionBatchCheckRequestSerializer,
     DynamicConfigSerializer,
     DynamicConfigListSerializer,
     DynamicConfigRequestSerializer,
-    DynamicConfigClientSerializer
+    DynamicConfigClientSerializer,
+    BootstrapRequestSerializer
+)
+from .snapshots import (
+    app_version_snapshot,
+    dynamic_config_feeds,
+    build_check_result,
+    build_batch_check_result,
+    build_bootstrap_result
 )
 
 
@@ -28,6 +40,7 @@ class AppVersionViewSet(BaseModelViewSet):
     - update: 更新版本（需要管理员权限）
     - destroy: 删除版本（需要管理员权限）
     - check: 检查版本更新（无需登录）
+    - batch_check: 批量检查版本更新（无需登录）
     - latest: 获取最新版本（无需登录）
     """
     resource_name = '应用版本'
@@ -38,6 +51,9 @@ class AppVersionViewSet(BaseModelViewSet):
     search_fields = ['version_name', 'title', 'description']
     ordering_fields = ['version_code', 'create_time']
     ordering = ['-version_code', '-create_time']
+    keyset_ordering = ('-version_code', 'id')  # 键集分页，使用 version_code 降序索引
+    lazy_authentication_actions = ('check', 'batch_check', 'latest')  # 公共接口不读取当前用户，跳过 token 校验
+    fast_serializer_actions = ('list',)  # 列表使用编译序列化器（AppVersionListSerializer）
 
     def get_serializer_class(self):
         """根据操作类型选择序列化器"""
@@ -45,6 +61,8 @@ class AppVersionViewSet(BaseModelViewSet):
             return AppVersionListSerializer
         if self.action == 'check':
             return VersionCheckRequestSerializer
+        if self.action == 'batch_check':
+            return VersionBatchCheckRequestSerializer
         return AppVersionSerializer
 
     def get_permissions(self):
@@ -83,55 +101,16 @@ class AppVersionViewSet(BaseModelViewSet):
         current_version_code = serializer.validated_data['version_code']
 
         try:
-            # 查询最新的启用版本
-            latest_version = AppVersion.objects.filter(
-                Q(platform=platform) | Q(platform='all'),
-                is_active=True
-            ).order_by('-version_code').first()
-
-            # 如果没有找到任何版本配置
-            if not latest_version:
-                return ResponseUtil(
-                    message='当前已是最新版本',
-                    data={
-                        'has_update': False,
-                        'is_force_update': False,
-                        'latest_version': None
-                    },
-                    http_status=status.HTTP_200_OK
-                )
-
-            # 判断是否需要更新
-            has_update = current_version_code < latest_version.version_code
-
-            # 判断是否强制更新
-            is_force_update = False
-            if has_update:
-                is_force_update = latest_version.is_force_update
-                if latest_version.min_support_version:
-                    if current_version_code < latest_version.min_support_version:
-                        is_force_update = True
-
-            # 构建响应数据
-            response_data = {
-                'has_update': has_update,
-                'is_force_update': is_force_update,
-            }
+            # 从进程内快照读取最新版本，稳态下不访问数据库
+            entry = app_version_snapshot.get(platform)
+            message, response_data = build_check_result(entry, current_version_code)
 
-            if has_update:
-                # 有更新时返回最新版本信息
-                version_serializer = AppVersionSerializer(latest_version)
-                response_data['latest_version'] = version_serializer.data
-                message = '发现新版本，请立即更新' if is_force_update else '发现新版本'
-            else:
-                response_data['latest_version'] = None
-                message = '当前已是最新版本'
-
-            return ResponseUtil(
+            # 响应只取决于快照和是否需要更新，压缩结果可以复用
+            return cache_compressed(ResponseUtil(
                 message=message,
                 data=response_data,
                 http_status=status.HTTP_200_OK
-            )
+            ))
 
         except Exception as e:
             return ResponseUtil(
@@ -144,11 +123,59 @@ class AppVersionViewSet(BaseModelViewSet):
                 http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def batch_check(self, request):
+        """批量检查版本更新
+
+        POST /setting/versions/batch_check/
+
+        用于多个应用包或网关代替逐个调用 check，判断规则与 check 相同，一次最多 500 项
+
+        请求参数：
+        {
+            "items": [
+                {"platform": "android", "version_code": 100},
+                {"platform": "ios", "version_code": 98}
+            ]
+        }
+
+        响应数据：
+        - results: 与 items 顺序一致的检查结果 {platform, version_code, has_update, is_force_update, message}
+        - latest_versions: 各平台最新版本信息，没有版本配置时为 null
+        """
+        serializer = VersionBatchCheckRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return ResponseUtil(
+                code=status.HTTP_400_BAD_REQUEST,
+                message='参数错误：' + str(serializer.errors),
+                data=None,
+                http_status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # 一次读取所有平台的快照，逐项二分查找
+            entries = app_version_snapshot.get_all()
+            return ResponseUtil(
+                message='检查完成',
+                data=build_batch_check_result(entries, serializer.validated_data['items']),
+                http_status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            return ResponseUtil(
+                code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                message=f'服务器错误：{str(e)}',
+                data=None,
+                http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def latest(self, request):
         """获取最新版本信息
         
         GET /setting/versions/latest/?platform=android
+
+        支持 ETag / Last-Modified 条件请求，版本未变化时返回 304
         """
         platform = request.query_params.get('platform')
 
@@ -169,13 +196,10 @@ class AppVersionViewSet(BaseModelViewSet):
             )
 
         try:
-            # 查询最新的启用版本
-            latest_version = AppVersion.objects.filter(
-                Q(platform=platform) | Q(platform='all'),
-                is_active=True
-            ).order_by('-version_code').first()
+            # 从进程内快照读取最新版本，ETag 与快照一同生成
+            entry = app_version_snapshot.get(platform)
 
-            if not latest_version:
+            if not entry:
                 return ResponseUtil(
                     code=status.HTTP_404_NOT_FOUND,
                     message='未找到版本信息',
@@ -183,12 +207,17 @@ class AppVersionViewSet(BaseModelViewSet):
                     http_status=status.HTTP_404_NOT_FOUND
                 )
 
-            serializer = AppVersionSerializer(latest_version)
-            return ResponseUtil(
+            # 客户端缓存未变化时直接返回 304
+            not_modified = conditional_response(request, entry.etag, entry.last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            response = ResponseUtil(
                 message='获取成功',
-                data=serializer.data,
+                data=entry.data,
                 http_status=status.HTTP_200_OK
             )
+            return cache_compressed(set_conditional_headers(response, entry.etag, entry.last_modified))
 
         except Exception as e:
             return ResponseUtil(
@@ -218,6 +247,8 @@ class DynamicConfigViewSet(BaseModelViewSet):
     search_fields = ['title', 'description']
     ordering_fields = ['sort_order', 'create_time']
     ordering = ['type', 'sort_order', '-create_time']
+    lazy_authentication_actions = ('get_by_type',)  # 公共接口不读取当前用户，跳过 token 校验
+    sparse_field_dependencies = {'is_valid': ('start_time', 'end_time')}  # ?fields= 查询裁剪时 is_valid 依赖的字段
 
     def get_serializer_class(self):
         """根据操作类型选择序列化器"""
@@ -245,6 +276,7 @@ class DynamicConfigViewSet(BaseModelViewSet):
         返回：
         - 返回指定类型的所有有效配置（已启用且在有效期内）
         - 按 sort_order 升序排列
+        - 支持 ETag / Last-Modified 条件请求，配置未变化时返回 304
         """
         config_type = request.query_params.get('type')
 
@@ -267,30 +299,20 @@ class DynamicConfigViewSet(BaseModelViewSet):
             )
 
         try:
-            from django.utils import timezone
-            now = timezone.now()
-
-            # 查询指定类型的有效配置
-            configs = DynamicConfig.objects.filter(
-                type=config_type,
-                is_active=True,
-                is_delete=False
-            ).filter(
-                # 时间范围过滤：未设置时间或在有效期内
-                Q(start_time__isnull=True, end_time__isnull=True) |
-                Q(start_time__isnull=True, end_time__gte=now) |
-                Q(start_time__lte=now, end_time__isnull=True) |
-                Q(start_time__lte=now, end_time__gte=now)
-            ).order_by('sort_order', '-create_time')
-
-            # 序列化数据
-            result_serializer = DynamicConfigClientSerializer(configs, many=True)
+            # 从预先序列化的配置快照读取，快照在有效期边界或配置变更时重建
+            feed = dynamic_config_feeds.get(config_type)
 
-            return ResponseUtil(
+            # 客户端缓存未变化时直接返回 304
+            not_modified = conditional_response(request, feed.etag, feed.last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            response = ResponseUtil(
                 message='获取成功',
-                data=result_serializer.data,
+                data=feed.data,
                 http_status=status.HTTP_200_OK
             )
+            return cache_compressed(set_conditional_headers(response, feed.etag, feed.last_modified))
 
         except Exception as e:
             return ResponseUtil(
@@ -299,3 +321,80 @@ class DynamicConfigViewSet(BaseModelViewSet):
                 data=None,
                 http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class BootstrapView(APIView):
+    """客户端启动接口
+
+    POST /setting/bootstrap/
+
+    一次返回版本检查结果和各类型动态配置，代替启动时分别调用 versions/check 和多次 configs/get_by_type（无需登录）
+
+    请求参数：
+    {
+        "platform": "android",
+        "version_code": 100,
+        "types": ["banner", "activity"],
+        "etags": {"version": "\"...\"", "banner": "\"...\""}
+    }
+    - types: 需要返回的配置类型，默认全部
+    - etags: 上一次响应中各部分的 etag，可选
+
+    响应数据：
+    - version: {etag, not_modified, data, message}，data 与 versions/check 的响应数据相同
+    - configs: {配置类型: {etag, not_modified, data}}，data 与 configs/get_by_type 的响应数据相同
+    ETag 与客户端一致的部分 not_modified 为 true、data 为 null，客户端继续使用本地缓存
+    """
+    permission_classes = [AllowAny]
+
+    def perform_authentication(self, request):
+        """公共接口不读取当前用户，跳过 token 校验"""
+
+    def post(self, request):
+        serializer = BootstrapRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return ResponseUtil(
+                code=status.HTTP_400_BAD_REQUEST,
+                message='参数错误：' + str(serializer.errors),
+                data=None,
+                http_status=status.HTTP_400_BAD_REQUEST
+            )
+
+        params = serializer.validated_data
+        try:
+            # 全部从进程内快照组装，稳态下不访问数据库
+            entry = app_version_snapshot.get(params['platform'])
+            feeds = {
+                config_type: dynamic_config_feeds.get(config_type)
+                for config_type in params.get('types') or dynamic_config_feeds.config_types
+            }
+            data = build_bootstrap_result(entry, params['version_code'], feeds, params.get('etags', {}))
+
+            # 响应只取决于快照和客户端缓存的 ETag，压缩结果可以复用
+            return cache_compressed(ResponseUtil(
+                message='获取成功',
+                data=data,
+                http_status=status.HTTP_200_OK
+            ))
+
+        except Exception as e:
+            return ResponseUtil(
+                code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                message=f'服务器错误：{str(e)}',
+                data=None,
+                http_status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class MetricsView(APIView):
+    """运行指标视图
+
+    GET /setting/metrics/
+
+    返回当前 worker 进程的缓存命中、未命中和耗时统计（需要管理员权限）
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """获取运行指标"""
+        return ResponseUtil(data=metrics.snapshot(), http_status=status.HTTP_200_OK)
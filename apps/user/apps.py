@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.user'
-    verbose_name = '用户'
\ No newline at end of file
+    verbose_name = '用户'
+
+    def ready(self):
+        from . import signals  # noqa: F401
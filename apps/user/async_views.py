@@ -0,0 +1,36 @@
+"""
+用户异步视图
+以 ASGI 方式部署时替换 users/me 接口，响应结构与 views.UserViewSet.me 保持一致
+"""
+from rest_framework import status
+from rest_framework.exceptions import NotAuthenticated
+
+from utils.async_views import async_api_view, unauthorized_response
+from utils.authentication import OptionalJWTAuthentication
+from utils.renderers import RawJSON
+from utils.response import envelope_response
+from .caches import aget_profile
+from .models import User
+from .serializers import UserSerializer
+
+
+@async_api_view(['GET'])
+async def me(request):
+    """获取当前登录用户信息
+
+    GET /user/users/me/
+    """
+    authenticator = OptionalJWTAuthentication()
+    result = await authenticator.aauthenticate(request)
+    if result is None:
+        return unauthorized_response(NotAuthenticated(), authenticator.authenticate_header(request))
+
+    user = result[0]
+
+    async def build():
+        # 令牌用户只包含认证字段，序列化前异步加载完整的用户对象
+        instance = await User.objects.aget(pk=user.pk)
+        return RawJSON.encode(UserSerializer(instance).data)
+
+    data = await aget_profile(user, build)
+    return envelope_response(data=data, http_status=status.HTTP_200_OK)
@@ -0,0 +1,135 @@
+"""
+用户缓存
+- 资料缓存：当前用户资料的已编码 JSON（RawJSON），响应时直接拼接
+- 状态缓存：JWT 认证需要的 is_active / is_staff / token_version 等字段，认证时不查询用户表
+- 用户行缓存：进程内短时缓存完整的用户对象，供需要读取其他字段的接口使用
+- 用户卡片缓存：批量查询接口返回的 id / name / avatar_url
+用户信息变更后失效（见 signals.py）
+"""
+import copy
+
+from django.conf import settings
+
+from utils.cache import LRUCache, TieredCache
+from .models import User
+
+user_cache = TieredCache('user')
+
+user_rows = LRUCache(
+    max_entries=getattr(settings, 'TIERED_CACHE', {}).get('L1_MAX_ENTRIES', 1024),
+    timeout=getattr(settings, 'USER_ROW_CACHE_TIMEOUT', 5),
+)
+
+STATE_FIELDS = ('is_active', 'is_staff', 'is_superuser', 'is_delete', 'token_version')
+CARD_FIELDS = ('id', 'name', 'avatar_url')
+
+
+def profile_key(user_id):
+    """用户资料缓存键"""
+    return f'profile:{user_id}'
+
+
+def state_key(user_id):
+    """用户状态缓存键"""
+    return f'state:{user_id}'
+
+
+def card_key(user_id):
+    """用户卡片缓存键"""
+    return f'card:{user_id}'
+
+
+def get_profile(user, builder):
+    """读取用户资料缓存，未命中时调用 builder 序列化"""
+    return user_cache.get_or_set(
+        profile_key(user.pk),
+        builder,
+        timeout=getattr(settings, 'USER_PROFILE_CACHE_TIMEOUT', 300)
+    )
+
+
+async def aget_profile(user, builder):
+    """get_profile 的异步版本，builder 为无参协程函数"""
+    return await user_cache.aget_or_set(
+        profile_key(user.pk),
+        builder,
+        timeout=getattr(settings, 'USER_PROFILE_CACHE_TIMEOUT', 300)
+    )
+
+
+def get_user_state(user_id):
+    """读取用户状态 {is_active, is_staff, is_superuser, is_delete, token_version}
+
+    用户不存在时返回空字典
+    """
+    return user_cache.get_or_set(
+        state_key(user_id),
+        lambda: User.objects.filter(pk=user_id).order_by().values(*STATE_FIELDS).first() or {},
+        timeout=getattr(settings, 'USER_STATE_CACHE_TIMEOUT', 300)
+    )
+
+
+async def aget_user_state(user_id):
+    """get_user_state 的异步版本"""
+
+    async def build():
+        return await User.objects.filter(pk=user_id).order_by().values(*STATE_FIELDS).afirst() or {}
+
+    return await user_cache.aget_or_set(
+        state_key(user_id),
+        build,
+        timeout=getattr(settings, 'USER_STATE_CACHE_TIMEOUT', 300)
+    )
+
+
+def get_user_cards(user_ids):
+    """批量读取用户卡片 {id, name, avatar_url}
+
+    先批量读取缓存，未命中的用户使用一条 IN 查询加载并写入缓存
+
+    Returns:
+        dict: {用户 id: 卡片}，不存在或已删除的用户不包含在内
+    """
+    cached = user_cache.get_many([card_key(user_id) for user_id in user_ids])
+    cards = {card['id']: card for card in cached.values()}
+
+    missing = [user_id for user_id in user_ids if user_id not in cards]
+    if missing:
+        loaded = {
+            row['id']: row
+            for row in User.objects.filter(pk__in=missing, is_delete=False).order_by().values(*CARD_FIELDS)
+        }
+        if loaded:
+            user_cache.set_many(
+                {card_key(user_id): card for user_id, card in loaded.items()},
+                timeout=getattr(settings, 'USER_PROFILE_CACHE_TIMEOUT', 300)
+            )
+        cards.update(loaded)
+    return cards
+
+
+def get_cached_user(user_id):
+    """读取用户对象，优先使用进程内缓存
+
+    返回缓存对象的副本，调用方可以修改和保存；用户不存在时返回 None
+    """
+    user = user_rows.get(user_id)
+    if user is None:
+        user = User.objects.filter(pk=user_id).order_by().first()
+        if user is None:
+            return None
+        user_rows.set(user_id, user)
+    return copy.copy(user)
+
+
+def invalidate_profile(user_id):
+    """删除用户资料缓存"""
+    user_cache.delete(profile_key(user_id))
+
+
+def invalidate_user(user_id):
+    """删除用户状态、用户行、卡片和资料缓存"""
+    user_rows.delete(user_id)
+    user_cache.delete(state_key(user_id))
+    user_cache.delete(card_key(user_id))
+    invalidate_profile(user_id)
@@ -0,0 +1,62 @@
+"""
+密码哈希算法
+通过 settings.PASSWORD_HASHER 选择新密码使用的算法，其余算法仅用于校验旧密码，
+用户登录成功时自动升级为当前算法和参数（见 passwords.check_user_password）
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """参数可配置的 scrypt 哈希
+
+    scrypt 依赖内存而非迭代次数抵抗暴力破解，单次校验的 CPU 耗时远低于默认的 PBKDF2
+    - WORK_FACTOR (N): CPU / 内存开销，必须是 2 的幂
+    - BLOCK_SIZE (r): 块大小
+    - PARALLELISM (p): 并行度，hashlib 中串行计算，CPU 耗时与 p 成正比
+
+    单次计算约占用 128 * N * r 字节内存，默认参数约 16MB；修改参数后旧哈希在下次登录时升级
+    """
+
+    def __init__(self):
+        options = getattr(settings, 'PASSWORD_SCRYPT', {})
+        self.work_factor = options.get('WORK_FACTOR', 2 ** 14)
+        self.block_size = options.get('BLOCK_SIZE', 8)
+        self.parallelism = options.get('PARALLELISM', 1)
+        # OpenSSL 默认内存上限为 32MB，按参数放宽避免较大的 N 计算失败
+        self.maxmem = 2 * 128 * self.work_factor * self.block_size * self.parallelism + 1024 * 1024
+
+
+def describe_hash(encoded):
+    """解析哈希值的算法和参数
+
+    Returns:
+        tuple: (算法, 参数描述)，不可用密码返回 ('unusable', '')，无法识别返回 ('unknown', '')
+    """
+    if encoded is None or encoded.startswith(hashers.UNUSABLE_PASSWORD_PREFIX):
+        return 'unusable', ''
+    try:
+        hasher = hashers.identify_hasher(encoded)
+        decoded = hasher.decode(encoded)
+    except ValueError:
+        return 'unknown', ''
+
+    if 'iterations' in decoded:
+        return hasher.algorithm, f'iterations={decoded["iterations"]}'
+    if 'work_factor' in decoded and 'block_size' in decoded:
+        return hasher.algorithm, f'N={decoded["work_factor"]},r={decoded["block_size"]},p={decoded["parallelism"]}'
+    if 'work_factor' in decoded:
+        return hasher.algorithm, f'work_factor={decoded["work_factor"]}'
+    if 'time_cost' in decoded:
+        return hasher.algorithm, f'time_cost={decoded["time_cost"]},memory_cost={decoded["memory_cost"]}'
+    return hasher.algorithm, ''
+
+
+def must_update(encoded):
+    """哈希值是否需要升级为当前首选算法和参数"""
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = hashers.get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
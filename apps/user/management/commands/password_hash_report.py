@@ -0,0 +1,36 @@
+"""
+密码哈希分布统计
+
+使用示例:
+    python manage.py password_hash_report
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from apps.user.hashers import describe_hash, must_update
+from apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = '统计用户表中各密码哈希算法和参数的分布，以及等待登录升级的用户数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每批读取的行数，默认 5000')
+
+    def handle(self, *args, **options):
+        schemes = Counter()
+        pending = 0
+        total = 0
+        passwords = User.objects.order_by().values_list('password', flat=True)
+        for encoded in passwords.iterator(chunk_size=options['chunk_size']):
+            total += 1
+            schemes[describe_hash(encoded)] += 1
+            if must_update(encoded):
+                pending += 1
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'用户总数: {total}'))
+        for (algorithm, params), count in schemes.most_common():
+            percent = count * 100 / total
+            self.stdout.write(f'  {algorithm:<16}{params:<32}{count:>10}  {percent:6.2f}%')
+        self.stdout.write(f'等待登录升级: {pending}')
@@ -0,0 +1,20 @@
+"""
+清理过期的刷新令牌撤销记录
+
+使用示例:
+    python manage.py prune_revoked_tokens
+"""
+from django.core.management.base import BaseCommand
+
+from apps.user.revocation import revocation_store
+
+
+class Command(BaseCommand):
+    help = '删除数据库中已过期的刷新令牌撤销记录（缓存模式下记录到期自动删除）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的行数，默认 1000')
+
+    def handle(self, *args, **options):
+        deleted = revocation_store.prune(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已删除 {deleted} 条过期记录'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='写入 JWT 的版本号，递增后已签发的令牌全部失效', verbose_name='令牌版本'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('jti', models.CharField(help_text='刷新令牌的 jti 声明', max_length=64, primary_key=True, serialize=False, verbose_name='令牌ID')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='令牌过期时间，过期后记录可删除', verbose_name='过期时间')),
+            ],
+            options={
+                'verbose_name': '已撤销令牌',
+                'verbose_name_plural': '已撤销令牌',
+                'db_table': 'user_revoked_token',
+            },
+        ),
+    ]
@@ -39,6 +39,7 @@ class User(AbstractUser, BaseModel):
     - wechat_openid: 微信 OpenID
     - wechat_unionid: 微信 UnionID
     - last_login_ip: 最后登录 IP
+    - token_version: 令牌版本，写入 JWT，递增后已签发的令牌全部失效
     """
 
     class Gender(models.TextChoices):
@@ -142,6 +143,12 @@ class User(AbstractUser, BaseModel):
         blank=True
     )
 
+    token_version = models.PositiveIntegerField(
+        verbose_name='令牌版本',
+        help_text='写入 JWT 的版本号，递增后已签发的令牌全部失效',
+        default=0
+    )
+
     class Meta:
         db_table = 'user'
         verbose_name = '用户'
@@ -174,6 +181,11 @@ class User(AbstractUser, BaseModel):
             'create_time': self.create_time.isoformat() if self.create_time else None,
         }
 
+    def revoke_tokens(self):
+        """使该用户已签发的全部 JWT 失效（例如修改密码、账号被盗后）"""
+        self.token_version += 1
+        self.save(update_fields=['token_version', 'update_time'])
+
     def get_display_name(self):
         """获取用户显示名称（优先级：name > username > 手机号）"""
         return self.name or self.username or self.mobile or f'用户{self.id}'
@@ -188,3 +200,32 @@ class User(AbstractUser, BaseModel):
         return today.year - self.birthday.year - (
                 (today.month, today.day) < (self.birthday.month, self.birthday.day)
         )
+
+
+class RevokedToken(models.Model):
+    """已撤销的刷新令牌
+
+    刷新令牌轮换后旧令牌的 jti，只保存到令牌过期为止，过期记录定期清理
+    该表是撤销记录的唯一可信来源，共享缓存只作为前置（见 apps/user/revocation.py）
+    """
+
+    jti = models.CharField(
+        verbose_name='令牌ID',
+        help_text='刷新令牌的 jti 声明',
+        max_length=64,
+        primary_key=True
+    )
+
+    expires_at = models.DateTimeField(
+        verbose_name='过期时间',
+        help_text='令牌过期时间，过期后记录可删除',
+        db_index=True
+    )
+
+    class Meta:
+        db_table = 'user_revoked_token'
+        verbose_name = '已撤销令牌'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,52 @@
+"""
+登录密码校验
+密码哈希（PBKDF2 等）刻意设计为慢速计算，登录高峰时会占满请求线程，
+登录接口将哈希计算放到大小有限的登录线程池中执行，线程池已满时由调用方快速返回 429
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+from utils.executor import BoundedExecutor
+
+_options = getattr(settings, 'LOGIN_EXECUTOR', {})
+
+login_executor = BoundedExecutor(
+    'login',
+    max_workers=_options.get('MAX_WORKERS', 4),
+    max_queue=_options.get('MAX_QUEUE', 32),
+    timeout=_options.get('TIMEOUT', 10),
+)
+
+
+def _verify(raw_password, encoded):
+    """校验密码，哈希算法或迭代次数需要升级时同时计算新的哈希值
+
+    Returns:
+        tuple: (密码是否正确, 新的哈希值或 None)
+    """
+    is_correct, must_update = verify_password(raw_password, encoded)
+    if is_correct and must_update:
+        return True, make_password(raw_password)
+    return is_correct, None
+
+
+def check_user_password(user, raw_password, offload=True):
+    """校验用户密码
+
+    与 AbstractBaseUser.check_password 行为一致，哈希需要升级时保存新的哈希值；
+    数据库写入在当前请求线程中执行
+
+    Args:
+        offload: 为 True 时在登录线程池中计算哈希，否则在当前线程中计算
+
+    Raises:
+        ExecutorBusy: 登录线程池已满或等待超时（仅 offload 为 True 时）
+    """
+    if offload:
+        is_correct, upgraded = login_executor.run(_verify, raw_password, user.password)
+    else:
+        is_correct, upgraded = _verify(raw_password, user.password)
+    if upgraded is not None:
+        user.password = upgraded
+        user.save(update_fields=['password'])
+    return is_correct
@@ -0,0 +1,128 @@
+"""
+刷新令牌撤销记录
+刷新令牌每次使用后立即撤销，只记录已撤销令牌的 jti 并保存到令牌过期为止：
+未使用的令牌不占用存储，记录数量不超过令牌有效期内的刷新次数
+"""
+import logging
+import random
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from utils.metrics import metrics
+from .models import RevokedToken
+
+log = logging.getLogger(__name__)
+
+CACHE = 'cache'
+DATABASE = 'db'
+AUTO = 'auto'
+
+
+class RefreshTokenRevocationStore:
+    """刷新令牌撤销记录
+
+    - revoke(jti, exp): 原子地撤销令牌，返回 False 表示令牌此前已被撤销（重复使用）
+    - is_revoked(jti): 查询令牌是否已撤销
+    - 数据库是唯一可信的存储：每次撤销都以 jti 为主键写入 RevokedToken，主键冲突即为重复使用；
+      每次撤销以 1 / prune_interval 的概率清理过期记录，也可运行 prune_revoked_tokens 命令
+    - 缓存只作为前置：cache.add 写入 revoked:<jti>，过期时间与令牌一致。键已存在时直接判定为重复使用，
+      不访问数据库；键不存在不能说明未撤销（缓存可能按 LRU 淘汰或重启后丢失，缓存故障期间的撤销也只写入数据库），
+      仍以数据库写入结果为准
+    - backend 为 db 时不使用缓存；auto 在共享缓存（Redis 等）时使用缓存前置，进程内缓存和 DummyCache 无法跨进程共享
+    """
+
+    key_prefix = 'revoked'
+
+    def __init__(self, backend=AUTO, alias='default', prune_interval=1000, prune_batch_size=1000):
+        self.backend = backend
+        self.alias = alias
+        self.prune_interval = prune_interval
+        self.prune_batch_size = prune_batch_size
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def uses_cache(self):
+        if self.backend == AUTO:
+            return not isinstance(self.cache, (LocMemCache, DummyCache))
+        return self.backend == CACHE
+
+    def make_key(self, jti):
+        return f'{self.key_prefix}:{jti}'
+
+    def revoke(self, jti, exp):
+        """撤销令牌
+
+        Args:
+            jti: 令牌 jti 声明
+            exp: 令牌 exp 声明（时间戳）
+
+        Returns:
+            bool: 本次撤销成功返回 True，令牌已被撤销过返回 False
+        """
+        timeout = int(exp - timezone.now().timestamp()) + 1
+        if timeout <= 0:
+            return False
+
+        if self.uses_cache:
+            try:
+                if not self.cache.add(self.make_key(jti), 1, timeout):
+                    # 缓存中已有撤销记录，确定是重复使用
+                    metrics.incr('auth.revocation.reused')
+                    return False
+            except Exception:
+                log.exception('刷新令牌撤销记录写入缓存失败，只写入数据库')
+                metrics.incr('auth.revocation.cache_error')
+
+        # 缓存中的键可能已被淘汰或丢失，是否重复使用以数据库主键冲突为准
+        expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+        try:
+            with metrics.timer('auth.revocation.db_latency'), transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            metrics.incr('auth.revocation.reused')
+            return False
+
+        metrics.incr('auth.revocation.revoked')
+        if self.prune_interval and random.randrange(self.prune_interval) == 0:
+            self.prune()
+        return True
+
+    def is_revoked(self, jti):
+        """查询令牌是否已撤销，缓存未命中时查询数据库"""
+        if self.uses_cache:
+            try:
+                if self.cache.get(self.make_key(jti)) is not None:
+                    return True
+            except Exception:
+                log.exception('刷新令牌撤销记录读取缓存失败，使用数据库')
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def prune(self, batch_size=None):
+        """删除已过期的数据库记录，返回删除数量"""
+        batch_size = batch_size or self.prune_batch_size
+        now = timezone.now()
+        deleted = 0
+        while True:
+            jtis = list(
+                RevokedToken.objects.filter(expires_at__lt=now).values_list('jti', flat=True)[:batch_size]
+            )
+            if not jtis:
+                return deleted
+            deleted += RevokedToken.objects.filter(jti__in=jtis).delete()[0]
+
+
+_options = getattr(settings, 'REFRESH_TOKEN_REVOCATION', {})
+
+revocation_store = RefreshTokenRevocationStore(
+    backend=_options.get('BACKEND', AUTO),
+    prune_interval=_options.get('PRUNE_INTERVAL', 1000),
+)
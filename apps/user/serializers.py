@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.exceptions import Throttled
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 
+from utils.executor import ExecutorBusy
 from . import models
+from .caches import get_user_state
+from .revocation import revocation_store
+from .tokens import RefreshToken, check_token_state
 
 
 class UserLoginSerializer(serializers.Serializer):
@@ -36,8 +43,14 @@ class UserLoginSerializer(serializers.Serializer):
         username = attrs.get('username')
         password = attrs.get('password')
 
-        # 使用 Django 认证后端验证
-        user = authenticate(username=username, password=password)
+        # 使用 Django 认证后端验证，密码哈希在登录线程池中计算，线程池已满时快速返回 429
+        try:
+            user = authenticate(username=username, password=password, use_login_executor=True)
+        except ExecutorBusy:
+            raise Throttled(
+                wait=settings.LOGIN_EXECUTOR.get('RETRY_AFTER', 1),
+                detail='登录请求过多，请稍后重试'
+            )
 
         if user is None:
             raise serializers.ValidationError('用户名或密码错误')
@@ -78,27 +91,64 @@ class TokenRefreshSerializer(serializers.Serializer):
     )
 
     def validate(self, attrs):
-        """验证并刷新 token"""
+        """验证并轮换 token
+
+        旧的 refresh token 立即撤销（见 revocation.py），重复使用时刷新失败
+        """
         refresh_token = attrs.get('refresh')
 
         try:
-            # 验证 refresh token
+            # 验证 refresh token，用户已禁用、已删除或令牌已被撤销时无效
             refresh = RefreshToken(refresh_token)
-
-            # 生成新的 access token
-            access_token = str(refresh.access_token)
-
-            # 如果配置了 ROTATE_REFRESH_TOKENS,会生成新的 refresh token
-            new_refresh_token = str(refresh)
-
+            user_id = refresh[api_settings.USER_ID_CLAIM]
+            state = get_user_state(user_id)
+            check_token_state(refresh, state)
+
+            if not api_settings.ROTATE_REFRESH_TOKENS:
+                return {
+                    'access': str(refresh.access_token),
+                    'refresh': refresh_token,
+                }
+
+            # 撤销旧 refresh token，已使用过的 refresh token 不能再次刷新
+            if not revocation_store.revoke(refresh[api_settings.JTI_CLAIM], refresh['exp']):
+                raise TokenError('Token has already been used')
+
+            # 签发新的 refresh token（新的 jti 和过期时间）和 access token
+            new_refresh = RefreshToken.for_state(user_id, state)
             return {
-                'access': access_token,
-                'refresh': new_refresh_token,
+                'access': str(new_refresh.access_token),
+                'refresh': str(new_refresh),
             }
         except Exception as e:
             raise serializers.ValidationError(f'refresh token 无效或已过期: {str(e)}')
 
 
+class UserBatchRequestSerializer(serializers.Serializer):
+    """批量查询用户请求序列化"""
+
+    ids = serializers.ListField(
+        label='用户ID列表',
+        help_text='要查询的用户 id，最多 200 个，返回顺序与传入顺序一致',
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=200,
+        error_messages={
+            'required': 'ids不能为空',
+            'empty': 'ids不能为空',
+            'max_length': 'ids最多200个',
+        }
+    )
+
+
+class UserCardSerializer(serializers.Serializer):
+    """用户卡片序列化（批量查询响应）"""
+
+    id = serializers.IntegerField(help_text='用户ID')
+    name = serializers.CharField(allow_null=True, help_text='姓名')
+    avatar_url = serializers.URLField(allow_null=True, help_text='头像链接')
+
+
 class UserSerializer(serializers.ModelSerializer):
     """用户序列化"""
 
@@ -0,0 +1,24 @@
+"""
+用户信号处理
+用户信息变更后在事务提交时清除缓存
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from utils.authentication import verified_tokens
+from .caches import invalidate_user
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User, dispatch_uid='user_changed')
+def user_changed(sender, instance, **kwargs):
+    """用户信息变更后清除状态、用户行和资料缓存"""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+    # 用户禁用、删除或撤销令牌时同时清除当前进程中已验证的 token
+    update_fields = kwargs.get('update_fields') or ()
+    if kwargs['signal'] is post_delete or not instance.is_active or instance.is_delete \
+            or 'token_version' in update_fields:
+        transaction.on_commit(lambda: verified_tokens.evict_user(user_id))
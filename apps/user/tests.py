@@ -1,3 +1,334 @@
-from django.test import TestCase
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from utils.authentication import OptionalJWTAuthentication, verified_tokens
+from utils.executor import ExecutorBusy
+from . import async_views
+from .caches import card_key, user_cache, user_rows
+from .models import User
+from .revocation import CACHE, RefreshTokenRevocationStore
+from .tokens import RefreshToken
+from .views import CustomBackend
+
+
+class UserCacheMixin:
+    """每个用例从空的共享缓存、用户缓存和已验证 token 缓存开始"""
+
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        user_cache.l1.clear()
+        user_rows.clear()
+        verified_tokens.clear()
+
+    @staticmethod
+    def access_token(user):
+        return str(RefreshToken.for_user(user).access_token)
+
+
+class CustomBackendQueryTest(TestCase):
+    """登录查询回归测试：每次登录只执行一条走唯一索引的查询，并且只加载必要字段"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alice', password='secret123', mobile='13800000000')
+        cls.numeric_user = User.objects.create_user(username='13900000000', password='secret123')
+
+    def assert_single_lookup(self, identifier, column):
+        with CaptureQueriesContext(connection) as context:
+            user = authenticate(username=identifier, password='secret123')
+
+        self.assertIsNotNone(user)
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql']
+        where = sql.split(' WHERE ', 1)[1]
+        self.assertIn(column, where)
+        self.assertNotIn(' OR ', where)
+        # 不加载登录无关的大字段
+        for field in ('bio', 'address', 'id_card', 'wechat_openid'):
+            self.assertNotIn(field, sql)
+        return user
+
+    def test_username_login_uses_one_query(self):
+        user = self.assert_single_lookup('alice', 'username')
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_mobile_login_uses_one_query(self):
+        user = self.assert_single_lookup('13800000000', 'mobile')
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_login_response_fields_are_loaded(self):
+        user = authenticate(username='alice', password='secret123')
+        with self.assertNumQueries(0):
+            for field in CustomBackend.login_fields:
+                getattr(user, field)
+
+    def test_numeric_username_falls_back_to_username(self):
+        with self.assertNumQueries(2):
+            user = authenticate(username='13900000000', password='secret123')
+        self.assertEqual(user.pk, self.numeric_user.pk)
+
+    def test_unknown_or_wrong_password(self):
+        self.assertIsNone(authenticate(username='bob', password='secret123'))
+        self.assertIsNone(authenticate(username='alice', password='wrong'))
+
+
+class LoginExecutorTest(UserCacheMixin, TestCase):
+    """只有登录接口使用登录线程池，线程池已满时登录接口返回 429，后台登录不受影响"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='admin', password='secret123', is_staff=True, is_superuser=True)
+
+    def test_busy_executor(self):
+        with mock.patch('apps.user.passwords.login_executor.run', side_effect=ExecutorBusy):
+            response = self.client.post('/user/users/login/', {'username': 'admin', 'password': 'secret123'})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.json()['code'], 429)
+            self.assertIn('Retry-After', response)
+
+            response = self.client.post('/zishi_admin/login/', {'username': 'admin', 'password': 'secret123'})
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(self.client.get('/zishi_admin/').status_code, 200)
+
+    def test_admin_login_loads_user_once(self):
+        user = authenticate(username='admin', password='secret123')
+        with self.assertNumQueries(0):
+            self.assertTrue(user.is_superuser)
+            self.assertIsNone(user.last_login)
+
+
+class PasswordHashUpgradeTest(UserCacheMixin, TestCase):
+    """旧算法的哈希在登录成功时升级为 PASSWORD_HASHER 指定的算法"""
+
+    def login(self, password):
+        return self.client.post('/user/users/login/', {'username': 'legacy', 'password': password})
+
+    def test_legacy_hash_is_upgraded(self):
+        user = User.objects.create(username='legacy', password=make_password('secret123', hasher='pbkdf2_sha256'))
+
+        self.assertEqual(self.login('wrong').status_code, 400)
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'pbkdf2_sha256')
+
+        self.assertEqual(self.login('secret123').status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, settings.PASSWORD_HASHER)
+        self.assertTrue(check_password('secret123', user.password))
+
+        # 已是当前算法时不再写入
+        encoded = user.password
+        self.assertEqual(self.login('secret123').status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(user.password, encoded)
+
+
+class LazyTokenUserTest(UserCacheMixin, TestCase):
+    """JWT 认证不查询用户表，禁用用户和撤销的令牌通过用户状态缓存拒绝"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='alice', password='secret123', is_staff=True)
+        self.token = self.access_token(self.user)
+
+    def authenticate(self, token):
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+        result = OptionalJWTAuthentication().authenticate(request)
+        return result[0] if result else None
+
+    def test_authentication_does_not_select_user(self):
+        # 状态缓存未命中时只查询状态字段
+        with CaptureQueriesContext(connection) as context:
+            user = self.authenticate(self.token)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('password', context.captured_queries[0]['sql'])
+
+        with self.assertNumQueries(0):
+            user = self.authenticate(self.token)
+            self.assertEqual((user.pk, user.is_active, user.is_staff, user.is_superuser), (self.user.pk, True, True, False))
+            self.assertEqual(user, self.user)
+
+        # 访问其他字段时才加载用户对象
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'alice')
+            self.assertEqual(user.get_display_name(), 'alice')
+
+    def test_disabled_user_is_rejected(self):
+        self.assertIsNotNone(self.authenticate(self.token))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(self.authenticate(self.token))
+        response = self.client.get('/user/users/me/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.assertIsNotNone(self.authenticate(self.token))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_delete = True
+            self.user.save()
+        self.assertIsNone(self.authenticate(self.token))
+
+    def test_bumped_token_version_is_rejected(self):
+        self.assertIsNotNone(self.authenticate(self.token))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+        self.assertIsNone(self.authenticate(self.token))
+        self.assertEqual(self.authenticate(self.access_token(self.user)), self.user)
+
+
+class RefreshTokenRevocationStoreTest(TestCase):
+    """缓存前置模式下，缓存丢失记录或故障时仍以数据库拒绝重复使用"""
+
+    def setUp(self):
+        self.store = RefreshTokenRevocationStore(backend=CACHE, prune_interval=0)
+        self.jti = uuid.uuid4().hex
+        self.exp = timezone.now().timestamp() + 3600
+
+    def test_reuse_rejected(self):
+        self.assertTrue(self.store.revoke(self.jti, self.exp))
+        self.assertFalse(self.store.revoke(self.jti, self.exp))
+        self.assertTrue(self.store.is_revoked(self.jti))
+
+    def test_reuse_rejected_after_cache_eviction(self):
+        self.assertTrue(self.store.revoke(self.jti, self.exp))
+        self.store.cache.delete(self.store.make_key(self.jti))
+        self.assertTrue(self.store.is_revoked(self.jti))
+        self.assertFalse(self.store.revoke(self.jti, self.exp))
+
+    def test_reuse_rejected_after_cache_outage(self):
+        with mock.patch.object(self.store.cache, 'add', side_effect=ConnectionError), \
+                self.assertLogs('apps.user.revocation', 'ERROR'):
+            self.assertTrue(self.store.revoke(self.jti, self.exp))
+        self.assertFalse(self.store.revoke(self.jti, self.exp))
+
+
+class UserBatchTest(UserCacheMixin, TestCase):
+    """批量用户卡片：参数校验、缓存命中与未命中合并为一条 IN 查询、已删除用户"""
+
+    url = '/user/users/batch/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'user{index}', password='secret123', name=f'User {index}')
+            for index in range(4)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {self.access_token(self.users[0])}'
+        # 预先完成认证的状态缓存，后续只统计卡片查询
+        self.batch([self.users[0].pk])
+        for user in self.users:
+            user_cache.delete(card_key(user.pk))
+
+    def batch(self, ids):
+        return self.client.post(self.url, {'ids': ids}, content_type='application/json')
+
+    def test_requires_authentication(self):
+        response = self.client.post(self.url, {'ids': [1]}, content_type='application/json', HTTP_AUTHORIZATION='')
+        self.assertEqual(response.status_code, 401)
+
+    def test_validation(self):
+        for payload in ({}, {'ids': []}, {'ids': [0]}, {'ids': ['abc']}, {'ids': list(range(1, 202))}):
+            with self.subTest(payload=payload):
+                response = self.client.post(self.url, payload, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+        response = self.batch(list(range(1, 201)))
+        self.assertEqual(response.status_code, 200)
+
+    def test_order_duplicates_and_missing(self):
+        ids = [self.users[2].pk, self.users[0].pk, 999999, self.users[2].pk]
+        response = self.batch(ids)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([card['id'] for card in data['results']], [self.users[2].pk, self.users[0].pk])
+        self.assertEqual(data['results'][0], {'id': self.users[2].pk, 'name': 'User 2', 'avatar_url': None})
+        self.assertEqual(data['missing'], [999999])
+
+    def test_cache_hits_and_misses_use_one_query(self):
+        self.batch([self.users[1].pk])
+
+        ids = [user.pk for user in self.users[1:]]
+        with CaptureQueriesContext(connection) as context:
+            response = self.batch(ids)
+        self.assertEqual([card['id'] for card in response.json()['data']['results']], ids)
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql']
+        self.assertIn(' IN (', sql)
+        # 已缓存的用户不再查询
+        in_list = sql.split(' IN (', 1)[1].split(')', 1)[0]
+        self.assertEqual(sorted(int(value) for value in in_list.split(',')), ids[1:])
+        self.assertNotIn('password', sql)
+
+        with self.assertNumQueries(0):
+            self.batch(ids)
+
+    def test_deleted_user_is_missing(self):
+        user = self.users[3]
+        self.assertEqual(self.batch([user.pk]).json()['data']['missing'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_delete = True
+            user.save()
+        data = self.batch([user.pk]).json()['data']
+        self.assertEqual((data['results'], data['missing']), ([], [user.pk]))
+
+    def test_card_invalidated_on_save(self):
+        user = self.users[1]
+        self.batch([user.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            user.name = 'Renamed'
+            user.save()
+        self.assertEqual(self.batch([user.pk]).json()['data']['results'][0]['name'], 'Renamed')
+
+
+# 异步视图的测试路由：与 ASYNC_PUBLIC_ENDPOINTS 开启时的路由相同，挂在 async/ 下与同步接口对比
+urlpatterns = [
+    path('async/user/users/me/', async_views.me),
+    path('', include('django_server.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncMeParityTest(UserCacheMixin, TestCase):
+    """异步 users/me 与同步接口的状态码、响应结构和响应头一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alice', password='secret123', name='Alice')
+
+    async def assertSameResponse(self, method='get', **extra):
+        sync = await getattr(self.async_client, method)('/user/users/me/', **extra)
+        native = await getattr(self.async_client, method)('/async/user/users/me/', **extra)
+        self.assertEqual(native.status_code, sync.status_code)
+        self.assertEqual(native.get('WWW-Authenticate'), sync.get('WWW-Authenticate'))
+        self.assertEqual(native.json(), sync.json())
+        return sync
+
+    async def test_me(self):
+        response = await self.assertSameResponse(headers={'Authorization': f'Bearer {self.access_token(self.user)}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['name'], 'Alice')
+
+    async def test_unauthenticated(self):
+        for headers in ({}, {'Authorization': 'Bearer invalid'}):
+            response = await self.assertSameResponse(headers=headers)
+            self.assertEqual(response.status_code, 401)
+
+    async def test_method_not_allowed(self):
+        response = await self.assertSameResponse('post', headers={'Authorization': f'Bearer {self.access_token(self.user)}'})
+        self.assertEqual(response.status_code, 405)
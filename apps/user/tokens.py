@@ -0,0 +1,126 @@
+"""
+JWT 令牌与令牌用户
+认证时不查询用户表：用户 id、权限标记和令牌版本来自令牌声明和用户状态缓存，
+视图访问其他字段时才加载完整的用户对象
+"""
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .caches import get_user_state, aget_user_state, get_cached_user
+from .models import User
+
+TOKEN_VERSION_CLAIM = 'ver'
+IS_STAFF_CLAIM = 'is_staff'
+
+
+class RefreshToken(tokens.RefreshToken):
+    """刷新令牌
+
+    在默认声明之外写入 is_staff 和令牌版本，由其生成的访问令牌同样包含这些声明
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[IS_STAFF_CLAIM] = user.is_staff
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+    @classmethod
+    def for_state(cls, user_id, state):
+        """根据用户状态缓存签发令牌，刷新令牌时不需要加载用户对象"""
+        token = cls()
+        token[api_settings.USER_ID_CLAIM] = str(user_id)
+        token[IS_STAFF_CLAIM] = state['is_staff']
+        token[TOKEN_VERSION_CLAIM] = state['token_version']
+        return token
+
+
+def check_token_state(token, state):
+    """校验令牌对应的用户状态
+
+    用户不存在、已删除、已禁用或令牌版本与当前版本不一致（已调用 User.revoke_tokens）时令牌无效
+
+    Raises:
+        AuthenticationFailed: 令牌无效
+    """
+    if not state or state['is_delete']:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    if token.get(TOKEN_VERSION_CLAIM, 0) != state['token_version']:
+        raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+
+class LazyTokenUser:
+    """基于令牌的惰性用户对象（SIMPLE_JWT['TOKEN_USER_CLASS']）
+
+    - id / pk / is_active / is_staff / is_superuser / token_version 来自令牌和用户状态缓存，不查询数据库
+    - 访问其他属性或方法时才加载完整的 User 对象（进程内短时缓存），之后的读写都作用于该对象
+    - 与同一用户的 User 对象比较相等
+    """
+    _own_attributes = frozenset({
+        'token', 'id', 'pk', 'is_active', 'is_staff', 'is_superuser', 'token_version', '_user',
+    })
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token, state=None):
+        user_id = token[api_settings.USER_ID_CLAIM]
+        if state is None:
+            state = get_user_state(user_id)
+        check_token_state(token, state)
+
+        set_attribute = super().__setattr__
+        set_attribute('token', token)
+        set_attribute('id', User._meta.pk.to_python(user_id))
+        set_attribute('pk', self.id)
+        set_attribute('is_active', state['is_active'])
+        set_attribute('is_staff', state['is_staff'])
+        set_attribute('is_superuser', state['is_superuser'])
+        set_attribute('token_version', state['token_version'])
+        set_attribute('_user', None)
+
+    @classmethod
+    async def afrom_token(cls, token):
+        """异步创建，用户状态通过异步缓存接口读取"""
+        return cls(token, await aget_user_state(token[api_settings.USER_ID_CLAIM]))
+
+    @property
+    def user(self):
+        """完整的 User 对象，首次访问时加载"""
+        if self._user is None:
+            user = get_cached_user(self.id)
+            if user is None:
+                raise User.DoesNotExist(f'User {self.id} does not exist')
+            super().__setattr__('_user', user)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        if name in self._own_attributes:
+            super().__setattr__(name, value)
+            if self._user is not None and name not in ('token', '_user'):
+                setattr(self._user, name, value)
+        else:
+            setattr(self.user, name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, (LazyTokenUser, User)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self.user)
+
+    def __repr__(self):
+        return f'<LazyTokenUser: {self.pk}>'
@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'users', views.UserViewSet, basename='user')
@@ -9,3 +10,9 @@ router.register(r'users', views.UserViewSet, basename='user')
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+# ASGI 部署时热点公共接口使用异步视图，需放在 router 之前优先匹配
+if settings.ASYNC_PUBLIC_ENDPOINTS:
+    urlpatterns = [
+        path('users/me/', async_views.me, name='user-me'),
+    ] + urlpatterns
@@ -1,33 +1,60 @@
+import re
+
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 from utils.base_views import BaseModelViewSet
+from utils.renderers import RawJSON
 from utils.response import ResponseUtil
 from . import models
-from .serializers import UserLoginSerializer, UserSerializer, TokenRefreshSerializer
+from .caches import get_profile, get_user_cards
+from .passwords import check_user_password
+from .serializers import (
+    UserLoginSerializer, UserSerializer, TokenRefreshSerializer, UserBatchRequestSerializer, UserCardSerializer
+)
+
+MOBILE_PATTERN = re.compile(r'[0-9]{11}')  # 手机号格式，用于区分用户名和手机号登录
 
 
 class CustomBackend(ModelBackend):
     """自定义用户验证
     
     支持用户名或手机号登录
+    - 11 位数字按手机号查询，未找到时再按用户名查询，其余按用户名查询，每次只走一个唯一索引
+    - 只加载认证、后台登录和登录响应需要的字段（login_fields）
+    - 登录接口传入 use_login_executor=True，密码哈希在登录线程池中校验（见 passwords.py），
+      线程池已满时抛出 ExecutorBusy 由登录接口返回 429；后台登录等其他 authenticate() 调用在当前线程中校验
     """
+    login_fields = (
+        'id', 'username', 'password', 'is_active', 'is_staff', 'is_superuser', 'last_login', 'token_version',
+        'name', 'gender', 'mobile', 'avatar_url',
+    )
 
-    def authenticate(self, request, username=None, password=None, **kwargs):
+    def authenticate(self, request, username=None, password=None, use_login_executor=False, **kwargs):
         if username is None:
             username = kwargs.get(models.User.USERNAME_FIELD)
         if username is None or password is None:
             return None
 
-        try:
-            user = models.User.objects.get(Q(username=username) | Q(mobile=username))
-            if user.check_password(password):
-                return user
-        except models.User.DoesNotExist:
-            return None
+        user = self.get_login_user(username)
+        if user is not None and check_user_password(user, password, offload=use_login_executor):
+            return user
+        return None
+
+    def get_login_user(self, identifier):
+        """根据用户名或手机号查询用户，不存在时返回 None"""
+        queryset = models.User.objects.only(*self.login_fields)
+        lookups = [{'username': identifier}]
+        if MOBILE_PATTERN.fullmatch(identifier):
+            lookups.insert(0, {'mobile': identifier})
+        for lookup in lookups:
+            try:
+                return queryset.get(**lookup)
+            except models.User.DoesNotExist:
+                continue
+        return None
 
 
 class UserViewSet(BaseModelViewSet):
@@ -37,18 +64,21 @@ class UserViewSet(BaseModelViewSet):
     - list: 获取用户列表（需要管理员权限）
     - update: 更新用户信息
     - me: 获取当前登录用户信息
+    - batch: 批量获取用户卡片（id、姓名、头像）
     - login: 用户登录
     - refresh_token: 刷新令牌
     """
     resource_name = '用户'
     queryset = models.User.objects.filter(is_delete=False)
     serializer_class = UserSerializer
+    keyset_ordering = ('-create_time', '-id')  # 键集分页，使用 idx_user_create_time 索引
+    count_mode = 'estimated'  # 用户表较大，超过 10 万行时使用估算总数
 
     def get_permissions(self):
         """根据操作类型设置权限"""
         if self.action == 'list':
             return [IsAdminUser()]
-        elif self.action in ['retrieve', 'update', 'partial_update', 'me']:
+        elif self.action in ['retrieve', 'update', 'partial_update', 'me', 'batch']:
             return [IsAuthenticated()]
         return []
 
@@ -58,6 +88,8 @@ class UserViewSet(BaseModelViewSet):
             return UserLoginSerializer
         elif self.action == 'refresh_token':
             return TokenRefreshSerializer
+        elif self.action == 'batch':
+            return UserBatchRequestSerializer
         return UserSerializer
 
     def update(self, request, *args, **kwargs):
@@ -75,8 +107,29 @@ class UserViewSet(BaseModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         """获取当前登录用户信息"""
-        serializer = self.get_serializer(request.user)
-        return ResponseUtil(data=serializer.data, http_status=status.HTTP_200_OK)
+        data = get_profile(request.user, lambda: RawJSON.encode(self.get_serializer(request.user).data))
+        return ResponseUtil(data=data, http_status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def batch(self, request):
+        """批量获取用户卡片
+
+        一次请求最多 200 个 id，用于列表中展示其他用户的头像和姓名
+        - results: 用户卡片 {id, name, avatar_url}，顺序与传入的 ids 一致（重复 id 只返回一次）
+        - missing: 不存在或已删除的用户 id
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        cards = get_user_cards(user_ids)
+        return ResponseUtil(
+            data={
+                'results': UserCardSerializer([cards[user_id] for user_id in user_ids if user_id in cards], many=True).data,
+                'missing': [user_id for user_id in user_ids if user_id not in cards],
+            },
+            http_status=status.HTTP_200_OK
+        )
 
     @action(detail=False, methods=['post'], permission_classes=[])
     def login(self, request):
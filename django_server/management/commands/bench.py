@@ -0,0 +1,528 @@
+"""
+性能基准测试命令
+
+使用示例:
+    # 压测 HTTP 接口，对比 WSGI 与 ASGI 部署的吞吐量和延迟
+    python manage.py bench http --url "http://127.0.0.1:8000/setting/versions/latest/?platform=android"
+
+    # 对比密码哈希算法单核每秒可完成的登录校验次数
+    python manage.py bench hashers --algorithm pbkdf2_sha256 --algorithm scrypt
+
+    # 对比公共接口携带 token 时立即认证与延迟认证的单请求 CPU 耗时
+    python manage.py bench auth
+
+    # 1000 万个未使用的刷新令牌时的刷新令牌吞吐量
+    python manage.py bench refresh --outstanding 10000000
+
+    # 对比 DRF 序列化与编译后的只读序列化（20 / 200 / 2000 行）
+    python manage.py bench serializers
+
+    # 对比响应日志关闭、未采样和全部采样时的单请求 CPU 耗时
+    python manage.py bench response_logging
+
+    # 对比逐个调用 versions/check 与一次调用 versions/batch_check 的单项 CPU 耗时
+    python manage.py bench version_check
+
+    # 对比启动时分别调用 versions/check + 3 次 configs/get_by_type 与一次调用 bootstrap 的 CPU 耗时
+    python manage.py bench bootstrap
+"""
+import json
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, percent):
+    """计算百分位数（values 需已排序）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(percent / 100 * len(values))) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = '性能基准测试'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='suite', required=True)
+
+        http = subparsers.add_parser('http', help='HTTP 接口压测，输出吞吐量和延迟分位数')
+        http.add_argument('--url', action='append', required=True, help='压测地址，可重复指定，按顺序轮流请求')
+        http.add_argument('--method', default='GET', help='请求方法，默认 GET')
+        http.add_argument('--data', help='JSON 请求体')
+        http.add_argument('--header', action='append', default=[], help='请求头，格式 Name: value，可重复指定')
+        http.add_argument('--concurrency', type=int, default=20, help='并发数，默认 20')
+        http.add_argument('--requests', type=int, default=2000, help='总请求数，默认 2000')
+        http.add_argument('--warmup', type=int, default=50, help='预热请求数，默认 50')
+        http.add_argument('--timeout', type=float, default=10, help='单个请求超时时间（秒），默认 10')
+
+        hashers = subparsers.add_parser('hashers', help='密码哈希校验耗时，输出单核每秒登录次数')
+        hashers.add_argument('--algorithm', action='append', help='算法名称，可重复指定，默认对比 pbkdf2_sha256 和当前首选算法')
+        hashers.add_argument('--iterations', type=int, default=20, help='每个算法的校验次数，默认 20')
+
+        auth = subparsers.add_parser('auth', help='公共接口立即认证与延迟认证的单请求 CPU 耗时')
+        auth.add_argument('--requests', type=int, default=2000, help='每个接口每种模式的请求数，默认 2000')
+        auth.add_argument('--user-id', default='1', help='token 中的用户 id，默认 1')
+
+        refresh = subparsers.add_parser('refresh', help='刷新令牌吞吐量（验证、撤销旧令牌、签发新令牌）')
+        refresh.add_argument('--outstanding', type=int, default=100000, help='未使用的刷新令牌数，默认 100000')
+        refresh.add_argument('--requests', type=int, default=2000, help='刷新次数，默认 2000')
+        refresh.add_argument('--user-id', help='签发令牌的用户 id，默认使用第一个有效用户')
+        refresh.add_argument('--batch-size', type=int, default=10000, help='写入上一代令牌撤销记录的批大小，默认 10000')
+
+        serializers = subparsers.add_parser('serializers', help='DRF 序列化与编译后的只读序列化耗时对比')
+        serializers.add_argument('--rows', type=int, action='append', help='行数，可重复指定，默认 20、200、2000')
+        serializers.add_argument('--repeat', type=int, default=20, help='每种行数的重复次数，默认 20')
+
+        response_logging = subparsers.add_parser('response_logging', help='响应日志中间件的单请求 CPU 耗时')
+        response_logging.add_argument('--rows', type=int, action='append', help='响应列表行数，可重复指定，默认 20、200')
+        response_logging.add_argument('--requests', type=int, default=2000, help='每种模式的请求数，默认 2000')
+
+        version_check = subparsers.add_parser('version_check', help='逐个检查与批量检查版本更新的单项 CPU 耗时')
+        version_check.add_argument('--items', type=int, action='append', help='每批项数，可重复指定，默认 1、10、100、500')
+        version_check.add_argument('--repeat', type=int, default=50, help='每种项数的重复次数，默认 50')
+
+        bootstrap = subparsers.add_parser('bootstrap', help='启动时分别调用各接口与调用 bootstrap 的 CPU 耗时')
+        bootstrap.add_argument('--requests', type=int, default=1000, help='每种方式的启动次数，默认 1000')
+
+    def handle(self, *args, **options):
+        getattr(self, f'bench_{options["suite"]}')(**options)
+
+    def report(self, title, rows):
+        """输出结果表格"""
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, value in rows:
+            self.stdout.write(f'  {name:<24}{value}')
+
+    def bench_http(self, url, method, data, header, concurrency, requests, warmup, timeout, **options):
+        import requests as http_client
+
+        headers = {'Content-Type': 'application/json'} if data else {}
+        for item in header:
+            name, _, value = item.partition(':')
+            headers[name.strip()] = value.strip()
+        body = json.loads(data) if data else None
+
+        def send(session, index):
+            return session.request(method, url[index % len(url)], json=body, headers=headers, timeout=timeout)
+
+        with http_client.Session() as session:
+            for index in range(warmup):
+                send(session, index)
+
+        latencies = []
+        errors = []
+        statuses = {}
+        lock = threading.Lock()
+        counter = iter(range(requests))
+
+        def worker():
+            local_latencies = []
+            with http_client.Session() as session:
+                while True:
+                    with lock:
+                        index = next(counter, None)
+                    if index is None:
+                        break
+                    start = time.perf_counter()
+                    try:
+                        response = send(session, index)
+                        code = response.status_code
+                    except http_client.RequestException as exc:
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    local_latencies.append(time.perf_counter() - start)
+                    with lock:
+                        statuses[code] = statuses.get(code, 0) + 1
+            with lock:
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not latencies:
+            raise CommandError(f'没有成功的请求: {errors[:3]}')
+
+        latencies.sort()
+        self.report(f'HTTP {method} x {requests} (并发 {concurrency})', [
+            ('requests/sec', f'{len(latencies) / elapsed:.1f}'),
+            ('p50 (ms)', f'{percentile(latencies, 50) * 1000:.2f}'),
+            ('p95 (ms)', f'{percentile(latencies, 95) * 1000:.2f}'),
+            ('p99 (ms)', f'{percentile(latencies, 99) * 1000:.2f}'),
+            ('mean (ms)', f'{statistics.mean(latencies) * 1000:.2f}'),
+            ('status', ', '.join(f'{k}: {v}' for k, v in sorted(statuses.items()))),
+            ('errors', str(len(errors))),
+        ])
+
+    def bench_hashers(self, algorithm, iterations, **options):
+        from django.contrib.auth.hashers import get_hasher
+
+        preferred = get_hasher('default').algorithm
+        algorithms = algorithm or list(dict.fromkeys(['pbkdf2_sha256', preferred]))
+        rows = []
+        for name in algorithms:
+            try:
+                hasher = get_hasher(name)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            encoded = hasher.encode('benchmark-password', hasher.salt())
+            hasher.verify('benchmark-password', encoded)
+
+            durations = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                hasher.verify('benchmark-password', encoded)
+                durations.append(time.perf_counter() - start)
+            mean = statistics.mean(durations)
+            label = f'{name} (首选)' if name == preferred else name
+            rows.append((label, f'{mean * 1000:.1f} ms/次, {1 / mean:.1f} 次/秒/核'))
+        self.report(f'密码哈希校验 x {iterations}', rows)
+
+    def bench_auth(self, requests, user_id, **options):
+        from rest_framework.test import APIRequestFactory
+        from rest_framework_simplejwt.settings import api_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from apps.setting.views import AppVersionViewSet, DynamicConfigViewSet
+
+        token = AccessToken()
+        token[api_settings.USER_ID_CLAIM] = user_id
+        authorization = f'Bearer {token}'
+        factory = APIRequestFactory()
+
+        routes = [
+            ('versions/check', AppVersionViewSet, 'check', lambda: factory.post(
+                '/setting/versions/check/', {'platform': 'android', 'version_code': 1},
+                format='json', HTTP_AUTHORIZATION=authorization)),
+            ('versions/latest', AppVersionViewSet, 'latest', lambda: factory.get(
+                '/setting/versions/latest/', {'platform': 'android'}, HTTP_AUTHORIZATION=authorization)),
+            ('configs/get_by_type', DynamicConfigViewSet, 'get_by_type', lambda: factory.get(
+                '/setting/configs/get_by_type/', {'type': 'banner'}, HTTP_AUTHORIZATION=authorization)),
+        ]
+
+        rows = []
+        for name, viewset, action_name, make_request in routes:
+            method = 'post' if action_name == 'check' else 'get'
+            view = viewset.as_view({method: action_name})
+            lazy_actions = viewset.lazy_authentication_actions
+            timings = {}
+            for mode, actions in (('eager', ()), ('lazy', lazy_actions)):
+                viewset.lazy_authentication_actions = actions
+                try:
+                    for _ in range(min(requests, 50)):
+                        view(make_request())
+                    start = time.process_time()
+                    for _ in range(requests):
+                        view(make_request())
+                    timings[mode] = (time.process_time() - start) / requests
+                finally:
+                    viewset.lazy_authentication_actions = lazy_actions
+            saved = timings['eager'] - timings['lazy']
+            rows.append((name, f'立即认证 {timings["eager"] * 1e6:.0f} µs, 延迟认证 {timings["lazy"] * 1e6:.0f} µs, '
+                               f'节省 {saved * 1e6:.0f} µs ({saved * 100 / timings["eager"]:.1f}%)'))
+        self.report(f'公共接口单请求 CPU 耗时 x {requests}（携带 Bearer token）', rows)
+
+    def bench_refresh(self, outstanding, requests, user_id, batch_size, **options):
+        """刷新令牌吞吐量
+
+        每个未使用的刷新令牌都由上一代令牌轮换得到，稳态下存储中有 outstanding 条上一代令牌的撤销记录，
+        未使用的令牌本身不占用存储。预先写入这些撤销记录，从未使用的令牌中抽取 requests 个刷新，
+        再重放上一代令牌（缓存命中和缓存淘汰后各一半）验证重复使用被拒绝
+        """
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from apps.user.caches import get_user_state
+        from apps.user.models import RevokedToken, User
+        from apps.user.revocation import revocation_store
+        from apps.user.serializers import TokenRefreshSerializer
+        from apps.user.tokens import RefreshToken
+        from utils.metrics import metrics
+
+        users = User.objects.filter(is_active=True, is_delete=False)
+        user_id = user_id or users.values_list('pk', flat=True).first()
+        if user_id is None:
+            raise CommandError('没有可用的用户，请通过 --user-id 指定')
+        state = get_user_state(user_id)
+
+        def make_token(jti=None):
+            token = RefreshToken.for_state(user_id, state)
+            if jti is not None:
+                token['jti'] = jti
+            return str(token)
+
+        # 写入未使用令牌的上一代令牌撤销记录
+        prefix = 'bench-'
+        expires_at = timezone.now() + timedelta(hours=1)
+        started = time.perf_counter()
+        for offset in range(0, outstanding, batch_size):
+            jtis = [f'{prefix}{index:026d}' for index in range(offset, min(offset + batch_size, outstanding))]
+            RevokedToken.objects.bulk_create(
+                [RevokedToken(jti=jti, expires_at=expires_at) for jti in jtis], ignore_conflicts=True
+            )
+            if revocation_store.uses_cache:
+                revocation_store.cache.set_many({revocation_store.make_key(jti): 1 for jti in jtis}, 3600)
+        seed_time = time.perf_counter() - started
+
+        def refresh(token):
+            start = time.perf_counter()
+            valid = TokenRefreshSerializer(data={'refresh': token}).is_valid()
+            return valid, time.perf_counter() - start
+
+        try:
+            tokens = [make_token() for _ in range(requests)]
+            replayed = [
+                make_token(f'{prefix}{index * max(outstanding // requests, 1) % max(outstanding, 1):026d}')
+                for index in range(min(requests, outstanding))
+            ]
+            metrics.reset()
+
+            latencies = []
+            started = time.perf_counter()
+            for token in tokens:
+                valid, latency = refresh(token)
+                if not valid:
+                    raise CommandError('刷新未使用的令牌失败')
+                latencies.append(latency)
+            elapsed = time.perf_counter() - started
+            db_write = metrics.snapshot('auth.revocation.db_latency')['timings'].get('auth.revocation.db_latency', {})
+
+            # 重放上一代令牌，后一半先从缓存中删除，模拟缓存淘汰
+            rejected = []
+            for index, token in enumerate(replayed):
+                if index >= len(replayed) // 2 and revocation_store.uses_cache:
+                    revocation_store.cache.delete(revocation_store.make_key(RefreshToken(token)['jti']))
+                valid, latency = refresh(token)
+                rejected.append((not valid, latency))
+        finally:
+            RevokedToken.objects.filter(jti__startswith=prefix).delete()
+            for token in tokens:
+                RevokedToken.objects.filter(jti=RefreshToken(token, verify=False)['jti']).delete()
+
+        latencies.sort()
+        reuse_latencies = sorted(latency for _, latency in rejected)
+        storage = 'cache + db' if revocation_store.uses_cache else 'db'
+        self.report(f'刷新令牌 x {requests}（未使用的令牌 {outstanding}，存储: {storage}）', [
+            ('seed (s)', f'{seed_time:.1f}'),
+            ('refresh/sec', f'{requests / elapsed:.1f}'),
+            ('p50 (ms)', f'{percentile(latencies, 50) * 1000:.3f}'),
+            ('p99 (ms)', f'{percentile(latencies, 99) * 1000:.3f}'),
+            ('db write avg (ms)', f'{db_write.get("avg_ms", 0):.3f}'),
+            ('reuse rejected', f'{sum(ok for ok, _ in rejected)}/{len(rejected)}'),
+            ('reuse p50 (ms)', f'{percentile(reuse_latencies, 50) * 1000:.3f}'),
+        ])
+
+    def bench_serializers(self, rows, repeat, **options):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from rest_framework.renderers import JSONRenderer
+
+        from apps.setting.models import AppVersion, DynamicConfig
+        from apps.setting.serializers import AppVersionListSerializer, DynamicConfigClientSerializer
+        from utils.fast_serializer import compile_read_serializer
+
+        now = timezone.now()
+        factories = [
+            ('versions', AppVersionListSerializer, lambda index: AppVersion(
+                id=index + 1, platform=('ios', 'android', 'all')[index % 3], version_code=index + 1,
+                version_name=f'1.{index}.0', title=f'版本 {index}', description='更新说明',
+                is_force_update=index % 2 == 0, is_active=True, create_time=now - timedelta(minutes=index),
+            )),
+            ('configs', DynamicConfigClientSerializer, lambda index: DynamicConfig(
+                id=index + 1, type='banner', title=f'配置 {index}', banner_image_url='https://example.com/a.png',
+                target_url='https://example.com/', description='描述', sort_order=index,
+                start_time=now, end_time=now + timedelta(days=1), extra_data={'index': index},
+                create_time=now, update_time=now,
+            )),
+        ]
+
+        renderer = JSONRenderer()
+        results = []
+        for label, serializer_class, factory in factories:
+            compiled = compile_read_serializer(serializer_class)
+            if compiled is None:
+                raise CommandError(f'{serializer_class.__name__} 无法编译')
+            for size in rows or (20, 200, 2000):
+                instances = [factory(index) for index in range(size)]
+                # 模拟 values() 的返回行
+                value_rows = [{column: getattr(instance, column) for column in compiled.columns} for instance in instances]
+
+                expected = renderer.render(serializer_class(instances, many=True).data)
+                if renderer.render(compiled.serialize(value_rows)) != expected:
+                    raise CommandError(f'{serializer_class.__name__} 编译结果与 DRF 输出不一致')
+
+                start = time.process_time()
+                for _ in range(repeat):
+                    renderer.render(serializer_class(instances, many=True).data)
+                drf = (time.process_time() - start) / repeat
+                start = time.process_time()
+                for _ in range(repeat):
+                    renderer.render(compiled.serialize(value_rows))
+                fast = (time.process_time() - start) / repeat
+                results.append((f'{label} x {size}',
+                                f'DRF {drf * 1000:.2f} ms, 编译 {fast * 1000:.2f} ms, {drf / fast:.1f}x'))
+        self.report(f'序列化 + JSON 渲染 CPU 耗时（重复 {repeat} 次取平均，输出一致）', results)
+
+    def bench_response_logging(self, rows, requests, **options):
+        import io
+        import logging
+
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+        from django.http import HttpResponse
+        from django.test import RequestFactory, override_settings
+        from django.utils import timezone
+
+        from utils import middleware
+        from utils.response import ResponseUtil
+
+        # 默认配置下中间件抛出 MiddlewareNotUsed，不在中间件链中
+        try:
+            middleware.ResponseLoggingMiddleware(lambda request: None)
+            loaded = True
+        except MiddlewareNotUsed:
+            loaded = False
+        self.report('当前配置', [('中间件已加载', str(loaded))])
+
+        enabled = {**settings.RESPONSE_LOGGING, 'ENABLED': True, 'ROUTE_SAMPLE_RATES': {}}
+        modes = [
+            ('开启，采样率 0', {**enabled, 'SAMPLE_RATE': 0}, logging.DEBUG),
+            ('开启，日志级别 INFO', {**enabled, 'SAMPLE_RATE': 1}, logging.INFO),
+            ('开启，全部采样', {**enabled, 'SAMPLE_RATE': 1}, logging.DEBUG),
+        ]
+
+        # 日志写入内存，计入格式化开销
+        logger = middleware.log
+        saved = logger.handlers[:], logger.level, logger.propagate
+        logger.handlers = [logging.StreamHandler(io.StringIO())]
+        logger.propagate = False
+
+        request = RequestFactory().get('/setting/versions/')
+        now = timezone.now().isoformat()
+        try:
+            for size in rows or (20, 200):
+                data = {'code': 200, 'message': 'success', 'data': [
+                    {'id': index, 'platform': 'android', 'platform_display': 'Android', 'version_code': index,
+                     'version_name': f'1.{index}.0', 'title': f'版本 {index}', 'is_force_update': False,
+                     'is_active': True, 'create_time': now}
+                    for index in range(size)
+                ]}
+                response = HttpResponse(json.dumps(data, ensure_ascii=False), content_type='application/json')
+
+                # 旧实现在 ResponseUtil 构造时用 f-string 格式化整个响应
+                start = time.process_time()
+                for _ in range(requests):
+                    f'响应结果: {data}'
+                legacy = (time.process_time() - start) / requests
+                start = time.process_time()
+                for _ in range(requests):
+                    ResponseUtil(data=data['data'])
+                construct = (time.process_time() - start) / requests
+
+                results = [
+                    ('ResponseUtil 构造', f'{construct * 1e6:.2f} µs'),
+                    ('旧实现格式化响应', f'{legacy * 1e6:.2f} µs'),
+                ]
+                for name, mode_options, log_level in modes:
+                    logger.setLevel(log_level)
+                    with override_settings(RESPONSE_LOGGING=mode_options):
+                        instance = middleware.ResponseLoggingMiddleware(lambda request: response)
+                    start = time.process_time()
+                    for _ in range(requests):
+                        instance(request)
+                    results.append((name, f'{(time.process_time() - start) / requests * 1e6:.2f} µs'))
+                self.report(f'响应日志单请求 CPU 耗时 x {requests}（{size} 行，{len(response.content)} bytes）', results)
+        finally:
+            logger.handlers, level, logger.propagate = saved
+            logger.setLevel(level)
+
+    def bench_version_check(self, items, repeat, **options):
+        import random
+
+        from rest_framework.test import APIRequestFactory
+
+        from apps.setting.views import AppVersionViewSet
+
+        factory = APIRequestFactory()
+        check = AppVersionViewSet.as_view({'post': 'check'})
+        batch_check = AppVersionViewSet.as_view({'post': 'batch_check'})
+
+        rows = []
+        for size in items or (1, 10, 100, 500):
+            tuples = [
+                {'platform': random.choice(('ios', 'android', 'all')), 'version_code': random.randint(1, 200)}
+                for _ in range(size)
+            ]
+            for item in tuples[:10]:
+                check(factory.post('/setting/versions/check/', item, format='json')).render()
+            batch_check(factory.post('/setting/versions/batch_check/', {'items': tuples}, format='json')).render()
+
+            start = time.process_time()
+            for _ in range(repeat):
+                for item in tuples:
+                    check(factory.post('/setting/versions/check/', item, format='json')).render()
+            single = (time.process_time() - start) / repeat / size
+            start = time.process_time()
+            for _ in range(repeat):
+                response = batch_check(factory.post('/setting/versions/batch_check/', {'items': tuples}, format='json'))
+                response.render()
+            batch = (time.process_time() - start) / repeat / size
+            if response.status_code != 200:
+                raise CommandError(f'batch_check 返回 {response.status_code}: {response.content[:200]}')
+            rows.append((f'{size} 项', f'逐个 {single * 1e6:.1f} µs/项, 批量 {batch * 1e6:.1f} µs/项, {single / batch:.1f}x'))
+        self.report(f'版本检查单项 CPU 耗时（重复 {repeat} 次取平均）', rows)
+
+    def bench_bootstrap(self, requests, **options):
+        from rest_framework.test import APIRequestFactory
+
+        from apps.setting.snapshots import dynamic_config_feeds
+        from apps.setting.views import AppVersionViewSet, BootstrapView, DynamicConfigViewSet
+
+        factory = APIRequestFactory()
+        check = AppVersionViewSet.as_view({'post': 'check'})
+        get_by_type = DynamicConfigViewSet.as_view({'get': 'get_by_type'})
+        bootstrap = BootstrapView.as_view()
+        params = {'platform': 'android', 'version_code': 1}
+
+        def separate():
+            responses = [check(factory.post('/setting/versions/check/', params, format='json')).render()]
+            for config_type in dynamic_config_feeds.config_types:
+                request = factory.get('/setting/configs/get_by_type/', {'type': config_type})
+                responses.append(get_by_type(request).render())
+            return responses
+
+        def combined(etags=None):
+            data = dict(params, etags=etags) if etags else params
+            return [bootstrap(factory.post('/setting/bootstrap/', data, format='json')).render()]
+
+        response = combined()[0]
+        if response.status_code != 200:
+            raise CommandError(f'bootstrap 返回 {response.status_code}: {response.content[:200]}')
+        sections = response.data['data']
+        etags = {'version': sections['version']['etag']}
+        etags.update({config_type: section['etag'] for config_type, section in sections['configs'].items()})
+
+        rows = []
+        for name, launch in (
+            ('分别调用（4 个请求）', separate),
+            ('bootstrap', combined),
+            ('bootstrap 全部未变化', lambda: combined(etags)),
+        ):
+            launch()
+            start = time.process_time()
+            for _ in range(requests):
+                responses = launch()
+            elapsed = (time.process_time() - start) / requests
+            size = sum(len(item.content) for item in responses)
+            rows.append((name, f'{elapsed * 1e6:.1f} µs/次启动, 响应体 {size} bytes'))
+        self.report(f'客户端启动 CPU 耗时 x {requests}', rows)
@@ -74,11 +74,15 @@ INSTALLED_APPS = [
 
     'apps.user.apps.UserConfig',  # 用户相关
     'apps.setting.apps.SettingConfig',  # 系统设置相关
+
+    'django_server',  # 项目级管理命令
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'utils.middleware.CompressionMiddleware',  # 响应压缩，需要在读取或修改响应体的中间件之前（RESPONSE_COMPRESSION）
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise中间件，必须在SecurityMiddleware之后
+    'utils.middleware.ResponseLoggingMiddleware',  # 响应日志，默认关闭（RESPONSE_LOGGING）
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS中间件，需要放在CommonMiddleware之前
     'django.middleware.common.CommonMiddleware',
@@ -108,6 +112,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'django_server.wsgi.application'
 
+# 部署方式：wsgi（gunicorn 同步 worker）或 asgi（gunicorn + uvicorn worker）
+SERVER_MODE = env.str('SERVER_MODE', default='wsgi')
+
+# 是否使用异步视图处理热点公共接口（版本检查、最新版本、配置获取、当前用户），ASGI 部署时默认开启
+ASYNC_PUBLIC_ENDPOINTS = env.bool('ASYNC_PUBLIC_ENDPOINTS', default=SERVER_MODE == 'asgi')
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -132,6 +142,100 @@ DATABASES = {
     }
 }
 
+# 缓存配置
+# CACHE_URL 示例：redis://redis:6379/0（任何兼容 Redis 协议的服务均可），未配置时使用进程内缓存
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
+}
+CACHES['default'].setdefault('KEY_PREFIX', 'zishi')
+
+# 二级缓存（utils.cache.TieredCache）配置
+TIERED_CACHE = {
+    'L1_MAX_ENTRIES': env.int('CACHE_L1_MAX_ENTRIES', default=1024),  # 进程内 LRU 最大条目数
+    'L1_TIMEOUT': env.int('CACHE_L1_TIMEOUT', default=5),  # 进程内缓存过期时间（秒）
+    'LOCK_TIMEOUT': env.int('CACHE_LOCK_TIMEOUT', default=10),  # 防击穿锁超时时间（秒）
+}
+
+# 用户资料缓存过期时间（秒）
+USER_PROFILE_CACHE_TIMEOUT = env.int('USER_PROFILE_CACHE_TIMEOUT', default=300)
+
+# JWT 认证使用的用户状态（is_active、is_staff、令牌版本）缓存过期时间（秒），用户保存时主动失效
+USER_STATE_CACHE_TIMEOUT = env.int('USER_STATE_CACHE_TIMEOUT', default=300)
+
+# 进程内用户对象缓存过期时间（秒），其他进程保存用户后最多延迟该时间读到新值
+USER_ROW_CACHE_TIMEOUT = env.int('USER_ROW_CACHE_TIMEOUT', default=5)
+
+# 认证后端：支持用户名或手机号登录
+AUTHENTICATION_BACKENDS = ['apps.user.views.CustomBackend']
+
+# 响应压缩（utils.middleware.CompressionMiddleware）配置，安装 brotli 时优先使用 br，否则使用 gzip
+RESPONSE_COMPRESSION = {
+    'ENABLED': env.bool('RESPONSE_COMPRESSION_ENABLED', default=True),
+    'MIN_SIZE': env.int('RESPONSE_COMPRESSION_MIN_SIZE', default=1024),  # 小于该字节数的响应不压缩
+    'GZIP_LEVEL': env.int('RESPONSE_COMPRESSION_GZIP_LEVEL', default=6),  # 1 ~ 9
+    'BROTLI_QUALITY': env.int('RESPONSE_COMPRESSION_BROTLI_QUALITY', default=5),  # 0 ~ 11
+    'CACHE_ENTRIES': env.int('RESPONSE_COMPRESSION_CACHE_ENTRIES', default=256),  # 快照接口压缩结果缓存条目数
+    'CACHE_MAX_SIZE': 256 * 1024,  # 超过该字节数的响应体不缓存压缩结果
+}
+
+# 响应日志（utils.middleware.ResponseLoggingMiddleware）配置
+RESPONSE_LOGGING = {
+    'ENABLED': env.bool('RESPONSE_LOGGING_ENABLED', default=False),  # 关闭时中间件不参与请求处理
+    'SAMPLE_RATE': env.float('RESPONSE_LOGGING_SAMPLE_RATE', default=1.0),  # 默认采样率，0 ~ 1
+    # 按路径前缀设置采样率，格式 /setting/=0.1,/user/users/me/=0
+    'ROUTE_SAMPLE_RATES': env.dict('RESPONSE_LOGGING_ROUTE_SAMPLE_RATES', default={}),
+    'MAX_BODY_SIZE': env.int('RESPONSE_LOGGING_MAX_BODY_SIZE', default=2048),  # 记录的响应体最大字节数
+}
+
+# 日志配置：开启响应日志时 utils.middleware 输出 DEBUG 日志到标准输出
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'utils.middleware': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if RESPONSE_LOGGING['ENABLED'] else 'WARNING',
+            'propagate': False,
+        },
+        'apps.setting.scheduler': {  # 动态配置调度器，记录每次上下线刷新
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# 登录密码校验线程池（utils.executor.BoundedExecutor）配置
+LOGIN_EXECUTOR = {
+    'MAX_WORKERS': env.int('LOGIN_MAX_WORKERS', default=4),  # 同时进行的密码哈希计算数
+    'MAX_QUEUE': env.int('LOGIN_MAX_QUEUE', default=32),  # 排队上限，超过后返回 429
+    'TIMEOUT': env.int('LOGIN_TIMEOUT', default=10),  # 等待校验结果的最长时间（秒）
+    'RETRY_AFTER': env.int('LOGIN_RETRY_AFTER', default=1),  # 429 响应的 Retry-After（秒）
+}
+
+# 密码哈希策略：PASSWORD_HASHER 为新密码使用的算法，其余算法仅用于校验旧密码，登录成功时自动升级
+PASSWORD_HASHER = env.str('PASSWORD_HASHER', default='scrypt')
+_PASSWORD_HASHER_CHOICES = {
+    'scrypt': 'apps.user.hashers.ScryptPasswordHasher',
+    'pbkdf2_sha256': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt_sha256': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+]
+
+# scrypt 参数（apps.user.hashers.ScryptPasswordHasher），修改后旧哈希在下次登录时升级
+PASSWORD_SCRYPT = {
+    'WORK_FACTOR': env.int('PASSWORD_SCRYPT_WORK_FACTOR', default=2 ** 14),  # N，必须是 2 的幂
+    'BLOCK_SIZE': env.int('PASSWORD_SCRYPT_BLOCK_SIZE', default=8),  # r
+    'PARALLELISM': env.int('PASSWORD_SCRYPT_PARALLELISM', default=1),  # p
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -180,6 +284,16 @@ AUTH_USER_MODEL = 'user.User'  # 使用自己定义模型替换Django用户模
 
 # REST Framework 配置
 REST_FRAMEWORK = {
+    # JSON 使用 orjson 编码和解码（未安装时使用标准库），媒体类型与 DRF 默认渲染器和解析器一致
+    'DEFAULT_RENDERER_CLASSES': [
+        'utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'utils.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'models.pagination.Pagination',
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -198,9 +312,30 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=env.int('JWT_ACCESS_TOKEN_LIFETIME_DAYS', default=30)),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=env.int('JWT_REFRESH_TOKEN_LIFETIME_DAYS', default=60)),
     'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': False,
+    'BLACKLIST_AFTER_ROTATION': False,  # 不使用 token_blacklist 应用，轮换后的旧令牌由 apps/user/revocation.py 撤销
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_USER_CLASS': 'apps.user.tokens.LazyTokenUser',  # 认证时不查询用户表，见 apps/user/tokens.py
+}
+
+# 刷新令牌撤销记录（apps.user.revocation）配置
+REFRESH_TOKEN_REVOCATION = {
+    # 撤销记录始终写入数据库，cache 在数据库之前使用缓存前置，db 只使用数据库，auto 在共享缓存时使用缓存前置
+    'BACKEND': env.str('REFRESH_TOKEN_REVOCATION_BACKEND', default='auto'),
+    'PRUNE_INTERVAL': env.int('REFRESH_TOKEN_REVOCATION_PRUNE_INTERVAL', default=1000),  # 平均每撤销多少次清理一次过期记录
+}
+
+# 进程内已验证 access token 缓存条目数，重复使用的 token 不再重复计算签名，0 表示不缓存
+JWT_VERIFIED_TOKEN_CACHE_SIZE = env.int('JWT_VERIFIED_TOKEN_CACHE_SIZE', default=10000)
+
+# 系统配置快照（应用版本、动态配置）最长保留时间（秒），未配置共享缓存时保证多进程最终一致
+SETTING_SNAPSHOT_MAX_AGE = env.int('SETTING_SNAPSHOT_MAX_AGE', default=60)
+
+# 动态配置定时上下线调度器（apps.setting.scheduler）配置
+CONFIG_SCHEDULER = {
+    # 在 web 进程中启动后台线程，也可以单独运行 python manage.py run_config_scheduler
+    'AUTOSTART': env.bool('CONFIG_SCHEDULER_AUTOSTART', default=False),
+    'POLL_INTERVAL': env.float('CONFIG_SCHEDULER_POLL_INTERVAL', default=30),  # 检查配置变更的最长间隔（秒）
 }
 
 # CORS 跨域配置
@@ -1,21 +1,298 @@
-from rest_framework.pagination import LimitOffsetPagination
+import base64
+import json
+from collections import OrderedDict
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+from models.counting import count_rows, EXACT, ESTIMATED, HAS_MORE
+
+
+class KeysetPagination(BasePagination):
+    """键集（游标）分页
+
+    按 ordering 中的字段组合定位上一页的最后一行，使用
+    WHERE (a, b) < (x, y) 形式的条件代替 OFFSET，深分页的开销只与每页条数有关
+    - cursor: 上一次响应中 next / previous 返回的游标，首次请求传空值
+    - limit: 每页条数，默认 20，最大 200
+    - ordering 的最后一个字段必须唯一（通常为 id），并且应有对应的索引
+
+    视图通过以下属性配置:
+    - keyset_ordering: 排序字段，例如 ('-create_time', '-id')
+    - keyset_count_mode: None 不返回总数（默认），也可以是 models.counting 中的
+      exact、cached、estimated 策略，此时响应中包含 count、count_mode 和 count_estimated
+
+    使用示例:
+        GET /api/resource/?cursor=&limit=20        # 第一页
+        GET /api/resource/?cursor=eyJwIjpb...      # 使用 next 中的游标获取下一页
+    """
+    default_limit = 20
+    max_limit = 200
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    ordering = ('-create_time', '-id')
+    count_mode = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', None) or self.ordering)
+        self.count_mode = getattr(view, 'keyset_count_mode', self.count_mode)
+        if self.count_mode == HAS_MORE:
+            # 键集分页本身通过 next 表示是否还有下一页
+            self.count_mode = None
+        self.limit = self.get_limit(request)
+        self.count = None
+        if self.count_mode:
+            self.count, self.count_mode = count_rows(
+                queryset,
+                self.count_mode,
+                cache_timeout=getattr(view, 'count_cache_timeout', 60),
+                estimate_threshold=getattr(view, 'count_estimate_threshold', 100000),
+            )
+
+        position, reverse, inclusive = self.decode_cursor(request, queryset.model)
+        fields = [self._parse_field(field, reverse) for field in self.ordering]
+        queryset = queryset.order_by(*[f'-{name}' if desc else name for name, desc in fields])
+        if position is not None:
+            queryset = queryset.filter(self._after_position(fields, position, inclusive))
+
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        self.inclusive = False
+        if rows:
+            if reverse:
+                self.next_position = self._row_position(rows[-1])
+                if has_more:
+                    self.previous_position = self._row_position(rows[0])
+            else:
+                if has_more:
+                    self.next_position = self._row_position(rows[-1])
+                if position is not None:
+                    self.previous_position = self._row_position(rows[0])
+        elif position is not None:
+            # 越过边界时保留反方向的游标，方便客户端返回；游标所在的行不在本页，返回时需要包含该行
+            self.inclusive = True
+            if reverse:
+                self.next_position = position
+            else:
+                self.previous_position = position
+        return rows
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count_mode:
+            response['count'] = self.count
+            response['count_mode'] = self.count_mode
+            response['count_estimated'] = self.count_mode == ESTIMATED
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'results': schema,
+        }
+        if self.count_mode:
+            properties = {
+                'count': {'type': 'integer'},
+                'count_mode': {'type': 'string'},
+                'count_estimated': {'type': 'boolean'},
+                **properties,
+            }
+        return {'type': 'object', 'required': ['results'], 'properties': properties}
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        if limit <= 0:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self._link(self.next_position, reverse=False, inclusive=self.inclusive)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self._link(self.previous_position, reverse=True, inclusive=self.inclusive)
+
+    def decode_cursor(self, request, model):
+        """解析游标，返回 (定位值列表, 是否反向, 是否包含定位行)，第一页返回 (None, False, False)"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(self._parse_field(field, False)[0]).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return position, bool(payload.get('r')), bool(payload.get('i'))
+        except Exception:
+            raise NotFound('无效的分页游标')
+
+    def encode_cursor(self, position, reverse, inclusive=False):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        payload = {'p': values, 'r': int(reverse)}
+        if inclusive:
+            payload['i'] = 1
+        payload = json.dumps(payload, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode('ascii').rstrip('=')
+
+    def _link(self, position, reverse, inclusive=False):
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse, inclusive))
+        if self.limit == self.default_limit:
+            return remove_query_param(url, self.limit_query_param)
+        return replace_query_param(url, self.limit_query_param, self.limit)
+
+    def _row_position(self, row):
+        names = [self._parse_field(field, False)[0] for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    @staticmethod
+    def _parse_field(field, reverse):
+        """解析排序字段，返回 (字段名, 是否降序)，reverse 为 True 时方向取反"""
+        desc = field.startswith('-')
+        return field.lstrip('-'), desc != reverse
+
+    @staticmethod
+    def _after_position(fields, position, inclusive=False):
+        """生成位于 position 之后的过滤条件，inclusive 为 True 时包含 position 所在的行
+
+        (a DESC, b DESC) 之后的行满足: a < x OR (a = x AND b < y)
+        """
+        conditions = []
+        for index, (name, desc) in enumerate(fields):
+            lookup = {f'{name}__lt' if desc else f'{name}__gt': position[index]}
+            for prev_index in range(index):
+                lookup[fields[prev_index][0]] = position[prev_index]
+            conditions.append(Q(**lookup))
+        if inclusive:
+            conditions.append(Q(**{name: value for (name, _), value in zip(fields, position)}))
+        return reduce(lambda a, b: a | b, conditions)
 
 
 class Pagination(LimitOffsetPagination):
     """自定义分页类
-    
+
     使用 LimitOffsetPagination 支持客户端通过 offset 和 limit 参数控制分页
     - offset: 从第几条记录开始
     - limit: 获取多少条记录
     - 默认每次返回 20 条
     - 最大限制 200 条,即使客户端传入超过 200 也只返回 200 条
-    
+
     使用示例:
         GET /api/resource/?offset=0&limit=20  # 获取前 20 条
         GET /api/resource/?offset=20&limit=50  # 从第 21 条开始,获取 50 条
         GET /api/resource/?offset=0&limit=300  # 获取 300 条,实际只返回 200 条
+
+    视图配置了 keyset_ordering 时,客户端可传入 cursor 参数切换为键集分页(见 KeysetPagination):
+        GET /api/resource/?cursor=&limit=20  # 键集分页第一页
+
+    总数统计策略由视图的 count_mode 属性决定(见 models.counting),响应中的 count_mode 表示实际使用的策略:
+    - exact / cached / estimated: 返回 count
+    - has_more: count 为 null,通过 has_more 表示是否还有下一页
+    count_estimated 为 true 时 count 是估算值,仅供展示;estimated 策略的 next 链接通过多取一条判断,不依赖总数
     """
     default_limit = 20  # 默认每次返回的记录数
     limit_query_param = 'limit'  # 客户端指定每次获取数量的参数名
     offset_query_param = 'offset'  # 客户端指定起始位置的参数名
     max_limit = 200  # 最大限制,防止客户端请求过多数据
+    cursor_query_param = 'cursor'  # 客户端切换为键集分页的参数名
+
+    keyset = None
+    view = None
+    count_mode = EXACT
+    has_more = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params and getattr(view, 'keyset_ordering', None):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        self.view = view
+        self.count_mode = getattr(view, 'count_mode', EXACT)
+        self.has_more = None
+
+        if self.count_mode not in (HAS_MORE, ESTIMATED):
+            return super().paginate_queryset(queryset, request, view)
+
+        # has_more / estimated 模式:多取一条判断是否还有下一页,下一页链接不依赖总数
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.count_mode == HAS_MORE:
+            self.count = None
+        else:
+            # 估算值可能低于实际行数,至少包含已读取到的行
+            self.count = max(self.get_count(queryset), self.offset + len(rows) + self.has_more)
+        return rows
+
+    def get_count(self, queryset):
+        count, self.count_mode = count_rows(
+            queryset,
+            self.count_mode,
+            cache_timeout=getattr(self.view, 'count_cache_timeout', 60),
+            estimate_threshold=getattr(self.view, 'count_estimate_threshold', 100000),
+        )
+        return count
+
+    def get_next_link(self):
+        if self.has_more is not None:
+            if not self.has_more:
+                return None
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, self.limit_query_param, self.limit)
+            return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+        return super().get_next_link()
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        response = OrderedDict([
+            ('count', self.count),
+            ('count_mode', self.count_mode),
+            ('count_estimated', self.count_mode == ESTIMATED),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+        if self.count_mode == HAS_MORE:
+            response['has_more'] = self.has_more
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count']['nullable'] = True
+        response_schema['properties']['count_mode'] = {'type': 'string', 'example': EXACT}
+        response_schema['properties']['count_estimated'] = {'type': 'boolean'}
+        response_schema['properties']['has_more'] = {'type': 'boolean'}
+        return response_schema
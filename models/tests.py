@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.test import TestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.setting.models import AppVersion
+
+from .pagination import KeysetPagination, Pagination
+
+
+def paginate(queryset, view, params):
+    """使用 Pagination 分页，返回 (本页行, 分页响应数据)"""
+    request = Request(APIRequestFactory().get('/resource/', params))
+    paginator = Pagination()
+    rows = paginator.paginate_queryset(queryset, request, view)
+    return rows, paginator.get_paginated_response([]).data
+
+
+def cursor_of(link):
+    """分页链接中的游标"""
+    return parse_qs(urlsplit(link).query)['cursor'][0]
+
+
+class KeysetPaginationTest(TestCase):
+    """键集分页：前后翻页、排序字段重复、越过边界和无效游标"""
+
+    view = SimpleNamespace(keyset_ordering=('-version_code', 'id'))
+
+    @classmethod
+    def setUpTestData(cls):
+        # 每个版本号在三个平台上各有一行，翻页位置会落在版本号相同的行之间
+        AppVersion.objects.bulk_create([
+            AppVersion(platform=platform, version_code=code, version_name=f'1.0.{code}', title='版本', description='')
+            for code in range(1, 8)
+            for platform in ('ios', 'android', 'all')
+        ])
+        cls.expected = list(AppVersion.objects.order_by('-version_code', 'id').values_list('id', flat=True))
+
+    def page(self, cursor='', limit=4):
+        rows, data = paginate(AppVersion.objects.all(), self.view, {'cursor': cursor, 'limit': limit})
+        return [row.pk for row in rows], data
+
+    def test_forward_and_back(self):
+        pages = []
+        ids, data = self.page()
+        self.assertIsNone(data['previous'])
+        self.assertNotIn('count', data)
+        pages.append(ids)
+        while data['next']:
+            ids, data = self.page(cursor_of(data['next']))
+            pages.append(ids)
+        self.assertEqual([pk for ids in pages for pk in ids], self.expected)
+        self.assertTrue(all(len(ids) == 4 for ids in pages[:-1]))
+
+        # 从最后一页沿 previous 返回，每一页与向前翻页时相同
+        back = [pages[-1]]
+        while data['previous']:
+            ids, data = self.page(cursor_of(data['previous']))
+            back.append(ids)
+        self.assertEqual(back[::-1], pages)
+        self.assertIsNotNone(data['next'])
+
+    def test_past_the_edge(self):
+        paginator = KeysetPagination()
+        last = AppVersion.objects.get(pk=self.expected[-1])
+        ids, data = self.page(paginator.encode_cursor([last.version_code, last.pk], False))
+        self.assertEqual(ids, [])
+        self.assertIsNone(data['next'])
+        # 保留反方向的游标，返回最后一页
+        ids, data = self.page(cursor_of(data['previous']))
+        self.assertEqual(ids, self.expected[-4:])
+
+        first = AppVersion.objects.get(pk=self.expected[0])
+        ids, data = self.page(paginator.encode_cursor([first.version_code, first.pk], True))
+        self.assertEqual(ids, [])
+        self.assertIsNone(data['previous'])
+        ids, data = self.page(cursor_of(data['next']))
+        self.assertEqual(ids, self.expected[:4])
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPagination()
+        for cursor in (
+            'not-a-cursor',
+            paginator.encode_cursor([1], False),
+            paginator.encode_cursor(['abc', 1], False),
+            paginator.encode_cursor([1, 2, 3], False),
+        ):
+            with self.assertRaises(NotFound, msg=cursor):
+                self.page(cursor)
+
+    def test_without_keyset_ordering_uses_offset(self):
+        rows, data = paginate(AppVersion.objects.order_by('id'), SimpleNamespace(), {'cursor': '', 'limit': 4})
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(data['count'], len(self.expected))
+
+
+class EstimatedCountPaginationTest(TestCase):
+    """estimated 策略下估算值偏低时分页仍然完整，并标记总数为估算值"""
+
+    @classmethod
+    def setUpTestData(cls):
+        AppVersion.objects.bulk_create([
+            AppVersion(platform='ios', version_code=code, version_name=f'1.0.{code}', title='版本', description='')
+            for code in range(1, 26)
+        ])
+
+    def paginate(self, offset, estimate):
+        view = SimpleNamespace(count_mode='estimated', count_estimate_threshold=1)
+        with mock.patch('models.counting.estimate_count', return_value=estimate):
+            return paginate(AppVersion.objects.order_by('id'), view, {'offset': offset, 'limit': 10})
+
+    def test_low_estimate_does_not_truncate(self):
+        rows, data = self.paginate(offset=10, estimate=5)
+        self.assertEqual(len(rows), 10)
+        self.assertTrue(data['count_estimated'])
+        self.assertGreaterEqual(data['count'], 21)
+        self.assertIsNotNone(data['next'])
+
+        rows, data = self.paginate(offset=20, estimate=5)
+        self.assertEqual(len(rows), 5)
+        self.assertIsNone(data['next'])
+
+    def test_exact_fallback_is_flagged(self):
+        # 估算值低于阈值时精确计数
+        rows, data = self.paginate(offset=0, estimate=0)
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(data['count_mode'], 'exact')
+        self.assertFalse(data['count_estimated'])
+        self.assertIsNotNone(data['next'])
@@ -0,0 +1,80 @@
+"""
+异步视图工具
+DRF 视图不支持 async，热点公共接口在 ASGI 部署时使用原生 Django 异步视图，
+这里提供与 DRF 一致的请求方法校验、请求体解析和异常响应格式
+"""
+from functools import wraps
+
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, MethodNotAllowed, ParseError
+
+from utils.renderers import loads
+from utils.response import envelope_response
+
+
+def async_api_view(methods):
+    """异步接口装饰器
+
+    - 只允许 methods 中的请求方法（允许 GET 时同时允许 HEAD），其余返回 405
+    - APIException 转换为统一格式的错误响应
+    - 与 DRF 视图一样豁免 CSRF 校验
+
+    使用示例:
+        @async_api_view(['GET'])
+        async def latest(request):
+            ...
+    """
+    allowed = [method.upper() for method in methods]
+    if 'GET' in allowed and 'HEAD' not in allowed:
+        allowed.append('HEAD')
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in allowed:
+                    raise MethodNotAllowed(request.method)
+                return await func(request, *args, **kwargs)
+            except APIException as exc:
+                response = envelope_response(
+                    code=exc.status_code,
+                    message=str(exc.detail),
+                    data=None,
+                    http_status=exc.status_code
+                )
+                if isinstance(exc, MethodNotAllowed):
+                    response['Allow'] = ', '.join(allowed)
+                return response
+
+        return csrf_exempt(wrapper)
+
+    return decorator
+
+
+def parse_request_data(request):
+    """解析请求体，支持 JSON 和表单
+
+    Raises:
+        ParseError: JSON 格式错误
+    """
+    if request.content_type == 'application/json':
+        if not request.body:
+            return {}
+        try:
+            return loads(request.body)
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+    return request.POST.dict()
+
+
+def unauthorized_response(exc, authenticate_header):
+    """未认证响应，与 DRF 一致返回 401 和 WWW-Authenticate 响应头"""
+    response = envelope_response(
+        code=status.HTTP_401_UNAUTHORIZED,
+        message=str(exc.detail),
+        data=None,
+        http_status=status.HTTP_401_UNAUTHORIZED
+    )
+    response['WWW-Authenticate'] = authenticate_header
+    return response
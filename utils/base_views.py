@@ -1,6 +1,10 @@
-from rest_framework import status
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers, status
 from rest_framework.viewsets import ModelViewSet
 
+from utils.fast_serializer import compile_read_serializer
 from utils.response import ResponseUtil
 
 
@@ -10,11 +14,149 @@ class BaseModelViewSet(ModelViewSet):
     提供通用的 CRUD 操作方法,减少代码重复
     子类需要配置:
     - resource_name: 资源名称,用于提示信息(如 '分类'、'标签')
+
+    子类可选配置:
+    - count_mode: 列表总数统计策略(exact、cached、estimated、has_more,见 models.counting)
+    - count_cache_timeout: cached 策略的缓存时间(秒)
+    - count_estimate_threshold: estimated 策略使用估算值的最小行数
+    - lazy_authentication_actions: 延迟认证的 action,请求开始时不校验 token,
+      首次访问 request.user / request.auth 时才认证,适用于不读取当前用户的公共接口
+    - sparse_fieldset_actions: 支持 fields / exclude 参数的 action,默认 list 和 retrieve
+    - fast_serializer_actions: 使用编译序列化器(utils.fast_serializer)的列表 action,
+      直接从 values() 行生成响应,输出与 DRF 序列化器完全一致;序列化器无法编译时自动使用 DRF 序列化器
+    - sparse_field_dependencies: SerializerMethodField 等无法推断来源的字段依赖的模型字段,
+      例如 {'is_valid': ('start_time', 'end_time')}
+
+    字段筛选:
+        GET /api/resource/?fields=id,name      # 只返回 id 和 name
+        GET /api/resource/?exclude=description  # 不返回 description
+    同时根据保留字段的 source 对查询使用 .only(),只查询需要的列;
+    存在无法推断依赖的字段时不裁剪查询
     """
     resource_name = '资源'
+    count_mode = 'exact'
+    count_cache_timeout = 60
+    count_estimate_threshold = 100000
+    lazy_authentication_actions = ()
+    sparse_fieldset_actions = ('list', 'retrieve')
+    fast_serializer_actions = ()
+    sparse_field_dependencies = {}
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+
+    def perform_authentication(self, request):
+        """延迟认证的 action 跳过请求开始时的认证,由 DRF Request 在首次访问 request.user 时完成"""
+        if self.action in self.lazy_authentication_actions:
+            return
+        super().perform_authentication(request)
+
+    def get_sparse_fields(self):
+        """解析 fields / exclude 参数
+
+        Returns:
+            list: 保留的序列化器字段名,未传参数或当前 action 不支持时返回 None
+
+        Raises:
+            ValidationError: 参数中包含序列化器不存在的字段
+        """
+        if self.action not in self.sparse_fieldset_actions:
+            return None
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+
+        fields = self._split_query_param(self.fields_query_param)
+        exclude = self._split_query_param(self.exclude_query_param)
+        self._sparse_fields = None
+        if fields or exclude:
+            available = list(self._get_field_serializer().fields)
+            unknown = [name for name in fields + exclude if name not in available]
+            if unknown:
+                raise serializers.ValidationError(f'不支持的字段: {", ".join(unknown)}')
+            self._sparse_fields = [
+                name for name in available
+                if (not fields or name in fields) and name not in exclude
+            ]
+        return self._sparse_fields
+
+    def get_sparse_columns(self, fields):
+        """根据保留的序列化器字段推断需要查询的模型字段
+
+        Returns:
+            set: 模型字段名,存在无法推断依赖的字段时返回 None
+        """
+        model = getattr(getattr(self.get_serializer_class(), 'Meta', None), 'model', None)
+        if model is None:
+            return None
+        serializer = self._get_field_serializer()
+        columns = {model._meta.pk.name}
+        columns.update(name.lstrip('-') for name in getattr(self, 'keyset_ordering', None) or ())
+
+        for name in fields:
+            if name in self.sparse_field_dependencies:
+                columns.update(self.sparse_field_dependencies[name])
+                continue
+            field = serializer.fields[name]
+            if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                return None
+
+            attr = field.source.split('.')[0]
+            match = re.fullmatch(r'get_(\w+)_display', attr)
+            if match:
+                attr = match.group(1)
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                if hasattr(model, attr):
+                    # 模型属性或方法,无法确定依赖的字段
+                    return None
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.add(model_field.name)
+        return columns
+
+    def get_queryset(self):
+        """传入 fields / exclude 参数时只查询保留字段需要的列"""
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            columns = self.get_sparse_columns(fields)
+            if columns is not None:
+                queryset = queryset.only(*columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        """传入 fields / exclude 参数时移除未保留的字段"""
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+        return serializer
+
+    def _get_field_serializer(self):
+        """用于读取字段定义的序列化器实例"""
+        if not hasattr(self, '_field_serializer'):
+            self._field_serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        return self._field_serializer
+
+    def _split_query_param(self, name):
+        value = self.request.query_params.get(name, '')
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def get_compiled_serializer(self):
+        """当前 action 使用的编译序列化器,未开启或序列化器无法编译时返回 None"""
+        if self.action not in self.fast_serializer_actions:
+            return None
+        return compile_read_serializer(self.get_serializer_class(), self.get_sparse_fields())
 
     def _paginated_response(self, queryset):
         """通用分页响应辅助方法"""
+        compiled = self.get_compiled_serializer()
+        if compiled is not None:
+            return self._compiled_response(compiled, queryset)
+
         page = self.paginate_queryset(queryset)
 
         if page is not None:
@@ -28,12 +170,28 @@ class BaseModelViewSet(ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return ResponseUtil(data=serializer.data, http_status=status.HTTP_200_OK)
 
+    def _compiled_response(self, compiled, queryset):
+        """使用编译序列化器从 values() 行生成分页响应,结果与 _paginated_response 一致"""
+        ordering = tuple(name.lstrip('-') for name in getattr(self, 'keyset_ordering', None) or ())
+        rows = compiled.values(queryset, *ordering)
+        page = self.paginate_queryset(rows)
+
+        if page is not None:
+            paginated_response = self.get_paginated_response(compiled.serialize(page))
+            return ResponseUtil(
+                data=paginated_response.data,
+                http_status=status.HTTP_200_OK
+            )
+
+        return ResponseUtil(data=compiled.serialize(rows), http_status=status.HTTP_200_OK)
+
     def list(self, request, *args, **kwargs):
         """获取列表
         
         支持分页查询,客户端可通过 offset 和 limit 参数控制分页
         - offset: 从第几条记录开始,默认 0
         - limit: 获取多少条记录,默认 20,最大 200
+        - cursor: 视图配置了 keyset_ordering 时可传入,切换为键集分页
         """
         queryset = self.filter_queryset(self.get_queryset())
         return self._paginated_response(queryset)
@@ -0,0 +1,308 @@
+"""
+二级缓存
+L1 为进程内 LRU（带过期时间），L2 为 settings.CACHES 中配置的共享缓存（Redis 或进程内缓存）
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from utils.metrics import metrics
+
+_MISSING = object()
+
+
+class LRUCache:
+    """进程内 LRU 缓存
+
+    - 超过 max_entries 时淘汰最久未使用的条目
+    - 每个条目有独立的过期时间，过期后读取视为未命中
+    - 线程安全
+    """
+
+    def __init__(self, max_entries=1024, timeout=5):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """读取缓存，未命中或已过期返回 default"""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """写入缓存，timeout 为 None 时使用默认过期时间，timeout 为 0 时不写入"""
+        timeout = self.timeout if timeout is None else timeout
+        if timeout is not None and timeout <= 0:
+            return
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """删除缓存"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def evict(self, predicate):
+        """删除所有满足 predicate(key, value) 的条目，返回删除数量"""
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """二级缓存
+
+    读取顺序：L1 进程内 LRU -> L2 共享缓存 -> 回源构建
+    - 所有键自动添加 namespace 前缀，避免不同 app 之间冲突
+    - get_or_set 在 L2 上加锁，同一个键同一时间只有一个进程回源，防止缓存击穿
+    - 命中、未命中和 L2 耗时记录到 utils.metrics，指标名以 cache.<namespace> 开头
+
+    L1 过期时间应较短，其他进程写入后最多延迟 L1 过期时间才能读到新值
+
+    使用示例:
+        profile_cache = TieredCache('user', l1_timeout=5)
+        data = profile_cache.get_or_set(f'profile:{user_id}', lambda: build_profile(user_id), timeout=300)
+    """
+
+    def __init__(self, namespace, alias='default', l1_timeout=None, l1_max_entries=None, lock_timeout=None):
+        options = getattr(settings, 'TIERED_CACHE', {})
+        self.namespace = namespace
+        self.alias = alias
+        self.lock_timeout = lock_timeout if lock_timeout is not None else options.get('LOCK_TIMEOUT', 10)
+        self.l1 = LRUCache(
+            max_entries=l1_max_entries if l1_max_entries is not None else options.get('L1_MAX_ENTRIES', 1024),
+            timeout=l1_timeout if l1_timeout is not None else options.get('L1_TIMEOUT', 5),
+        )
+        self._metric_prefix = f'cache.{namespace}'
+
+    @property
+    def l2(self):
+        return caches[self.alias]
+
+    def make_key(self, key):
+        """生成带命名空间的键"""
+        return f'{self.namespace}:{key}'
+
+    def get(self, key, default=None, l1_timeout=None):
+        """读取缓存"""
+        full_key = self.make_key(key)
+        value = self.l1.get(full_key, _MISSING)
+        if value is not _MISSING:
+            metrics.incr(f'{self._metric_prefix}.l1_hit')
+            return value
+
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            value = self.l2.get(full_key, _MISSING)
+        if value is _MISSING:
+            metrics.incr(f'{self._metric_prefix}.miss')
+            return default
+
+        metrics.incr(f'{self._metric_prefix}.l2_hit')
+        self.l1.set(full_key, value, l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, l1_timeout=None):
+        """写入缓存"""
+        full_key = self.make_key(key)
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            self.l2.set(full_key, value, timeout)
+        self.l1.set(full_key, value, l1_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """键不存在时写入，返回是否写入成功"""
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            return self.l2.add(self.make_key(key), value, timeout)
+
+    def incr(self, key, delta=1):
+        """原子递增 L2 中的整数，键不存在时抛出 ValueError"""
+        full_key = self.make_key(key)
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            value = self.l2.incr(full_key, delta)
+        self.l1.delete(full_key)
+        return value
+
+    def delete(self, key):
+        """删除缓存（当前进程的 L1 同时删除）"""
+        full_key = self.make_key(key)
+        self.l1.delete(full_key)
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            self.l2.delete(full_key)
+
+    def get_many(self, keys, l1_timeout=None):
+        """批量读取，返回命中的 {key: value}"""
+        result = {}
+        l2_keys = {}
+        for key in keys:
+            full_key = self.make_key(key)
+            value = self.l1.get(full_key, _MISSING)
+            if value is _MISSING:
+                l2_keys[full_key] = key
+            else:
+                result[key] = value
+        metrics.incr(f'{self._metric_prefix}.l1_hit', len(result))
+
+        if l2_keys:
+            with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+                found = self.l2.get_many(list(l2_keys))
+            for full_key, value in found.items():
+                result[l2_keys[full_key]] = value
+                self.l1.set(full_key, value, l1_timeout)
+            metrics.incr(f'{self._metric_prefix}.l2_hit', len(found))
+            metrics.incr(f'{self._metric_prefix}.miss', len(l2_keys) - len(found))
+        return result
+
+    def set_many(self, mapping, timeout=DEFAULT_TIMEOUT, l1_timeout=None):
+        """批量写入"""
+        data = {self.make_key(key): value for key, value in mapping.items()}
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            self.l2.set_many(data, timeout)
+        for full_key, value in data.items():
+            self.l1.set(full_key, value, l1_timeout)
+
+    def get_or_set(self, key, builder, timeout=DEFAULT_TIMEOUT, l1_timeout=None):
+        """读取缓存，未命中时调用 builder 构建并写入
+
+        未命中时先在 L2 上抢锁，抢到锁的进程负责回源，其余进程轮询等待结果；
+        等待超过 lock_timeout 后自行回源，避免锁持有者异常退出导致长时间阻塞
+
+        Args:
+            key: 缓存键
+            builder: 无参可调用对象，返回要缓存的值（不能为 None）
+            timeout: L2 过期时间
+            l1_timeout: L1 过期时间
+        """
+        value = self.get(key, _MISSING, l1_timeout)
+        if value is not _MISSING:
+            return value
+
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        if self.add(lock_key, token, self.lock_timeout):
+            try:
+                return self._build(key, builder, timeout, l1_timeout)
+            finally:
+                if self.l2.get(self.make_key(lock_key)) == token:
+                    self.l2.delete(self.make_key(lock_key))
+
+        metrics.incr(f'{self._metric_prefix}.lock_wait')
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.l2.get(self.make_key(key), _MISSING)
+            if value is not _MISSING:
+                self.l1.set(self.make_key(key), value, l1_timeout)
+                return value
+
+        metrics.incr(f'{self._metric_prefix}.lock_timeout')
+        return self._build(key, builder, timeout, l1_timeout)
+
+    async def aget(self, key, default=None, l1_timeout=None):
+        """异步读取缓存"""
+        full_key = self.make_key(key)
+        value = self.l1.get(full_key, _MISSING)
+        if value is not _MISSING:
+            metrics.incr(f'{self._metric_prefix}.l1_hit')
+            return value
+
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            value = await self.l2.aget(full_key, _MISSING)
+        if value is _MISSING:
+            metrics.incr(f'{self._metric_prefix}.miss')
+            return default
+
+        metrics.incr(f'{self._metric_prefix}.l2_hit')
+        self.l1.set(full_key, value, l1_timeout)
+        return value
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, l1_timeout=None):
+        """异步写入缓存"""
+        full_key = self.make_key(key)
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            await self.l2.aset(full_key, value, timeout)
+        self.l1.set(full_key, value, l1_timeout)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """异步写入不存在的键，返回是否写入成功"""
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            return await self.l2.aadd(self.make_key(key), value, timeout)
+
+    async def adelete(self, key):
+        """异步删除缓存（当前进程的 L1 同时删除）"""
+        full_key = self.make_key(key)
+        self.l1.delete(full_key)
+        with metrics.timer(f'{self._metric_prefix}.l2_latency'):
+            await self.l2.adelete(full_key)
+
+    async def aget_or_set(self, key, builder, timeout=DEFAULT_TIMEOUT, l1_timeout=None):
+        """get_or_set 的异步版本，builder 为无参协程函数"""
+        value = await self.aget(key, _MISSING, l1_timeout)
+        if value is not _MISSING:
+            return value
+
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        if await self.aadd(lock_key, token, self.lock_timeout):
+            try:
+                return await self._abuild(key, builder, timeout, l1_timeout)
+            finally:
+                if await self.l2.aget(self.make_key(lock_key)) == token:
+                    await self.l2.adelete(self.make_key(lock_key))
+
+        metrics.incr(f'{self._metric_prefix}.lock_wait')
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            value = await self.l2.aget(self.make_key(key), _MISSING)
+            if value is not _MISSING:
+                self.l1.set(self.make_key(key), value, l1_timeout)
+                return value
+
+        metrics.incr(f'{self._metric_prefix}.lock_timeout')
+        return await self._abuild(key, builder, timeout, l1_timeout)
+
+    async def _abuild(self, key, builder, timeout, l1_timeout):
+        with metrics.timer(f'{self._metric_prefix}.build_latency'):
+            value = await builder()
+        await self.aset(key, value, timeout, l1_timeout)
+        return value
+
+    def _build(self, key, builder, timeout, l1_timeout):
+        with metrics.timer(f'{self._metric_prefix}.build_latency'):
+            value = builder()
+        self.set(key, value, timeout, l1_timeout)
+        return value
+
+    def stats(self):
+        """导出当前命名空间的缓存指标"""
+        data = metrics.snapshot(self._metric_prefix)
+        data['l1_size'] = len(self.l1)
+        return data
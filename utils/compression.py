@@ -0,0 +1,98 @@
+"""
+响应压缩
+根据 Accept-Encoding 协商 br / gzip，安装了 brotli 时优先使用 br，否则只使用标准库 gzip。
+快照类接口的响应体在多次请求中完全相同，压缩结果按响应体摘要缓存在进程内，命中时不再重复压缩
+"""
+import functools
+import gzip
+import hashlib
+
+from utils.cache import LRUCache
+from utils.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# 按优先级排列
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+@functools.lru_cache(maxsize=64)
+def negotiate_encoding(accept_encoding):
+    """根据 Accept-Encoding 选择压缩算法，不接受任何可用算法时返回 None
+
+    q=0 表示明确拒绝，* 匹配未单独列出的算法
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    best = None
+    for coding in ENCODINGS:
+        quality = qualities.get(coding, qualities.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best[0] if best else None
+
+
+class Compressor:
+    """响应体压缩器
+
+    压缩参数和结果缓存大小在创建时确定（CompressionMiddleware 初始化时读取 RESPONSE_COMPRESSION），
+    修改配置后新建的压缩器立即生效
+    """
+
+    def __init__(self, gzip_level=6, brotli_quality=5, cache_entries=256, cache_max_size=256 * 1024):
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_max_size = cache_max_size
+        self.compressed_bodies = LRUCache(max_entries=cache_entries, timeout=None)
+
+    def compress(self, content, encoding, cache=False):
+        """压缩响应体
+
+        Args:
+            content: 响应体字节串
+            encoding: negotiate_encoding 返回的算法
+            cache: 是否按内容摘要缓存压缩结果（只用于在多次请求中重复出现的响应体）
+        """
+        if not cache or len(content) > self.cache_max_size:
+            with metrics.timer(f'compression.{encoding}'):
+                return self._compress(content, encoding)
+
+        key = (encoding, hashlib.blake2b(content, digest_size=16).digest())
+        compressed = self.compressed_bodies.get(key)
+        if compressed is None:
+            metrics.incr('compression.cache.miss')
+            with metrics.timer(f'compression.{encoding}'):
+                compressed = self._compress(content, encoding)
+            self.compressed_bodies.set(key, compressed)
+        else:
+            metrics.incr('compression.cache.hit')
+        return compressed
+
+    def _compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        # mtime 固定为 0，相同内容的压缩结果相同
+        return gzip.compress(content, compresslevel=self.gzip_level, mtime=0)
+
+
+def cache_compressed(response):
+    """标记响应体会在多次请求中重复出现（来自快照等缓存），压缩结果可以复用"""
+    response.cache_compressed = True
+    return response
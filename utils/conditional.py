@@ -0,0 +1,42 @@
+"""
+HTTP 条件请求
+根据数据校验值生成 ETag / Last-Modified，客户端缓存未变化时返回不带响应体的 304
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """根据校验值生成强 ETag
+
+    Args:
+        parts: 参与计算的值，例如行数、最大更新时间、查询参数
+    """
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.blake2b(raw.encode(), digest_size=16).hexdigest())
+
+
+def set_conditional_headers(response, etag, last_modified=None):
+    """设置 ETag 和 Last-Modified 响应头"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional_response(request, etag, last_modified=None):
+    """处理 If-None-Match / If-Modified-Since
+
+    Returns:
+        客户端缓存仍然有效时返回 304 响应，否则返回 None
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+    )
+    if response is not None:
+        set_conditional_headers(response, etag, last_modified)
+    return response
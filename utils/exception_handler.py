@@ -32,12 +32,16 @@ def custom_exception_handler(exc, context):
         else:
             error_message = str(response.data)
 
+        # 保留 DRF 设置的响应头（例如 429 的 Retry-After、401 的 WWW-Authenticate）
+        headers = {name: response[name] for name in ('Retry-After', 'WWW-Authenticate') if name in response}
+
         # 使用自定义响应格式
         return ResponseUtil(
             code=response.status_code,
             message=error_message,
             data=None,
             http_status=response.status_code,
+            headers=headers or None,
             exception=True
         )
 
@@ -0,0 +1,106 @@
+"""
+有界线程池
+将慢速的 CPU 任务（例如密码哈希校验）从请求线程转移到固定大小的线程池，
+排队数量超过上限时立即拒绝，避免突发流量占满所有 worker 拖慢其他接口
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from utils.metrics import metrics
+
+
+class ExecutorBusy(Exception):
+    """线程池已满或等待超时"""
+
+
+class BoundedExecutor:
+    """有界线程池
+
+    - max_workers: 线程数，同时执行的任务数上限
+    - max_queue: 排队任务数上限，执行中和排队中的任务总数超过 max_workers + max_queue 时抛出 ExecutorBusy
+    - timeout: 调用方等待结果的最长时间（秒），超时抛出 ExecutorBusy
+    - 排队耗时、执行耗时和拒绝次数记录到 utils.metrics，指标名以 executor.<name> 开头
+
+    线程池在第一次提交任务时创建，任务中不应访问数据库（线程池线程的数据库连接不会被请求周期关闭）
+
+    名额只在当前进程内计数：多个 worker 进程各自限制；gunicorn 同步 worker 每次只处理一个请求，
+    pending 不会超过 1，需要使用线程 worker（gthread）或 ASGI 才能起到限流作用
+
+    使用示例:
+        hash_executor = BoundedExecutor('login', max_workers=4, max_queue=32)
+        matched = hash_executor.run(check_password, raw_password, encoded)
+    """
+
+    def __init__(self, name, max_workers=4, max_queue=32, timeout=10):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor = None
+        self._metric_prefix = f'executor.{name}'
+
+    @property
+    def pending(self):
+        """执行中和排队中的任务数"""
+        return self._pending
+
+    def run(self, fn, *args, **kwargs):
+        """在线程池中执行 fn 并等待结果
+
+        Raises:
+            ExecutorBusy: 线程池已满或等待超时
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                metrics.incr(f'{self._metric_prefix}.rejected')
+                raise ExecutorBusy(f'{self.name} 线程池已满')
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+
+        submitted_at = time.perf_counter()
+        try:
+            future = self._executor.submit(self._call, submitted_at, fn, args, kwargs)
+        except BaseException:
+            self._release()
+            raise
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # 未开始执行的任务直接取消，已开始的任务执行完后释放名额
+            if future.cancel():
+                self._release()
+            metrics.incr(f'{self._metric_prefix}.timeout')
+            raise ExecutorBusy(f'{self.name} 线程池等待超时')
+
+    def _call(self, submitted_at, fn, args, kwargs):
+        started_at = time.perf_counter()
+        metrics.observe(f'{self._metric_prefix}.queue_wait', started_at - submitted_at)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            metrics.observe(f'{self._metric_prefix}.run_time', time.perf_counter() - started_at)
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self, wait=True):
+        """关闭线程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self):
+        """导出当前线程池指标"""
+        data = metrics.snapshot(self._metric_prefix)
+        data['pending'] = self._pending
+        data['max_workers'] = self.max_workers
+        data['max_queue'] = self.max_queue
+        return data
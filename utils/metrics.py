@@ -0,0 +1,81 @@
+"""
+进程内指标统计
+提供线程安全的计数器和耗时统计，用于观察缓存命中率、接口耗时等
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    """进程内指标注册表
+
+    - incr: 计数器累加
+    - observe: 记录一次耗时（秒），统计次数、总耗时和最大耗时
+    - timer: 上下文管理器，自动记录代码块耗时
+    - snapshot: 导出当前所有指标
+
+    指标只在当前进程内有效，多 worker 部署时每个 worker 各自统计
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+
+    def incr(self, name, value=1):
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """记录一次耗时"""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = [0, 0.0, 0.0]
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+
+    @contextmanager
+    def timer(self, name):
+        """统计代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self, prefix=''):
+        """导出指标
+
+        Args:
+            prefix: 只导出指定前缀的指标
+
+        Returns:
+            dict: {'counters': {...}, 'timings': {name: {count, total_ms, avg_ms, max_ms}}}
+        """
+        with self._lock:
+            counters = {k: v for k, v in self._counters.items() if k.startswith(prefix)}
+            timings = {}
+            for name, (count, total, maximum) in self._timings.items():
+                if not name.startswith(prefix):
+                    continue
+                timings[name] = {
+                    'count': count,
+                    'total_ms': round(total * 1000, 3),
+                    'avg_ms': round(total * 1000 / count, 3) if count else 0,
+                    'max_ms': round(maximum * 1000, 3),
+                }
+        return {'counters': counters, 'timings': timings}
+
+    def reset(self):
+        """清空所有指标"""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
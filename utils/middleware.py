@@ -0,0 +1,177 @@
+"""
+中间件
+"""
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from utils.compression import Compressor, negotiate_encoding
+
+log = logging.getLogger(__name__)
+
+
+class _ResponseBody:
+    """响应体日志字段，只有日志实际输出时才解码和截断"""
+    __slots__ = ('response', 'max_size')
+
+    def __init__(self, response, max_size):
+        self.response = response
+        self.max_size = max_size
+
+    def __str__(self):
+        if self.response.streaming:
+            return '<streaming>'
+        content = self.response.content
+        text = content[:self.max_size].decode('utf-8', 'replace')
+        if len(content) > self.max_size:
+            text += f'...({len(content)} bytes)'
+        return text
+
+    __repr__ = __str__
+
+
+class ResponseLoggingMiddleware:
+    """响应日志（RESPONSE_LOGGING）
+
+    默认关闭，未开启时抛出 MiddlewareNotUsed，不参与请求处理。开启后：
+    - 按路径前缀匹配采样率（ROUTE_SAMPLE_RATES，最长前缀优先，未匹配使用 SAMPLE_RATE），
+      logger utils.middleware 未开启 DEBUG 级别或未被采样的请求不做任何格式化
+    - 日志包含 method / path / status / duration_ms / size / body 结构化字段（LogRecord 属性），
+      body 在输出时才解码，并截断到 MAX_BODY_SIZE 字节
+    - 同时支持同步和异步请求
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = getattr(settings, 'RESPONSE_LOGGING', {})
+        if not options.get('ENABLED', False):
+            raise MiddlewareNotUsed('RESPONSE_LOGGING 未开启')
+
+        self.get_response = get_response
+        self.sample_rate = float(options.get('SAMPLE_RATE', 1.0))
+        self.route_sample_rates = sorted(
+            ((prefix, float(rate)) for prefix, rate in options.get('ROUTE_SAMPLE_RATES', {}).items()),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        self.max_body_size = options.get('MAX_BODY_SIZE', 2048)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.should_log(request):
+            return self.get_response(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.log_response(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_log(request):
+            return await self.get_response(request)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.log_response(request, response, start)
+        return response
+
+    def get_sample_rate(self, path):
+        """路径对应的采样率"""
+        for prefix, rate in self.route_sample_rates:
+            if path.startswith(prefix):
+                return rate
+        return self.sample_rate
+
+    def should_log(self, request):
+        if not log.isEnabledFor(logging.DEBUG):
+            return False
+        rate = self.get_sample_rate(request.path)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def log_response(self, request, response, start):
+        duration_ms = (time.perf_counter() - start) * 1000
+        size = None if response.streaming else len(response.content)
+        body = _ResponseBody(response, self.max_body_size)
+        log.debug(
+            '响应结果: %s %s %s %.1fms %s',
+            request.method, request.path, response.status_code, duration_ms, body,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 3),
+                'size': size,
+                'body': body,
+            },
+        )
+
+
+class CompressionMiddleware:
+    """响应压缩（RESPONSE_COMPRESSION）
+
+    - 只压缩不小于 MIN_SIZE 字节的 JSON 响应，已压缩、流式和 206 响应不处理
+    - 根据 Accept-Encoding 选择 br 或 gzip，并添加 Vary: Accept-Encoding
+    - 压缩后强 ETag 改为弱 ETag，条件请求仍按弱比较匹配
+    - 经 cache_compressed() 标记的响应（快照接口）复用进程内缓存的压缩结果
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        options = getattr(settings, 'RESPONSE_COMPRESSION', {})
+        if not options.get('ENABLED', True):
+            raise MiddlewareNotUsed('RESPONSE_COMPRESSION 未开启')
+
+        self.get_response = get_response
+        self.min_size = options.get('MIN_SIZE', 1024)
+        self.compressor = Compressor(
+            gzip_level=options.get('GZIP_LEVEL', 6),
+            brotli_quality=options.get('BROTLI_QUALITY', 5),
+            cache_entries=options.get('CACHE_ENTRIES', 256),
+            cache_max_size=options.get('CACHE_MAX_SIZE', 256 * 1024),
+        )
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.status_code == 206
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('application/json')
+        ):
+            return response
+
+        # 是否压缩取决于 Accept-Encoding，小响应同样需要 Vary 避免缓存代理返回错误的版本
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < self.min_size:
+            return response
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        compressed = self.compressor.compress(response.content, encoding, cache=getattr(response, 'cache_compressed', False))
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
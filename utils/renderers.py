@@ -0,0 +1,138 @@
+"""
+JSON 渲染器与解析器
+安装了 orjson 时使用 orjson 编码和解码，否则使用 DRF 默认的标准库实现；
+媒体类型、格式后缀和错误信息与 DRF 的 JSONRenderer / JSONParser 相同，客户端内容协商不变。
+
+缓存中保存的已编码数据可以包装为 RawJSON 放入响应数据，渲染时直接拼接字节，不再解码和重新编码:
+    data = RawJSON.encode(serializer.data)
+    return ResponseUtil(data=data)
+"""
+import json
+import secrets
+
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson 原样输出 U+2028 / U+2029，与 DRF 一致转义后才能安全地嵌入 JavaScript
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson else 0
+)
+
+
+class RawJSON:
+    """已编码的 JSON 值，渲染时原样写入响应"""
+    __slots__ = ('content',)
+
+    def __init__(self, content):
+        self.content = content
+
+    @classmethod
+    def encode(cls, data):
+        """编码数据，结果可以放入缓存并在多次响应中复用"""
+        return cls(FastJSONRenderer().render(data))
+
+    def __eq__(self, other):
+        if isinstance(other, RawJSON):
+            return self.content == other.content
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.content)
+
+    def __repr__(self):
+        return f'<RawJSON: {self.content[:50]!r}>'
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSON 渲染器
+
+    - 默认使用 orjson，输出紧凑、非 ASCII 字符不转义，与 DRF 默认配置一致
+    - 请求了缩进（可浏览 API、Accept 参数 indent）、orjson 不支持的值（超过 64 位的整数等）
+      或未安装 orjson 时使用标准库编码
+    - 数据中的 RawJSON 直接拼接
+    - orjson 把 NaN / Infinity 编码为 null，不像 DRF 严格模式那样抛出 ValueError
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is not None and indent is None and self.compact and not self.ensure_ascii:
+            try:
+                content = orjson.dumps(data, default=self._orjson_default, option=_ORJSON_OPTIONS)
+            except TypeError:
+                content = self._render_stdlib(data, indent)
+        else:
+            content = self._render_stdlib(data, indent)
+
+        for separator, escaped in _LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
+
+    def _orjson_default(self, obj):
+        if isinstance(obj, RawJSON):
+            return orjson.Fragment(obj.content)
+        return self.encoder_class().default(obj)
+
+    def _render_stdlib(self, data, indent):
+        """标准库编码，RawJSON 先替换为占位字符串，编码后再替换为原始内容"""
+        fragments = []
+        nonce = secrets.token_hex(8)
+        encoder_class = self.encoder_class
+
+        class Encoder(encoder_class):
+            def default(self, obj):
+                if isinstance(obj, RawJSON):
+                    fragments.append(obj.content)
+                    return f'__raw_json_{nonce}_{len(fragments) - 1}__'
+                return super().default(obj)
+
+        if indent is None:
+            separators = renderers.SHORT_SEPARATORS if self.compact else renderers.LONG_SEPARATORS
+        else:
+            separators = renderers.INDENT_SEPARATORS
+        content = json.dumps(
+            data, cls=Encoder, indent=indent, ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict, separators=separators
+        ).encode()
+
+        for index, fragment in enumerate(fragments):
+            content = content.replace(f'"__raw_json_{nonce}_{index}__"'.encode(), fragment, 1)
+        return content
+
+
+class FastJSONParser(JSONParser):
+    """JSON 解析器，请求体为 UTF-8 时使用 orjson 解码"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def loads(content):
+    """解码 JSON 字节串，供不经过 DRF 解析器的视图使用
+
+    Raises:
+        ValueError: JSON 格式错误
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
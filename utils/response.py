@@ -1,9 +1,8 @@
-import logging
-
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.response import Response as RestResponse
 
-log = logging.getLogger(__name__)
+from utils.renderers import FastJSONRenderer
 
 
 class ResponseUtil(RestResponse):
@@ -50,5 +49,29 @@ class ResponseUtil(RestResponse):
         # 添加其他自定义字段
         response_data.update(kwargs)
 
-        log.debug(f'响应结果: {response_data}')
         super().__init__(data=response_data, status=http_status, headers=headers, exception=exception)
+
+
+def envelope_response(code=None, message='success', data=None, http_status=None, headers=None):
+    """构建与 ResponseUtil 结构和编码完全一致的 Django HttpResponse
+
+    用于不经过 DRF 的视图（例如异步视图）
+
+    Args:
+        code: API 状态码，默认使用 http_status
+        message: 响应消息
+        data: 响应数据
+        http_status: HTTP 状态码
+        headers: 响应头
+    """
+    if http_status is None:
+        http_status = status.HTTP_200_OK
+    if code is None:
+        code = http_status
+
+    content = FastJSONRenderer().render({
+        'code': code,
+        'message': message,
+        'data': data,
+    })
+    return HttpResponse(content, status=http_status, content_type='application/json', headers=headers)
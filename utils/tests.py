@@ -0,0 +1,529 @@
+import datetime
+import gzip
+import io
+import logging
+import random
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.setting.models import AppVersion, DynamicConfig
+from apps.setting.serializers import AppVersionListSerializer, DynamicConfigListSerializer
+from apps.setting.views import AppVersionViewSet, DynamicConfigViewSet
+from apps.user.caches import user_cache, user_rows
+from apps.user.models import User
+from apps.user.tokens import RefreshToken
+
+from .authentication import OptionalJWTAuthentication, VerifiedTokenCache, verified_tokens
+from .compression import cache_compressed, negotiate_encoding
+from .fast_serializer import compile_read_serializer
+from .metrics import metrics
+from .middleware import CompressionMiddleware, ResponseLoggingMiddleware
+from .renderers import FastJSONParser, FastJSONRenderer, RawJSON
+
+
+class VerifiedTokenCacheTest(TestCase):
+    """已验证 token 缓存：LRU 淘汰、用户禁用和撤销令牌时清除，命中缓存时仍校验用户状态"""
+
+    def setUp(self):
+        caches['default'].clear()
+        user_cache.l1.clear()
+        user_rows.clear()
+        verified_tokens.clear()
+        self.user = User.objects.create_user(username='alice', password='secret123')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self, token):
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+        result = OptionalJWTAuthentication().authenticate(request)
+        return result[0] if result else None
+
+    @staticmethod
+    def fake_token(user_id, expires_in=60):
+        return {'user_id': str(user_id), 'exp': time.time() + expires_in}
+
+    def test_lru_eviction(self):
+        cache = VerifiedTokenCache(max_entries=2)
+        tokens = {raw: self.fake_token(index) for index, raw in enumerate(('a', 'b', 'c'))}
+        cache.set('a', tokens['a'])
+        cache.set('b', tokens['b'])
+        self.assertIs(cache.get('a'), tokens['a'])  # a 最近使用，b 最久未使用
+        cache.set('c', tokens['c'])
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertIs(cache.get('a'), tokens['a'])
+        self.assertIs(cache.get('c'), tokens['c'])
+
+    def test_expired_and_disabled(self):
+        cache = VerifiedTokenCache(max_entries=2)
+        cache.set('expired', self.fake_token(1, expires_in=-1))
+        self.assertIsNone(cache.get('expired'))
+        self.assertEqual(len(cache), 0)
+
+        disabled = VerifiedTokenCache(max_entries=0)
+        disabled.set('a', self.fake_token(1))
+        self.assertIsNone(disabled.get('a'))
+
+    def test_evict_user(self):
+        cache = VerifiedTokenCache()
+        cache.set('a', self.fake_token(1))
+        cache.set('b', self.fake_token(1))
+        cache.set('c', self.fake_token(2))
+        self.assertEqual(cache.evict_user(1), 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_deactivation_evicts_user(self):
+        self.assertEqual(self.authenticate(self.token), self.user)
+        self.assertIsNotNone(verified_tokens.get(self.token))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(verified_tokens.get(self.token))
+        self.assertIsNone(self.authenticate(self.token))
+
+    def test_token_version_bump_evicts_user(self):
+        self.assertEqual(self.authenticate(self.token), self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+        self.assertIsNone(verified_tokens.get(self.token))
+        self.assertIsNone(self.authenticate(self.token))
+
+    def test_revocation_enforced_on_cache_hit(self):
+        self.assertEqual(self.authenticate(self.token), self.user)
+        # 其他 worker 进程中的缓存不会被 evict_user 清除，命中缓存时仍然由用户状态拒绝
+        with mock.patch.object(verified_tokens, 'evict_user'), self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+        with mock.patch.object(JWTAuthentication, 'get_validated_token') as verify:
+            self.assertIsNone(self.authenticate(self.token))
+        verify.assert_not_called()
+
+
+class SparseFieldsetTest(TestCase):
+    """fields / exclude 参数：移除未保留的字段，未知字段返回 400，并使用 .only() 裁剪查询的列"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='secret123', is_staff=True)
+        cls.version = AppVersion.objects.create(
+            platform='ios', version_code=100, version_name='1.0.0', title='版本 100',
+            description='更新说明', download_url='https://example.com/app'
+        )
+        DynamicConfig.objects.create(type='banner', title='横幅', description='描述')
+
+    def setUp(self):
+        caches['default'].clear()
+        user_cache.l1.clear()
+        user_rows.clear()
+        verified_tokens.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.admin).access_token}'
+
+    def get(self, url, **params):
+        """请求接口，返回响应和查询 url 对应资源表的 SQL"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        table = 'setting_dynamic_config' if 'configs' in url else 'setting_app_version'
+        queries = [query['sql'] for query in context.captured_queries if f'FROM "{table}"' in query['sql']]
+        return response, queries[-1]
+
+    @staticmethod
+    def selected_columns(sql):
+        columns = sql.split('SELECT ', 1)[1].split(' FROM ', 1)[0]
+        return {column.rsplit('.', 1)[-1].strip('"') for column in columns.split(', ')}
+
+    def test_fields_and_exclude(self):
+        response, _ = self.get('/setting/configs/', fields='id,title')
+        self.assertEqual(list(response.json()['data']['results'][0]), ['id', 'title'])
+
+        response, _ = self.get('/setting/configs/', exclude='banner_image_url,target_url,is_valid')
+        self.assertEqual(
+            list(response.json()['data']['results'][0]),
+            ['id', 'type', 'type_display', 'title', 'sort_order', 'is_active', 'create_time']
+        )
+
+        response, _ = self.get('/setting/configs/', fields='id,title,type', exclude='title')
+        self.assertEqual(list(response.json()['data']['results'][0]), ['id', 'type'])
+
+    def test_unknown_field(self):
+        for params in ({'fields': 'id,password'}, {'exclude': 'password'}):
+            with self.subTest(params=params):
+                response = self.client.get('/setting/configs/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('不支持的字段: password', response.content.decode())
+
+    def test_only_selects_needed_columns(self):
+        response, sql = self.get('/setting/configs/', fields='id,title,type_display')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.selected_columns(sql), {'id', 'title', 'type'})
+
+    def test_declared_dependencies(self):
+        response, sql = self.get('/setting/configs/', fields='id,is_valid')
+        self.assertIs(response.json()['data']['results'][0]['is_valid'], True)
+        self.assertEqual(self.selected_columns(sql), {'id', 'start_time', 'end_time'})
+
+        # 未声明依赖的 SerializerMethodField 不裁剪查询
+        with mock.patch.object(DynamicConfigViewSet, 'sparse_field_dependencies', {}):
+            response, sql = self.get('/setting/configs/', fields='id,is_valid')
+        self.assertIs(response.json()['data']['results'][0]['is_valid'], True)
+        self.assertIn('description', self.selected_columns(sql))
+
+    def test_retrieve(self):
+        response, sql = self.get(f'/setting/versions/{self.version.pk}/', fields='id,title,platform_display')
+        self.assertEqual(response.json()['data'], {'id': self.version.pk, 'title': '版本 100', 'platform_display': 'iOS'})
+        # 键集分页的排序字段总是保留
+        self.assertEqual(self.selected_columns(sql), {'id', 'title', 'platform', 'version_code'})
+
+        response, _ = self.get(f'/setting/versions/{self.version.pk}/')
+        self.assertIn('description', response.json()['data'])
+
+
+class CompiledSerializerTest(TestCase):
+    """编译序列化器的输出与 DRF 序列化器一致，包括字段筛选和键集分页；无法编译时使用 DRF 序列化器"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='secret123', is_staff=True)
+        for index in range(7):
+            AppVersion.objects.create(
+                platform=('ios', 'android')[index % 2], version_code=100 + index // 2,
+                version_name=f'1.0.{index}', title=f'版本 {index}', description='更新说明',
+                download_url='https://example.com/app', is_force_update=index == 3, is_active=index != 5
+            )
+        # 不在 choices 中的值，get_platform_display 原样返回
+        AppVersion.objects.filter(version_code=103).update(platform='web')
+        DynamicConfig.objects.create(type='banner', title='横幅')
+
+    def setUp(self):
+        caches['default'].clear()
+        user_cache.l1.clear()
+        user_rows.clear()
+        verified_tokens.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(self.admin).access_token}'
+
+    def test_serialize_matches_drf(self):
+        queryset = AppVersion.objects.order_by('id')
+        for fields in (None, ['id', 'platform_display', 'create_time'], ['title']):
+            with self.subTest(fields=fields):
+                compiled = compile_read_serializer(AppVersionListSerializer, fields)
+                expected = [
+                    {name: value for name, value in item.items() if fields is None or name in fields}
+                    for item in AppVersionListSerializer(queryset, many=True).data
+                ]
+                self.assertEqual(compiled.serialize(compiled.values(queryset)), expected)
+
+    def get_pages(self, url, compiled):
+        """跟随 next 链接读取所有页"""
+        actions = AppVersionViewSet.fast_serializer_actions if compiled else ()
+        pages = []
+        with mock.patch.object(AppVersionViewSet, 'fast_serializer_actions', actions), \
+                mock.patch('utils.base_views.compile_read_serializer', wraps=compile_read_serializer) as compile:
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                pages.append(response.json())
+                url = pages[-1]['data']['next']
+        self.assertEqual(compile.called, compiled)
+        return pages
+
+    def test_list_matches_drf(self):
+        for query in ('', '?limit=3', '?cursor=&limit=3', '?cursor=&limit=3&fields=id,title,platform_display',
+                      '?cursor=&limit=2&exclude=create_time&platform=ios', '?fields=version_code'):
+            with self.subTest(query=query):
+                pages = self.get_pages(f'/setting/versions/{query}', compiled=True)
+                self.assertEqual(pages, self.get_pages(f'/setting/versions/{query}', compiled=False))
+                self.assertEqual(sum(len(page['data']['results']) for page in pages), 3 if 'ios' in query else 7)
+
+    def test_method_field_falls_back_to_drf(self):
+        self.assertIsNone(compile_read_serializer(DynamicConfigListSerializer))
+        self.assertIsNotNone(compile_read_serializer(DynamicConfigListSerializer, ['id', 'title']))
+
+        with mock.patch.object(DynamicConfigViewSet, 'fast_serializer_actions', ('list',)):
+            fallback = self.client.get('/setting/configs/').json()
+        self.assertIs(fallback['data']['results'][0]['is_valid'], True)
+        self.assertEqual(fallback, self.client.get('/setting/configs/').json())
+
+
+class FastJSONRendererTest(TestCase):
+    """FastJSONRenderer / FastJSONParser 与 DRF JSONRenderer / JSONParser 的输出和错误一致"""
+
+    data = {
+        'datetime': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        'naive': datetime.datetime(2024, 1, 2, 3, 4, 5),
+        'date': datetime.date(2024, 1, 2),
+        'time': datetime.time(3, 4, 5),
+        'timedelta': datetime.timedelta(hours=1),
+        'decimal': Decimal('1.10'),
+        'uuid': uuid.UUID(int=1),
+        'lazy': gettext_lazy('用户名'),
+        'text': '中文 \u2028 \u2029 "quoted" </script>',
+        'nested': [{1: None, 'list': (1, 2.5, True)}, set()],
+    }
+
+    def assert_same(self, data, accepted_media_type=None, renderer_context=None):
+        content = FastJSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(content, JSONRenderer().render(data, accepted_media_type, renderer_context))
+        return content
+
+    def test_matches_drf(self):
+        content = self.assert_same(self.data)
+        self.assertIn(b'\\u2028 \\u2029', content)
+        self.assertNotIn('\u2028'.encode(), content)
+        self.assert_same(None)
+        self.assert_same([])
+
+    def test_stdlib_fallback(self):
+        # 超过 64 位的整数 orjson 无法编码，整体使用标准库编码
+        self.assert_same({'big': 2 ** 70, 'negative': -2 ** 64, **self.data})
+        with mock.patch('utils.renderers.orjson', None):
+            self.assert_same(self.data)
+
+    def test_indent(self):
+        self.assert_same(self.data, 'application/json; indent=4')
+        self.assert_same(self.data, 'application/json', {'indent': 2})
+
+    def test_browsable_api(self):
+        admin = User.objects.create_user(username='admin', password='secret123', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get('/setting/configs/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'&quot;results&quot;: []', response.content)
+
+    def test_raw_json(self):
+        inner = {'id': 1, 'text': '\u2028', 'when': self.data['datetime']}
+        data = {'cached': RawJSON.encode(inner), 'list': [RawJSON.encode([1, 2]), RawJSON(b'null')]}
+        expected = JSONRenderer().render({'cached': inner, 'list': [[1, 2], None]})
+
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch('utils.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+        # 标准库路径：缩进输出时 RawJSON 原样拼接
+        self.assertEqual(
+            FastJSONRenderer().render({'cached': RawJSON(b'{"a":1}')}, 'application/json; indent=2'),
+            b'{\n  "cached": {"a":1}\n}'
+        )
+        self.assertEqual(RawJSON.encode(inner), RawJSON.encode(inner))
+
+    def test_nan(self):
+        # 与 DRF 严格模式不同，orjson 把 NaN / Infinity 编码为 null
+        self.assertEqual(FastJSONRenderer().render({'value': float('nan')}), b'{"value":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'value': float('nan')})
+
+    def parse(self, parser, content, encoding='utf-8'):
+        return parser.parse(io.BytesIO(content), 'application/json', {'encoding': encoding})
+
+    def test_parser(self):
+        for content in ('{"name": "中文", "items": [1, 2.5, null, true]}'.encode(), b'[]', b'"text"'):
+            with self.subTest(content=content):
+                self.assertEqual(self.parse(FastJSONParser(), content), self.parse(JSONParser(), content))
+
+        content = '{"name": "中文"}'.encode('gbk')
+        self.assertEqual(self.parse(FastJSONParser(), content, 'gbk'), {'name': '中文'})
+
+    def test_parser_errors(self):
+        for content in (b'', b'{"name": ', b'{name: 1}', b'\xff\xfe', b'[1, 2] 3'):
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError) as context:
+                    self.parse(FastJSONParser(), content)
+                self.assertTrue(str(context.exception.detail).startswith('JSON parse error - '))
+                with self.assertRaises(ParseError):
+                    self.parse(JSONParser(), content)
+
+        response = self.client.post('/setting/versions/check/', b'{"platform": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(RESPONSE_LOGGING={
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.5,
+    'ROUTE_SAMPLE_RATES': {'/setting/': 0, '/setting/versions/': 1, '/setting/versions/check/': 0.2},
+    'MAX_BODY_SIZE': 10,
+})
+class ResponseLoggingMiddlewareTest(SimpleTestCase):
+    """响应日志中间件：关闭时不启用、最长前缀采样、响应体截断和结构化字段"""
+
+    def middleware(self, content=b'{"code":0}', get_response=None):
+        return ResponseLoggingMiddleware(get_response or (lambda request: HttpResponse(content)))
+
+    def test_disabled(self):
+        for options in ({}, {'ENABLED': False, 'SAMPLE_RATE': 1}):
+            with self.subTest(options=options), override_settings(RESPONSE_LOGGING=options):
+                with self.assertRaises(MiddlewareNotUsed):
+                    self.middleware()
+
+    def test_longest_prefix_sample_rate(self):
+        middleware = self.middleware()
+        for path, rate in (
+            ('/setting/configs/', 0),
+            ('/setting/versions/', 1),
+            ('/setting/versions/latest/', 1),
+            ('/setting/versions/check/', 0.2),
+            ('/user/users/me/', 0.5),
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(middleware.get_sample_rate(path), rate)
+
+    def test_sampling(self):
+        middleware = self.middleware()
+        with self.assertLogs('utils.middleware', 'DEBUG'):
+            with mock.patch('utils.middleware.random.random', return_value=0.3) as random:
+                self.assertFalse(middleware.should_log(RequestFactory().get('/setting/configs/')))
+                self.assertTrue(middleware.should_log(RequestFactory().get('/setting/versions/')))
+                self.assertFalse(random.called)
+                self.assertFalse(middleware.should_log(RequestFactory().get('/setting/versions/check/')))
+                self.assertTrue(middleware.should_log(RequestFactory().get('/user/users/me/')))
+            middleware.log_response(RequestFactory().get('/'), HttpResponse(), time.perf_counter())
+
+        # logger 未开启 DEBUG 时不采样也不输出
+        logger = logging.getLogger('utils.middleware')
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.WARNING)
+        with mock.patch('utils.middleware.random.random') as random, mock.patch.object(logger, 'debug') as debug:
+            middleware(RequestFactory().get('/setting/versions/'))
+            self.assertFalse(middleware.should_log(RequestFactory().get('/user/users/me/')))
+        self.assertFalse(random.called)
+        self.assertFalse(debug.called)
+
+    def log(self, middleware, path='/setting/versions/'):
+        with self.assertLogs('utils.middleware', 'DEBUG') as context:
+            response = middleware(RequestFactory().post(path))
+        self.assertEqual(len(context.records), 1)
+        return response, context.records[0]
+
+    def test_structured_fields_and_truncation(self):
+        response, record = self.log(self.middleware(b'{"code":0,"data":"0123456789"}'))
+        self.assertEqual(
+            (record.method, record.path, record.status, record.size),
+            ('POST', '/setting/versions/', 200, len(response.content))
+        )
+        self.assertGreaterEqual(record.duration_ms, 0)
+        self.assertEqual(str(record.body), '{"code":0,...(30 bytes)')
+        self.assertIn('{"code":0,...(30 bytes)', record.getMessage())
+
+        _, record = self.log(self.middleware(b'{"code":0}'))
+        self.assertEqual(str(record.body), '{"code":0}')
+
+        # 截断位置落在多字节字符中间时替换为 U+FFFD
+        _, record = self.log(self.middleware('{"a":"中文"}'.encode()))
+        self.assertEqual(str(record.body), '{"a":"中\ufffd...(14 bytes)')
+
+        streaming = self.middleware(get_response=lambda request: StreamingHttpResponse(iter([b'{}'])))
+        _, record = self.log(streaming)
+        self.assertEqual((str(record.body), record.size), ('<streaming>', None))
+
+    async def test_async(self):
+        async def get_response(request):
+            return HttpResponse(b'{"code":0}')
+
+        middleware = self.middleware(get_response=get_response)
+        with self.assertLogs('utils.middleware', 'DEBUG') as context:
+            response = await middleware(RequestFactory().get('/setting/versions/'))
+        self.assertEqual(response.content, b'{"code":0}')
+        self.assertEqual((context.records[0].status, str(context.records[0].body)), (200, '{"code":0}'))
+
+
+@override_settings(RESPONSE_COMPRESSION={'ENABLED': True, 'MIN_SIZE': 100})
+class CompressionMiddlewareTest(TestCase):
+    """响应压缩：Accept-Encoding 协商、跳过小响应和无收益的压缩、Vary、弱 ETag 和条件请求"""
+
+    body = b'{"code":0,"data":[' + b','.join(b'{"id":%d,"title":"title"}' % index for index in range(20)) + b']}'
+
+    def process(self, content=None, accept_encoding='gzip', content_type='application/json', headers=None):
+        response = HttpResponse(self.body if content is None else content, content_type=content_type, headers=headers)
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_negotiate_encoding(self):
+        for accept_encoding, expected in (
+            ('gzip', 'gzip'),
+            ('gzip, deflate, br', 'br'),
+            ('GZIP;Q=1', 'gzip'),
+            ('br;q=0.5, gzip;q=0.8', 'gzip'),
+            ('br;q=0, gzip', 'gzip'),
+            ('gzip;q=0', None),
+            ('gzip;q=abc', None),
+            ('*', 'br'),
+            ('*;q=0', None),
+            ('*, br;q=0', 'gzip'),
+            ('gzip;q=0, *;q=0.1', 'br'),
+            ('identity', None),
+            ('', None),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(negotiate_encoding(accept_encoding), expected)
+
+    def test_compress(self):
+        response = self.process(headers={'ETag': '"abc"'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+        # 已经是弱 ETag 时不重复添加前缀
+        self.assertEqual(self.process(headers={'ETag': 'W/"abc"'})['ETag'], 'W/"abc"')
+
+    def test_skipped(self):
+        for name, response in (
+            ('min size', self.process(self.body[:99])),
+            ('no gain', self.process(random.Random(0).randbytes(200))),
+            ('not accepted', self.process(accept_encoding='identity')),
+        ):
+            with self.subTest(name):
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        for response in (self.process(content_type='text/html'), self.process(headers={'Content-Encoding': 'br'})):
+            self.assertFalse(response.has_header('Vary'))
+            self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+
+    def test_options_read_at_init(self):
+        with override_settings(RESPONSE_COMPRESSION={'ENABLED': True, 'MIN_SIZE': len(self.body) + 1}):
+            self.assertFalse(self.process().has_header('Content-Encoding'))
+        with override_settings(RESPONSE_COMPRESSION={'ENABLED': True, 'MIN_SIZE': 100, 'GZIP_LEVEL': 1}):
+            fast = self.process().content
+        self.assertNotEqual(fast, self.process().content)
+        with override_settings(RESPONSE_COMPRESSION={'ENABLED': False}), self.assertRaises(MiddlewareNotUsed):
+            CompressionMiddleware(lambda request: None)
+
+    def test_cache_compressed(self):
+        response = cache_compressed(HttpResponse(self.body, content_type='application/json'))
+        middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        metrics.reset()
+        compressed = middleware(request).content
+        response.content = self.body
+        del response['Content-Encoding']
+        self.assertEqual(middleware(request).content, compressed)
+        self.assertEqual(metrics.snapshot('compression.cache')['counters'], {
+            'compression.cache.miss': 1, 'compression.cache.hit': 1
+        })
+
+    def test_not_modified_with_weak_etag(self):
+        DynamicConfig.objects.create(type='banner', title='横幅', description='描述' * 50)
+        url = '/setting/configs/get_by_type/?type=banner'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+
+        for if_none_match in (etag, etag[2:]):
+            with self.subTest(if_none_match=if_none_match):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')